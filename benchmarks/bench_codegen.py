@@ -0,0 +1,82 @@
+"""
+Benchmark of the code generation backend against Editor.apply_plan.
+
+Compiles each edit list of the example CSVs once, then applies it to
+fresh copies of a small dataset with both the interpreter and the
+function codegen.compile_function generates for it.
+
+    python benchmarks/bench_codegen.py [CSV ...] [--files N] [--repeat N]
+"""
+
+import sys
+import copy
+import time
+import argparse
+from pathlib import Path
+
+from pydicom.dataset import Dataset
+from pydicom.sequence import Sequence
+
+from pydicom_background_editor.codegen import compile_function
+from pydicom_background_editor.editor import Editor
+from pydicom_background_editor.main import read_edit_csv
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_CSVS = [
+    ROOT / "background_editor_example_input.csv",
+    ROOT / "background_editor_example_input2.csv",
+]
+
+def make_dataset() -> Dataset:
+    ds = Dataset()
+    ds.PatientName = "Test^Patient"
+    ds.PatientID = "12345"
+    ds.StudyDate = "20241030"
+    ds.SeriesDate = "20241030"
+    ds.StudyInstanceUID = "1.2.840.12345.1"
+    ds.SeriesInstanceUID = "1.2.840.12345.2"
+    ds.StudyDescription = "Study"
+    code = Dataset()
+    code.CodeValue = "113100"
+    ds.DeidentificationMethodCodeSequence = Sequence([code])
+    block = ds.private_block(0x0013, "CTP", create=True)
+    block.add_new(0x10, "LO", "Project")
+    block.add_new(0x13, "LO", "12345678")
+    return ds
+
+def run(apply, datasets: list[Dataset]) -> float:
+    start = time.perf_counter()
+    for ds in datasets:
+        apply(ds)
+    return time.perf_counter() - start
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("csv", nargs="*", default=DEFAULT_CSVS, help="Edit CSVs to take edit lists from")
+    parser.add_argument("--files", type=int, default=2000, help="Datasets each edit list is applied to")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs to take the best of")
+    args = parser.parse_args(argv)
+
+    edit_lists = {id(ops): ops for csv_path in args.csv for ops in read_edit_csv(csv_path).values()}
+    if not edit_lists:
+        sys.exit("No ops found in the given CSVs")
+
+    editor = Editor()
+    template = make_dataset()
+    interpreted = generated = 0.0
+    for operations in edit_lists.values():
+        plan = editor.compile(operations)
+        function = compile_function(editor, plan)
+        apply = lambda ds: editor.apply_plan(ds, plan)
+
+        interpreted += min(run(apply, [copy.deepcopy(template) for _ in range(args.files)]) for _ in range(args.repeat))
+        generated += min(run(function, [copy.deepcopy(template) for _ in range(args.files)]) for _ in range(args.repeat))
+
+    calls = len(edit_lists) * args.files
+    print(f"{len(edit_lists)} edit lists, {args.files} datasets each")
+    print(f"interpreted: {interpreted:.3f}s ({interpreted / calls * 1e6:.1f} us/dataset)")
+    print(f"generated:   {generated:.3f}s ({generated / calls * 1e6:.1f} us/dataset)")
+    print(f"speedup:     {interpreted / generated:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark of tag_mode "mask" ops against exact ones.
+
+Deletes the data of all 16 overlay groups of a dataset with a few
+thousand other elements, with one exact delete_tag per group and with a
+single masked one. For scale, it also deletes one group's data on its
+own, and applies a mask too wide to expand, which matches nothing.
+
+    python benchmarks/bench_mask.py [--elements N] [--files N] [--repeat N]
+"""
+
+import copy
+import time
+import argparse
+
+from pydicom.dataset import Dataset
+
+from pydicom_background_editor.editor import Editor, Operation
+
+def make_dataset(elements: int) -> Dataset:
+    ds = Dataset()
+    for i in range(elements):
+        ds.add_new((0x0019, 0x1000 + i), "LO", f"value {i}")
+    for group in range(0x6000, 0x6020, 2):
+        ds.add_new((group, 0x0010), "US", 512)
+        ds.add_new((group, 0x3000), "OW", b"\x00" * 64)
+    return ds
+
+def run(editor: Editor, operations: list[Operation], datasets: list[Dataset]) -> float:
+    plan = editor.compile(operations)
+    start = time.perf_counter()
+    for ds in datasets:
+        editor.apply_plan(ds, plan)
+    return time.perf_counter() - start
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--elements", type=int, default=3000, help="Elements in each dataset")
+    parser.add_argument("--files", type=int, default=500, help="Datasets each op is applied to")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs to take the best of")
+    args = parser.parse_args(argv)
+
+    editor = Editor()
+    template = make_dataset(args.elements)
+    cases = {
+        "exact (6000,3000)   ": [Operation("delete_tag", "<(6000,3000)>", "", "")],
+        "exact (60gg,3000) x16": [
+            Operation("delete_tag", f"<({group:04x},3000)>", "", "") for group in range(0x6000, 0x6020, 2)
+        ],
+        "mask  (60xx,3000)   ": [Operation("delete_tag", "<(60xx,3000)>", "", "", tag_mode="mask")],
+        "mask  (0021,xxxx)   ": [Operation("delete_tag", "<(0021,xxxx)>", "", "", tag_mode="mask")],
+    }
+    for name, operations in cases.items():
+        best = min(
+            run(editor, operations, [copy.deepcopy(template) for _ in range(args.files)])
+            for _ in range(args.repeat)
+        )
+        print(f"{name}: {best / args.files * 1e6:8.1f} us/dataset")
+
+if __name__ == "__main__":
+    main()
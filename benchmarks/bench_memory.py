@@ -0,0 +1,91 @@
+"""
+Memory benchmark for loading very large edit lists.
+
+Writes a synthetic edit CSV with one substitute row per instance (a
+per-instance SOP Instance UID, as de-identification sheets have), then
+loads it through Operation.from_csv_row and reports the memory the
+operations hold and how long they took to build. The same rows loaded
+into a plain, unslotted dataclass without interning are shown for
+comparison.
+
+    python benchmarks/bench_memory.py [--rows N] [--csv FILE]
+"""
+
+import csv
+import gc
+import time
+import argparse
+import dataclasses
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from pydicom_background_editor.editor import Operation
+
+FIELDS = ["series_instance_uid", "op", "tag", "val1", "val2"]
+ROOT_UID = "1.3.6.1.4.1.14519.5.2.1"
+
+@dataclasses.dataclass
+class PlainOperation:
+    op: str
+    tag: str
+    val1: str
+    val2: str
+
+    @staticmethod
+    def from_csv_row(row: dict) -> "PlainOperation":
+        return PlainOperation(
+            op=row["op"],
+            tag=row["tag"],
+            val1=Operation._strip_metaquotes(row["val1"]),
+            val2=Operation._strip_metaquotes(row["val2"]),
+        )
+
+def write_csv(path: Path, rows: int) -> None:
+    with path.open("w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerow({"series_instance_uid": f"{ROOT_UID}.1", "op": "", "tag": "", "val1": "", "val2": ""})
+        for i in range(rows):
+            if i % 4 == 0:
+                writer.writerow({"series_instance_uid": "", "op": "shift_date", "tag": "<(0008,0020)>", "val1": "<-30>", "val2": "<>"})
+            else:
+                writer.writerow({
+                    "series_instance_uid": "",
+                    "op": "substitute",
+                    "tag": "<(0008,0018)>",
+                    "val1": f"<{ROOT_UID}.2.{i}>",
+                    "val2": f"<{ROOT_UID}.3.{i}>",
+                })
+
+def load(csv_path: Path, from_csv_row) -> tuple[list, int, float]:
+    """Build every op of the CSV; return them, the bytes they hold and the seconds it took."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    with csv_path.open("r", newline="") as f:
+        ops = [from_csv_row(row) for row in csv.DictReader(f) if not row["series_instance_uid"]]
+    elapsed = time.perf_counter() - start
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return ops, held, elapsed
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Op rows in the synthetic CSV")
+    parser.add_argument("--csv", type=Path, help="Edit CSV to load instead of a synthetic one")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = args.csv
+        if csv_path is None:
+            csv_path = Path(tmp) / "edits.csv"
+            write_csv(csv_path, args.rows)
+
+        for name, from_csv_row in (("plain", PlainOperation.from_csv_row), ("Operation", Operation.from_csv_row)):
+            ops, held, elapsed = load(csv_path, from_csv_row)
+            print(f"{name:>9}: {len(ops)} ops, {held / 2**20:.1f} MiB ({held / len(ops):.0f} B/op), {elapsed:.2f}s")
+            del ops
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Micro-benchmark for path.parse on the example edit CSVs.
+
+Every op's tag path is parsed once per file it is applied to, as an
+uncompiled edit list would; the same few dozen paths repeat for every
+file, which is what the parse cache is for.
+
+    python benchmarks/bench_parse.py [CSV ...] [--files N] [--repeat N]
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+from pydicom_background_editor.main import read_edit_csv
+from pydicom_background_editor.path import parse
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_CSVS = [
+    ROOT / "background_editor_example_input.csv",
+    ROOT / "background_editor_example_input2.csv",
+]
+
+def load_tags(csv_paths) -> list[str]:
+    tags = []
+    for csv_path in csv_paths:
+        for operations in read_edit_csv(csv_path).values():
+            tags.extend(op.tag for op in operations)
+    return tags
+
+def run(parse_fn, tags: list[str], files: int) -> float:
+    start = time.perf_counter()
+    for _ in range(files):
+        for tag in tags:
+            parse_fn(tag)
+    return time.perf_counter() - start
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("csv", nargs="*", default=DEFAULT_CSVS, help="Edit CSVs to take paths from")
+    parser.add_argument("--files", type=int, default=500, help="Files each edit list is applied to")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs to take the best of")
+    args = parser.parse_args(argv)
+
+    tags = load_tags(args.csv)
+    if not tags:
+        sys.exit("No ops found in the given CSVs")
+
+    print(f"{len(tags)} ops, {len(set(tags))} distinct paths, {args.files} files")
+
+    uncached = min(run(parse.__wrapped__, tags, args.files) for _ in range(args.repeat))
+    parse.cache_clear()
+    cached = min(run(parse, tags, args.files) for _ in range(args.repeat))
+
+    calls = len(tags) * args.files
+    print(f"uncached: {uncached:.3f}s ({uncached / calls * 1e6:.2f} us/parse)")
+    print(f"cached:   {cached:.3f}s ({cached / calls * 1e6:.2f} us/parse)")
+    print(f"speedup:  {uncached / cached:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Benchmark of start-up time for the per-file entry point.
+
+Posda runs one editor process per file, so interpreter start-up plus our
+imports is a fixed cost paid for every edited file. This times fresh
+interpreters importing the Storable entry point against bare ones, and
+exits non-zero when the imports take longer than the budget (--budget-ms,
+or $PYDICOM_BACKGROUND_EDITOR_STARTUP_BUDGET_MS; 500 ms by default).
+
+    python benchmarks/bench_startup.py [--runs N] [--budget-ms MS]
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+BUDGET_ENV = "PYDICOM_BACKGROUND_EDITOR_STARTUP_BUDGET_MS"
+
+def median_startup(code: str, runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True, capture_output=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="Interpreters to start for each median")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=float(os.environ.get(BUDGET_ENV, "500")),
+        help="Most milliseconds the entry point's imports may add to a bare interpreter",
+    )
+    args = parser.parse_args(argv)
+
+    baseline = median_startup("pass", args.runs)
+    elapsed = median_startup("import pydicom_background_editor.main", args.runs)
+    print(f"bare interpreter: {baseline * 1e3:7.1f} ms")
+    overhead = (elapsed - baseline) * 1e3
+    print(f"entry point:      {elapsed * 1e3:7.1f} ms (+{overhead:.1f} ms of imports, budget {args.budget_ms:g} ms)")
+    if overhead > args.budget_ms:
+        sys.exit(f"imports take {overhead:.1f} ms, over the {args.budget_ms:g} ms budget")
+
+if __name__ == "__main__":
+    main()
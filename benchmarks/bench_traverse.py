@@ -0,0 +1,67 @@
+"""
+Benchmark of path traversal over a synthetic enhanced multi-frame dataset.
+
+Builds a Per-Frame Functional Groups Sequence with one item per frame,
+each holding a nested code sequence, and times traverse() on paths that
+run down every frame, as de-identification edits of enhanced objects do,
+first by scanning and then with a TagIndex attached.
+
+    python benchmarks/bench_traverse.py [--frames N] [--repeat N]
+"""
+
+import time
+import argparse
+
+from pydicom.dataset import Dataset
+from pydicom.sequence import Sequence
+
+from pydicom_background_editor.path import TagIndex, parse, traverse
+
+PATHS = [
+    "<(5200,9230)[<0>](0008,9124)[<0>](0008,2112)[<0>](0040,a170)[<0>](0008,0100)>",
+    "<(5200,9230)[<0>](0020,9111)[<0>](0020,9157)>",
+    "<(5200,9230)[0](0008,9124)[0](0008,2112)[0](0040,a170)[0](0008,0100)>",
+]
+
+def make_frame(i: int) -> Dataset:
+    code = Dataset()
+    code.CodeValue = "121322"
+    source_image = Dataset()
+    source_image.PurposeOfReferenceCodeSequence = Sequence([code])
+    derivation = Dataset()
+    derivation.SourceImageSequence = Sequence([source_image])
+    content = Dataset()
+    content.DimensionIndexValues = [1, i + 1]
+    frame = Dataset()
+    frame.DerivationImageSequence = Sequence([derivation])
+    frame.FrameContentSequence = Sequence([content])
+    return frame
+
+def make_dataset(frames: int) -> Dataset:
+    ds = Dataset()
+    ds.PerFrameFunctionalGroupsSequence = Sequence([make_frame(i) for i in range(frames)])
+    return ds
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=5000, help="Items in the per-frame sequence")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs to take the best of")
+    args = parser.parse_args(argv)
+
+    ds = make_dataset(args.frames)
+    for label in ("scan", "indexed"):
+        if label == "indexed":
+            start = time.perf_counter()
+            TagIndex.attach(ds)
+            print(f"{(time.perf_counter() - start) * 1e3:8.2f} ms  to build the index")
+        for path in PATHS:
+            parsed = parse(path)
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                matches = traverse(ds, parsed)
+                best = min(best, time.perf_counter() - start)
+            print(f"{best * 1e3:8.2f} ms  {len(matches):6d} matches  {label:7s} {path}")
+
+if __name__ == "__main__":
+    main()
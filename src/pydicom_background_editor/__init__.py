@@ -1,9 +1,18 @@
 """pydicom_background_editor package.
 
 Exports a small, convenient surface for tests and CLI.
+
+The exports are loaded on first access, so that importing a submodule
+which does not need pydicom (such as the client) stays cheap.
 """
 
-from .editor import Operation
-from .path import parse, traverse
+__all__ = ["Operation", "parse", "traverse", "iter_traverse"]
 
-__all__ = ["Operation", "parse", "traverse"]
+def __getattr__(name):
+    if name == "Operation":
+        from .editor import Operation
+        return Operation
+    if name in ("parse", "traverse", "iter_traverse"):
+        from . import path
+        return getattr(path, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,484 @@
+"""
+Batch editor driven by the edit CSV.
+
+Reads the spreadsheet of series rows followed by op rows, finds the files
+of every series, and edits them all on a pool of worker processes, writing
+one output file per input under <output_dir>/<series_instance_uid>/.
+
+Files are found either from a manifest CSV with series_instance_uid and
+file columns, or by scanning a directory tree for DICOM files.
+
+With --journal, every finished file is checkpointed, and a rerun with the
+same journal skips the files that were already edited with the same plan.
+"""
+
+import os
+import sys
+import csv
+import time
+import logging
+import argparse
+import dataclasses
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import pydicom
+from pydicom.errors import InvalidDicomError
+
+from .editor import Editor, Operation, Plan, plan_digest
+from .main import configure_logging, edit_file, read_edit_csv
+from .journal import Journal, input_digest
+from .optimize import optimize
+from .validate import PlanValidationError, validate_operations
+from .plancache import PlanCache, operations_key
+from .scheduler import MemoryScheduler, default_memory_budget, estimate_memory, parse_size
+
+logger = logging.getLogger(__name__)
+
+@dataclasses.dataclass
+class Job:
+    series_instance_uid: str
+    from_file: str
+    to_file: str
+    input_digest: str = ""
+    plan_fingerprint: str = ""
+
+@dataclasses.dataclass
+class JobResult:
+    job: Job
+    status: str
+    message: str
+    seconds: float
+    size: int
+
+@dataclasses.dataclass
+class SeriesReport:
+    series_instance_uid: str
+    files: int
+    failed: int
+    bytes: int
+    seconds: float
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files / self.seconds if self.seconds else 0.0
+
+    @property
+    def megabytes_per_second(self) -> float:
+        return self.bytes / 1e6 / self.seconds if self.seconds else 0.0
+
+def resolve_from_manifest(manifest_path) -> dict[str, list[str]]:
+    """Map each Series Instance UID to its files, from a manifest CSV.
+
+    The manifest needs series_instance_uid and file columns, one row per file.
+    """
+    files_by_series = defaultdict(list)
+    with open(manifest_path, "r", newline="") as infile:
+        reader = csv.DictReader(infile)
+        if reader.fieldnames is None or not {"series_instance_uid", "file"} <= set(reader.fieldnames):
+            raise ValueError("Manifest must have series_instance_uid and file columns")
+
+        for row in reader:
+            files_by_series[row["series_instance_uid"]].append(row["file"])
+
+    return dict(files_by_series)
+
+def resolve_from_directory(root) -> dict[str, list[str]]:
+    """Map each Series Instance UID to its files, by scanning a directory tree.
+
+    Only the header up to the Series Instance UID is read from each file;
+    files that are not DICOM are skipped.
+    """
+    files_by_series = defaultdict(list)
+    for directory, _, names in os.walk(root):
+        for name in sorted(names):
+            path = os.path.join(directory, name)
+            try:
+                ds = pydicom.dcmread(path, stop_before_pixels=True, specific_tags=["SeriesInstanceUID"])
+            except (InvalidDicomError, OSError):
+                logger.debug(f"Skipping {path}, not a readable DICOM file")
+                continue
+
+            series_instance_uid = ds.get("SeriesInstanceUID")
+            if series_instance_uid:
+                files_by_series[str(series_instance_uid)].append(path)
+
+    return dict(files_by_series)
+
+def fingerprint_groups(edit_groups: dict[str, list[Operation]]) -> dict[str, str]:
+    """Map each series to the fingerprint of its edit list.
+
+    Series sharing one list object (see read_edit_csv) are only digested once.
+    """
+    by_list: dict[int, str] = {}
+    fingerprints = {}
+    for series_instance_uid, operations in edit_groups.items():
+        fingerprint = by_list.get(id(operations))
+        if fingerprint is None:
+            fingerprint = by_list[id(operations)] = plan_digest(operations)
+        fingerprints[series_instance_uid] = fingerprint
+
+    return fingerprints
+
+def validate_groups(edit_groups: dict[str, list[Operation]], cache: PlanCache | None = None) -> None:
+    """Validate every distinct edit list; raise PlanValidationError for all bad ones.
+
+    Lists that already have a plan in cache were validated when it was stored.
+    """
+    issues = []
+    checked = set()
+    for series_instance_uid, operations in edit_groups.items():
+        if id(operations) in checked:
+            continue
+        checked.add(id(operations))
+        if cache is not None and operations_key(plan_digest(operations)) in cache:
+            continue
+        try:
+            validate_operations(operations)
+        except PlanValidationError as e:
+            issues += [f"series {series_instance_uid}: {issue}" for issue in e.issues]
+
+    if issues:
+        raise PlanValidationError(issues)
+
+def build_jobs(
+    edit_groups: dict[str, list[Operation]],
+    files_by_series: dict[str, list[str]],
+    output_dir,
+) -> list[Job]:
+    """Create one Job per file of every series that has edits.
+
+    The jobs of series with the same edit list are kept together, so a
+    worker tends to reuse one compiled plan for file after file. Each file
+    is written to its series' directory under its own name; raises
+    ValueError if two files of one series have the same name, as they
+    would overwrite each other.
+    """
+    fingerprints = fingerprint_groups(edit_groups)
+    first_seen: dict[str, int] = {}
+    for fingerprint in fingerprints.values():
+        first_seen.setdefault(fingerprint, len(first_seen))
+
+    jobs = []
+    for series_instance_uid in sorted(edit_groups, key=lambda uid: first_seen[fingerprints[uid]]):
+        files = files_by_series.get(series_instance_uid)
+        if not files:
+            logger.warning(f"No files found for series {series_instance_uid}")
+            continue
+
+        series_dir = os.path.join(output_dir, series_instance_uid)
+        for from_file in files:
+            to_file = os.path.join(series_dir, os.path.basename(from_file))
+            jobs.append(Job(series_instance_uid, from_file, to_file, plan_fingerprint=fingerprints[series_instance_uid]))
+
+    sources: dict[str, list[str]] = defaultdict(list)
+    for job in jobs:
+        sources[job.to_file].append(job.from_file)
+    clashes = [f"{to_file} ({', '.join(froms)})" for to_file, froms in sources.items() if len(froms) > 1]
+    if clashes:
+        raise ValueError(f"Files of one series share a name, so they would overwrite each other: {'; '.join(clashes)}")
+
+    return jobs
+
+# per-process state of the pool workers, set up by _init_worker
+_editor = None
+_edit_lists: dict[str, list[Operation]] = {}
+_plans: dict[str, Plan] = {}
+_plan_cache: PlanCache | None = None
+
+def _init_worker(edit_lists: dict[str, list[Operation]]) -> None:
+    global _editor, _edit_lists, _plans, _plan_cache
+    _editor = Editor()
+    _edit_lists = edit_lists
+    _plans = {}
+    _plan_cache = PlanCache.from_env()
+
+def compile_cached(editor: Editor, operations: list[Operation], fingerprint: str, cache: PlanCache | None) -> Plan:
+    """Compile operations, or load their plan from cache if one is stored there.
+
+    A plan is only stored once its operations have passed validation, so
+    whatever later loads it can rely on that; a bad list raises
+    PlanValidationError.
+    """
+    if cache is None:
+        return editor.compile(operations)
+
+    key = operations_key(fingerprint)
+    plan = cache.load(editor, key)
+    if plan is None:
+        validate_operations(operations)
+        plan = editor.compile(operations)
+        cache.store(key, plan)
+    return plan
+
+def _plan_for(plan_fingerprint: str) -> Plan:
+    # compiled on first use, so an edit list that doesn't compile fails
+    # its own jobs rather than the worker's start-up
+    plan = _plans.get(plan_fingerprint)
+    if plan is None:
+        plan = _plans[plan_fingerprint] = compile_cached(
+            _editor, _edit_lists[plan_fingerprint], plan_fingerprint, _plan_cache
+        )
+    return plan
+
+def _run_job(job: Job) -> JobResult:
+    start = time.perf_counter()
+    try:
+        size = os.path.getsize(job.from_file)
+        os.makedirs(os.path.dirname(job.to_file), exist_ok=True)
+        edit_file(_editor, _plan_for(job.plan_fingerprint), job.from_file, job.to_file)
+        status, message = "OK", ""
+    except Exception as e:
+        logger.exception(f"Editing {job.from_file} failed")
+        size = 0
+        status, message = "Error", f"{type(e).__name__}: {e}"
+
+    return JobResult(job, status, message, time.perf_counter() - start, size)
+
+def _pending_jobs(jobs: list[Job], journal: Journal) -> list[Job]:
+    """Drop the jobs the journal says are done, noting each job's input digest."""
+    pending = []
+    for job in jobs:
+        try:
+            job.input_digest = input_digest(job.from_file)
+        except OSError:
+            # let the worker run into (and report) the missing file
+            pending.append(job)
+            continue
+
+        if not journal.is_done(job.from_file, job.input_digest, job.plan_fingerprint, job.to_file):
+            pending.append(job)
+
+    return pending
+
+def _estimate_job(job: Job) -> int:
+    try:
+        return estimate_memory(job.from_file)
+    except OSError:
+        return 0
+
+def _pool_context():
+    # the executor runs a management thread, so forking it directly is
+    # unsafe; fork workers from a clean, preloaded server process instead
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(["pydicom_background_editor.batch"])
+    return context
+
+def run_batch(
+    jobs: list[Job],
+    edit_groups: dict[str, list[Operation]],
+    workers: int | None = None,
+    journal: Journal | None = None,
+    io_threads: int | None = None,
+    memory_budget: int | None = None,
+    edit_threads: int | None = None,
+    validated: bool = False,
+) -> list[JobResult]:
+    """Edit every job's file on a pool of worker processes.
+
+    Each distinct edit list is handed to each worker once, when it starts,
+    keyed by its fingerprint; the jobs themselves only carry file names and
+    the fingerprint, and a worker compiles each list once. A failed file is
+    reported in its JobResult and does not stop the batch.
+
+    Jobs are started largest first, and only while the estimated memory of
+    the running jobs fits in memory_budget (default: three quarters of
+    physical memory); see scheduler.MemoryScheduler. Jobs of equal size
+    are grouped by fingerprint.
+
+    With a journal, jobs it already records as done are skipped, and each
+    finished job is appended to it as soon as its result comes back.
+
+    With io_threads, the files are instead edited in this process by the
+    read/edit/write pipeline, with that many threads doing the I/O and
+    edit_threads (default 1) threads sharing each compiled plan.
+
+    Raises PlanValidationError, before any file is touched, if an edit
+    list is bad; pass validated=True if validate_groups has already
+    checked edit_groups.
+    """
+    if not validated:
+        validate_groups(edit_groups, PlanCache.from_env())
+
+    fingerprints = fingerprint_groups(edit_groups)
+    edit_lists = {}
+    for job in jobs:
+        if not job.plan_fingerprint:
+            job.plan_fingerprint = fingerprints[job.series_instance_uid]
+        edit_lists[job.plan_fingerprint] = edit_groups[job.series_instance_uid]
+
+    if journal is not None:
+        journal.load()
+        pending = _pending_jobs(jobs, journal)
+        if len(pending) < len(jobs):
+            logger.info(f"Skipping {len(jobs) - len(pending)} files already done in {journal.path}")
+        jobs = pending
+
+    def record(result: JobResult) -> None:
+        if result.status != "OK":
+            logger.error(f"{result.job.from_file}: {result.message}")
+        if journal is not None and result.job.input_digest:
+            job = result.job
+            journal.record(
+                result.status,
+                job.from_file,
+                job.input_digest,
+                job.plan_fingerprint,
+                job.to_file,
+            )
+
+    if io_threads:
+        from .pipeline import edit_pipelined
+
+        return edit_pipelined(jobs, edit_groups, io_threads, on_result=record, edit_threads=edit_threads or 1)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if memory_budget is None:
+        memory_budget = default_memory_budget()
+    scheduler = MemoryScheduler(memory_budget, workers, _estimate_job, group=lambda job: job.plan_fingerprint)
+
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=_pool_context(),
+        initializer=_init_worker,
+        initargs=(edit_lists,),
+    ) as executor:
+        for result in scheduler.run(executor, _run_job, jobs):
+            record(result)
+            results.append(result)
+
+    return results
+
+def summarize(results: list[JobResult]) -> list[SeriesReport]:
+    """Total up results per series, in the order series first appear.
+
+    Throughput is measured against the time workers spent on the series,
+    so it is comparable between series that ran side by side.
+    """
+    reports: dict[str, SeriesReport] = {}
+    for result in results:
+        uid = result.job.series_instance_uid
+        report = reports.setdefault(uid, SeriesReport(uid, 0, 0, 0, 0.0))
+        report.files += 1
+        report.bytes += result.size
+        report.seconds += result.seconds
+        if result.status != "OK":
+            report.failed += 1
+
+    return list(reports.values())
+
+def print_report(reports: list[SeriesReport], elapsed: float, out=None) -> None:
+    if out is None:
+        out = sys.stdout
+
+    print(f"{'series':<66} {'files':>6} {'failed':>6} {'files/s':>8} {'MB/s':>8}", file=out)
+    for r in reports:
+        print(
+            f"{r.series_instance_uid:<66} {r.files:>6} {r.failed:>6} "
+            f"{r.files_per_second:>8.2f} {r.megabytes_per_second:>8.2f}",
+            file=out,
+        )
+
+    total = sum(r.files for r in reports)
+    failed = sum(r.failed for r in reports)
+    rate = total / elapsed if elapsed else 0.0
+    print(f"{total} files ({failed} failed) in {elapsed:.1f}s, {rate:.2f} files/s", file=out)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="pydicom-background-editor-batch", description=__doc__)
+    parser.add_argument("input", help="Input CSV file with edits")
+    parser.add_argument("output_dir", help="Directory to write edited files to")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--manifest", help="CSV of series_instance_uid,file rows")
+    source.add_argument("--source-dir", help="Directory tree to scan for the series' files")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=parse_size,
+        default=None,
+        help="Memory the running edits may use, e.g. 48G (default: 3/4 of physical memory)",
+    )
+    parser.add_argument(
+        "--io-threads",
+        type=int,
+        default=None,
+        help="Edit in this process, overlapping reads, edits and writes with this many I/O threads",
+    )
+    parser.add_argument(
+        "--edit-threads",
+        type=int,
+        default=None,
+        help="With --io-threads, edit this many files at a time, sharing one plan (default: 1)",
+    )
+    parser.add_argument(
+        "--journal",
+        help="Checkpoint journal; files it records as done are skipped on a rerun",
+    )
+    return parser.parse_args(argv)
+
+def main(argv=None) -> None:
+    configure_logging()
+    args = parse_args(argv)
+
+    edit_groups = read_edit_csv(args.input)
+    try:
+        validate_groups(edit_groups, PlanCache.from_env())
+    except PlanValidationError as e:
+        for issue in e.issues:
+            logger.error(issue)
+        sys.exit(f"{args.input}: {len(e.issues)} problem(s) in the edits, no files were edited")
+
+    # optimize each distinct edit list once, however many series share it
+    sharing: dict[str, list[str]] = defaultdict(list)
+    for series_instance_uid, fingerprint in fingerprint_groups(edit_groups).items():
+        sharing[fingerprint].append(series_instance_uid)
+    for fingerprint, series in sharing.items():
+        _, report = optimize(edit_groups[series[0]])
+        if report.removed or report.fused:
+            logger.info(f"Edits {fingerprint[:12]} for {len(series)} series (first {series[0]}): {report}")
+
+    if args.manifest:
+        files_by_series = resolve_from_manifest(args.manifest)
+    else:
+        files_by_series = resolve_from_directory(args.source_dir)
+
+    try:
+        jobs = build_jobs(edit_groups, files_by_series, args.output_dir)
+    except ValueError as e:
+        sys.exit(f"{e}; no files were edited")
+
+    start = time.perf_counter()
+    if args.journal:
+        with Journal(args.journal) as journal:
+            results = run_batch(
+                jobs,
+                edit_groups,
+                args.workers,
+                journal,
+                args.io_threads,
+                args.memory_budget,
+                args.edit_threads,
+                validated=True,
+            )
+    else:
+        results = run_batch(
+            jobs,
+            edit_groups,
+            args.workers,
+            io_threads=args.io_threads,
+            memory_budget=args.memory_budget,
+            edit_threads=args.edit_threads,
+            validated=True,
+        )
+    print_report(summarize(results), time.perf_counter() - start)
+
+    if any(r.status != "OK" for r in results):
+        sys.exit(1)
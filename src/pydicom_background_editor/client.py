@@ -0,0 +1,48 @@
+"""
+Client for the local edit service.
+
+A drop-in replacement for spawning pydicom-background-editor: it reads the
+same Storable request from stdin, hands it to the service listening on the
+Unix socket, and writes the service's Storable response to stdout. The
+request is forwarded as-is and never decoded.
+"""
+
+import os
+import sys
+import socket
+from storable.output import serialize
+
+from .input import FRAME_HEADER, get_input_bytes, read_frame, error_results
+
+DEFAULT_SOCKET = "/tmp/pydicom-background-editor.sock"
+SOCKET_ENV = "PYDICOM_BACKGROUND_EDITOR_SOCKET"
+
+def request(payload: bytes, socket_path: str | None = None) -> bytes:
+    """Send one encoded Storable request and return the encoded response."""
+    if socket_path is None:
+        socket_path = os.environ.get(SOCKET_ENV, DEFAULT_SOCKET)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(FRAME_HEADER.pack(len(payload)) + payload)
+        sock.shutdown(socket.SHUT_WR)
+
+        response = read_frame(sock.fileno())
+
+    if response is None:
+        raise EOFError("Edit service closed the connection without responding")
+
+    return response
+
+def main() -> None:
+    socket_path = sys.argv[1] if sys.argv[1:] else None
+
+    try:
+        response = request(get_input_bytes(), socket_path)
+    except (OSError, EOFError) as e:
+        sys.stdout.buffer.write(serialize(error_results(f"{type(e).__name__}: {e}")))
+        sys.exit(1)
+
+    # the service answers with a bare payload, the one-shot editor with a
+    # pst0 file, so add the magic back for callers that fd_retrieve it
+    sys.stdout.buffer.write(b"pst0" + response)
@@ -0,0 +1,244 @@
+"""
+Plan-to-Python code generation.
+
+Editor.apply_plan interprets a Plan: every step goes through its handler,
+which walks its path with the general traverse(). For a plan applied to
+tens of thousands of instances, generate_source() instead unrolls the
+plan into the source of one Python function, and compile_function() turns
+that into a callable that edits a dataset exactly as apply_plan would.
+
+A step whose path has only public tags and exact item indices, the
+common case, is inlined as a chain of Dataset.get calls with its tags,
+VR and value as constants. The per-element half of each value edit
+(Editor._replace_string and friends) is still called, so the edits
+themselves can not drift from the interpreter. Any other step (private
+tags, wildcards, copy_from_tag, steps that only warn or raise when they
+are applied) calls its handler, as apply_plan does. The generated code
+skips the handlers' debug logging, and does not build a TagIndex or
+CreatorCache itself, but keeps any attached to the dataset up to date.
+"""
+
+from pydicom.sequence import Sequence as PydicomSequence
+from pydicom.tag import Tag
+
+from .editor import Editor, Plan, PlanStep, EMPTY_SEQUENCE
+from .path import Path, Segment, Sequence, add_tag, sequence_changed, creators_changed
+
+# value edits whose handler, before touching any element, raises if the
+# step's VR is unknown
+_VR_CHECKED = {"string_replace", "substitute"}
+
+def _inlinable_path(path: Path) -> bool:
+    """Whether path is public tags alternating with exact item indices, ending on a tag."""
+    if not path or len(path) % 2 == 0:
+        return False
+    for i, item in enumerate(path):
+        if i % 2 == 0:
+            if not isinstance(item, Segment) or item.is_private:
+                return False
+        elif not isinstance(item, Sequence) or item.wildcard:
+            return False
+    return True
+
+def _inlinable_edit(step: PlanStep) -> bool:
+    """Whether a value-edit step can be applied per element without its handler's checks."""
+    op = step.op.op
+    if op not in Editor._ELEMENT_EDITS:
+        return False
+    if op in _VR_CHECKED and step.vr is None:
+        return False
+    if op == "shift_date" and step.value is None:
+        return False
+    if op == "hash_unhashed_uid" and not step.op.val1:
+        return False
+    return True
+
+def _split_walk(editor: Editor, step: PlanStep) -> tuple[PlanStep | None, tuple[PlanStep, ...]]:
+    """Split a walk step into a walk of the edits that can not be inlined, and those that can.
+
+    Edits in a walk are on paths that can not alias, except for edits on
+    one path, which keep their order; so the edits of a path are inlined
+    together or not at all, and may run after the rest of the walk.
+    """
+    subs = step.value[1]
+    kept_paths = {sub.path for sub in subs if not (_inlinable_path(sub.path) and _inlinable_edit(sub))}
+    rest = tuple(sub for sub in subs if sub.path in kept_paths)
+    inlined = tuple(sub for sub in subs if sub.path not in kept_paths)
+    if not rest:
+        return None, inlined
+    if not inlined:
+        return step, ()
+    return editor._walk_step(rest[0].op, rest), inlined
+
+def _inlinable(step: PlanStep) -> bool:
+    name = step.handler.__name__
+    if name == "_run_walk":
+        return False  # see _split_walk
+    if not _inlinable_path(step.path):
+        return False
+    if name == "_run_fused":
+        return all(_inlinable_edit(sub) for sub in step.value)
+    if name in ("_op_set_tag", "_op_empty_tag"):
+        return step.vr is not None
+    if name == "_op_delete_tag":
+        return True
+    return _inlinable_edit(step)
+
+def _creator(path: Path) -> bool:
+    """Whether an inlinable path ends on a private creator element."""
+    last = path[-1]
+    return Tag(last.group, last.element).is_private_creator
+
+_MISSING = object()  # e's value while a sequence item on the path is missing
+
+class _Writer:
+    def __init__(self, editor: Editor):
+        self.lines: list[str] = []
+        self.namespace: dict = {
+            "editor": editor,
+            "add_tag": add_tag,
+            "sequence_changed": sequence_changed,
+            "creators_changed": creators_changed,
+            "PydicomSequence": PydicomSequence,
+            "MISSING": _MISSING,
+        }
+        self.indent = 1
+
+    def line(self, text: str) -> None:
+        self.lines.append("    " * self.indent + text)
+
+    def constant(self, name: str, value) -> str:
+        self.namespace[name] = value
+        return name
+
+    def open_path(self, n: str, path: Path) -> int:
+        """Emit the get chain down to path's last tag.
+
+        The code emitted after this, until close(), only runs if every
+        item on the way exists, with the last tag's element (or None) in e
+        and the dataset holding it in parent. Returns the number of blocks
+        opened.
+        """
+        self.line("parent = ds")
+        opened = 0
+        for i in range(0, len(path) - 1, 2):
+            segment, item = path[i], path[i + 1]
+            tag = self.constant(f"T{n}_{i}", Tag(segment.group, segment.element))
+            self.line(f"x = parent.get({tag})")
+            self.line(f"if x is not None and len(x.value) > {item.value}:")
+            self.indent += 1
+            opened += 1
+            self.line(f"parent = x.value[{item.value}]")
+
+        last = path[-1]
+        tag = self.constant(f"T{n}", Tag(last.group, last.element))
+        self.line(f"e = parent.get({tag})")
+        return opened
+
+    def close(self, opened: int) -> None:
+        self.indent -= opened
+
+    def element_edits(self, n: str, path: Path, subs) -> None:
+        opened = self.open_path(n, path)
+        self.line("if e is not None:")
+        for j, sub in enumerate(subs):
+            step = self.constant(f"S{n}_{j}", sub)
+            self.line(f"    editor.{Editor._ELEMENT_EDITS[sub.op.op]}(e, {step})")
+        self.close(opened)
+
+    def inline(self, n: str, step: PlanStep) -> None:
+        name = step.handler.__name__
+        self.line(f"# {step.op.op!r} {step.op.tag!r}")
+
+        if name == "_run_fused":
+            self.element_edits(n, step.path, step.value)
+        elif name == "_op_delete_tag":
+            opened = self.open_path(n, step.path)
+            self.line("if e is not None:")
+            self.line("    del parent[e.tag]")
+            self.line('    if e.VR == "SQ":')
+            self.line("        sequence_changed(ds, parent, e.tag)")
+            if _creator(step.path):
+                self.line("    creators_changed(ds)")
+            self.close(opened)
+        elif name in ("_op_set_tag", "_op_empty_tag"):
+            self.set_tag(n, step)
+        else:
+            self.element_edits(n, step.path, (step,))
+
+    def set_tag(self, n: str, step: PlanStep) -> None:
+        if step.value is EMPTY_SEQUENCE:
+            value = "PydicomSequence([])"
+        elif step.handler.__name__ == "_op_empty_tag":
+            value = '""'
+        else:
+            value = self.constant(f"V{n}", step.value)
+        last = step.path[-1]
+        tag = self.constant(f"A{n}", (last.group, last.element))
+        vr = self.constant(f"VR{n}", step.vr)
+
+        creates = step.handler.__name__ == "_op_set_tag" and len(step.path) > 1
+        if creates:
+            self.line("e = MISSING")
+        opened = self.open_path(n, step.path)
+        self.line("if e is not None:")
+        if step.vr == "SQ":
+            self.line(f"    e.value = {value}")
+            self.line("    sequence_changed(ds, parent, e.tag)")
+        elif step.handler.__name__ == "_op_set_tag":
+            self.line('    was_sequence = e.VR == "SQ"')
+            self.line(f"    e.value = {value}")
+            self.line("    if was_sequence:")
+            self.line("        sequence_changed(ds, parent, e.tag)")
+        else:
+            self.line(f"    e.value = {value}")
+            self.line('    if e.VR == "SQ":')
+            self.line("        sequence_changed(ds, parent, e.tag)")
+        self.line("else:")
+        self.line(f"    parent.add_new({tag}, {vr}, {value})")
+        if step.vr == "SQ":
+            self.line(f"    sequence_changed(ds, parent, {self.constant(f'G{n}', Tag(last.group, last.element))})")
+        if _creator(step.path):
+            self.line("creators_changed(ds)")
+        self.close(opened)
+
+        if creates:
+            # set_tag creates the sequences and items missing on the way
+            path = self.constant(f"P{n}", step.path)
+            self.line("if e is MISSING:")
+            self.line(f"    add_tag(ds, {path}, {value}, {vr})")
+
+def generate_source(editor: Editor, plan: Plan, name: str = "apply_plan") -> tuple[str, dict]:
+    """Return the source of a function name(ds) that applies plan, and the globals it needs."""
+    writer = _Writer(editor)
+    for i, step in enumerate(plan):
+        inlined = ()
+        if step.handler.__name__ == "_run_walk":
+            # the walk first, as it checks the VRs of its edits before making any
+            step, inlined = _split_walk(editor, step)
+
+        if step is None:
+            pass
+        elif _inlinable(step):
+            writer.inline(str(i), step)
+        else:
+            step_name = writer.constant(f"S{i}", step)
+            writer.line(f"# {step.op.op!r} {step.op.tag!r}, by its handler")
+            writer.line(f"{step_name}.handler(ds, {step_name})")
+
+        by_path: dict[Path, list[PlanStep]] = {}
+        for sub in inlined:
+            by_path.setdefault(sub.path, []).append(sub)
+        for j, (path, subs) in enumerate(by_path.items()):
+            writer.line(f"# {', '.join(repr(sub.op.op) for sub in subs)} {subs[0].op.tag!r}")
+            writer.element_edits(f"{i}_{j}", path, subs)
+
+    body = writer.lines or ["    pass"]
+    source = "\n".join([f"def {name}(ds):"] + body) + "\n"
+    return source, writer.namespace
+
+def compile_function(editor: Editor, plan: Plan, name: str = "apply_plan"):
+    """Compile plan into a function that takes a Dataset and edits it as apply_plan would."""
+    source, namespace = generate_source(editor, plan, name)
+    exec(compile(source, f"<plan {name}>", "exec"), namespace)
+    return namespace[name]
@@ -0,0 +1,49 @@
+"""
+Private dictionaries used by the editor.
+
+Registering them is deferred until the first private tag lookup, so that
+runs which only touch public tags never pay for it. Anything that looks
+up a private VR, or resolves a private tag in a dataset, should go
+through this module (or call register_private_dictionaries() first).
+"""
+import threading
+from pydicom import datadict
+
+new_dict_items = {
+       0x00130010: ('LO', '1', "Project Name", 'false'),
+       0x00130011: ('LO', '1', "Trial Name", 'false'),
+       0x00130012: ('LO', '1', "Site Name", 'false'),
+       0x00130013: ('LO', '1', "Site Id", 'false'),
+       0x00130014: ('LO', '1', "Visibility", 'false'),
+       0x00130015: ('LO', '1', "Batch", 'false'),
+       0x00130050: ('LO', '1', "Year of Study", 'false'),
+       0x00130051: ('LO', '1', "Year of Diagnosis", 'false'),
+}
+
+_registered = False
+_register_lock = threading.Lock()
+
+def register_private_dictionaries() -> None:
+    """Add our private dictionary entries to pydicom, once per process."""
+    global _registered
+    if _registered:
+        return
+
+    with _register_lock:
+        if not _registered:
+            datadict.add_private_dict_entries("CTP", new_dict_items)
+            _registered = True
+
+def private_dictionary_VR(tag, private_creator: str) -> str:
+    """datadict.private_dictionary_VR, registering our entries first."""
+    register_private_dictionaries()
+    return datadict.private_dictionary_VR(tag, private_creator)
+
+def lookup_vr(segment) -> str:
+    """The dictionary VR of a parsed path Segment, public or private.
+
+    Raises KeyError if the tag is not in the dictionary.
+    """
+    if segment.is_private:
+        return private_dictionary_VR([segment.group, segment.element], segment.owner)
+    return datadict.dictionary_VR([segment.group, segment.element])
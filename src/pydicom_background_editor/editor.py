@@ -1,27 +1,34 @@
 import dataclasses
+import functools
 import hashlib
 import logging
+import sys
 from pydicom import datadict
 from pydicom.dataset import Dataset
 from pydicom.multival import MultiValue
+from pydicom.tag import Tag
 from pydicom.valuerep import MAX_VALUE_LEN
-from .path import traverse, parse, add_tag
+from typing import Any, Callable
+from .path import (
+    Path,
+    PathTrie,
+    Segment,
+    TagIndex,
+    CreatorCache,
+    traverse,
+    iter_traverse,
+    parse,
+    add_tag,
+    paths_may_alias,
+    parse_mask,
+    sequence_changed,
+    creators_changed,
+)
+from .dictionaries import new_dict_items, private_dictionary_VR, lookup_vr
+from .optimize import optimize, fusion_runs, fusable, MASK_OPS
 
 logger = logging.getLogger(__name__)
 
-
-new_dict_items = {
-       0x00130010: ('LO', '1', "Project Name", 'false'),
-       0x00130011: ('LO', '1', "Trial Name", 'false'),
-       0x00130012: ('LO', '1', "Site Name", 'false'),
-       0x00130013: ('LO', '1', "Site Id", 'false'),
-       0x00130014: ('LO', '1', "Visibility", 'false'),
-       0x00130015: ('LO', '1', "Batch", 'false'),
-       0x00130050: ('LO', '1', "Year of Study", 'false'),
-       0x00130051: ('LO', '1', "Year of Diagnosis", 'false'),
-}
-datadict.add_private_dict_entries("CTP", new_dict_items)
-
 def truncate_value(value: str, vr: str) -> str:
     """Truncate a string value to fit within DICOM VR limits, if applicable.
     
@@ -38,12 +45,31 @@ def truncate_value(value: str, vr: str) -> str:
         return value[:max_length]
     return value
 
-@dataclasses.dataclass
+# Op names and tags come from a small vocabulary, so they are interned for
+# good. Values repeat too (empty values, shift days, UID roots), but an edit
+# list with a row per instance also carries a unique UID per row, so values
+# are only shared through a bounded cache rather than kept forever.
+VALUE_CACHE_SIZE = 65536
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+@functools.lru_cache(maxsize=VALUE_CACHE_SIZE)
+def _shared_value(value: str) -> str:
+    return value
+
+def _share(value):
+    return _shared_value(value) if type(value) is str else value
+
+@dataclasses.dataclass(slots=True)
 class Operation():
     op: str
     tag: str
     val1: str
     val2: str
+    # "exact", or "mask" for a tag such as (60xx,3000) that stands for
+    # every tag it matches (see path.TagMask)
+    tag_mode: str = "exact"
 
     @staticmethod
     def _strip_metaquotes(value: str) -> str:
@@ -77,84 +103,370 @@ class Operation():
     @staticmethod
     def from_csv_row(row: dict) -> "Operation":
         return Operation(
-            op=row["op"],
-            tag=row["tag"],
-            val1=Operation._strip_metaquotes(row["val1"]),
-            val2=Operation._strip_metaquotes(row["val2"]),
+            op=_intern(row["op"]),
+            tag=_intern(row["tag"]),
+            val1=_share(Operation._strip_metaquotes(row["val1"])),
+            val2=_share(Operation._strip_metaquotes(row["val2"])),
         )
     
+    def parse_tag(self) -> Path:
+        """This op's tag, parsed as its tag_mode says."""
+        if self.tag_mode == "mask":
+            return parse_mask(self.tag)
+        return parse(self.tag)
+
     @staticmethod
     def translate_edits(raw_edits: list[dict]) -> list["Operation"]:
         operations = []
         for edit in raw_edits:
-            ## TODO probably need to support other modes, but for now this is it
-            if edit['tag_mode'] != 'exact':
+            if edit['tag_mode'] not in ('exact', 'mask'):
                 raise NotImplementedError(f"Unsupported tag_mode: {edit['tag_mode']}")
 
             operation = Operation(
-                op=edit["op"],
-                tag=edit["tag"],
-                val1=edit["arg1"],
-                val2=edit["arg2"]
+                op=_intern(edit["op"]),
+                tag=_intern(edit["tag"]),
+                val1=_share(edit["arg1"]),
+                val2=_share(edit["arg2"]),
+                tag_mode=_intern(edit["tag_mode"]),
             )
             operations.append(operation)
 
         return operations
 
+def plan_digest(operations: list[Operation]) -> str:
+    """Fingerprint of an edit list, which changes if any operation changes.
+
+    Series whose edit lists have the same fingerprint share one list and
+    one compiled plan.
+    """
+    h = hashlib.sha256()
+    for op in operations:
+        fields = (op.op, op.tag, op.val1, op.val2)
+        if op.tag_mode != "exact":
+            # exact ops hash as they did before there were other modes
+            fields += (op.tag_mode,)
+        for field in fields:
+            h.update(str(field).encode())
+            h.update(b"\x1f")
+        h.update(b"\x1e")
+
+    return h.hexdigest()[:32]
+
+# building a TagIndex costs about two scans of every sequence in a dataset
+# (benchmarks/bench_traverse.py), which a plan repays once it has this
+# many wildcard steps to answer
+INDEX_MIN_WILDCARD_STEPS = 4
+
+# stands in for the value of a set_tag that creates an empty sequence; a
+# fresh Sequence is made each time the step runs, since it gets mutated
+EMPTY_SEQUENCE = object()
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class PlanStep:
+    """One compiled operation: everything about it that does not depend on the dataset."""
+    op: Operation
+    handler: Callable[[Dataset, "PlanStep"], None]
+    path: Path  # op.tag, parsed
+    vr: str | None  # VR of the path's final tag, None if it is not in the dictionary
+    value: Any = None  # the op's argument, prepared for its handler
+    source: Path | None = None  # copy_from_tag's source path, or the path above a mask, parsed
+
+class Plan(tuple):
+    """An immutable list of PlanSteps, made by Editor.compile."""
+    __slots__ = ()
+
 class Editor:
+    """Compiles edit lists into Plans and applies them to datasets.
+
+    Thread safety: an Editor holds no state of its own, and a Plan (its
+    PlanSteps, their parsed Paths and any PathTrie) is never modified once
+    compiled, so one Editor and one Plan may be shared by any number of
+    threads, each applying the plan to a different Dataset. Anything made
+    while a step runs, such as the Sequence of an EMPTY_SEQUENCE set_tag,
+    is made fresh for that dataset. Compiling may also run concurrently;
+    the caches it goes through (path.parse, the shared value cache and the
+    private dictionary registration) are safe to use from several threads.
+    A single Dataset must only be edited by one thread at a time.
+    """
+
     def __init__(self):
         pass
 
     def apply_edits(self, ds: Dataset, operations: list[Operation]):
-        for op in operations:
-            op_function = "_op_" + op.op
-            #execute op_function on self
-            getattr(self, op_function)(ds, op)
-
-    def _op_delete_tag(self, ds: Dataset, op: Operation):
-        parsed_path = parse(op.tag)
-        tags = traverse(ds, parsed_path)
+        self.apply_plan(ds, self.compile(operations))
+
+    def apply_plan(self, ds: Dataset, plan: Plan):
+        """Apply plan to ds.
+
+        A plan with several wildcard steps the TagIndex can answer gets
+        one built for ds first, and removed again once the plan is done;
+        likewise for the CreatorCache its private tags are resolved with.
+        """
+        indexed = False
+        if TagIndex.of(ds) is None and self._index_worthwhile(plan):
+            TagIndex.attach(ds)
+            indexed = True
+        cached = False
+        if CreatorCache.of(ds) is None:
+            CreatorCache.attach(ds)
+            cached = True
+
+        try:
+            for step in plan:
+                step.handler(ds, step)
+        finally:
+            if indexed:
+                TagIndex.detach(ds)
+            if cached:
+                CreatorCache.detach(ds)
+
+    @staticmethod
+    def _index_worthwhile(plan: Plan) -> bool:
+        count = 0
+        for step in plan:
+            if TagIndex.answers(step.path) or (step.source is not None and TagIndex.answers(step.source)):
+                count += 1
+                if count >= INDEX_MIN_WILDCARD_STEPS:
+                    return True
+        return False
+
+    def compile(self, operations: list[Operation], optimized: bool = True) -> Plan:
+        """Turn operations into a Plan that can be applied to any number of datasets.
+
+        Each operation's handler is looked up, its tag path parsed, the VR of
+        the tag it writes resolved and its value truncated here, once, rather
+        than for every file. A VR that can not be resolved only raises when
+        the step is applied, as it did before plans were compiled.
+
+        Unless optimized is False, the operations first go through
+        optimize.optimize, each run of value edits on one path becomes a
+        single step that traverses the path once, and runs of value edits on
+        paths that can not reach the same element are merged into a single
+        walk of the dataset along all their paths (see PathTrie).
+        """
+        if not optimized:
+            return Plan(self._compile_step(op) for op in operations)
+
+        operations, report = optimize(operations)
+        if report.removed or report.fused:
+            logger.debug(f"Optimized edit list: {report}")
+
+        steps = []
+        for run in fusion_runs(operations):
+            if len(run) == 1:
+                steps.append(self._compile_step(run[0]))
+            else:
+                fused = tuple(self._compile_step(op) for op in run)
+                steps.append(PlanStep(run[0], self._run_fused, fused[0].path, None, fused))
+        return Plan(self._merge_walks(steps))
+
+    def _walkable(self, step: PlanStep) -> bool:
+        if not step.path or not isinstance(step.path[-1], Segment):
+            return False
+        return step.handler == self._run_fused or (step.op.op in self._ELEMENT_EDITS and fusable(step.op))
+
+    def _merge_walks(self, steps: list[PlanStep]) -> list[PlanStep]:
+        """Merge runs of value-edit steps into steps that walk the dataset once.
+
+        Value edits never add or remove elements, so edits on paths that can
+        not reach the same element may run in any order; a run is cut where
+        a path may alias an earlier, different path in it. Edits on one path
+        end up on one trie leaf, where they keep their order.
+        """
+        merged: list[PlanStep] = []
+        run: list[PlanStep] = []
+
+        def flush():
+            if len(run) > 1:
+                subs = tuple(sub for step in run for sub in (step.value if step.handler == self._run_fused else (step,)))
+                merged.append(self._walk_step(run[0].op, subs))
+            else:
+                merged.extend(run)
+            run.clear()
+
+        for step in steps:
+            if not self._walkable(step):
+                flush()
+                merged.append(step)
+                continue
+
+            if any(other.path != step.path and paths_may_alias(other.path, step.path) for other in run):
+                flush()
+            run.append(step)
+
+        flush()
+        return merged
+
+    def _walk_step(self, op: Operation, subs: tuple[PlanStep, ...]) -> PlanStep:
+        """A step that applies the value-edit steps subs in one walk."""
+        trie = PathTrie()
+        for sub in subs:
+            trie.add(sub.path, (self._ELEMENT_EDITS[sub.op.op], sub))
+        return PlanStep(op, self._run_walk, Path(), None, (trie, subs))
+
+    def _run_walk(self, ds: Dataset, step: PlanStep):
+        """Apply value edits on many paths in one walk of the dataset.
+
+        step.value holds the PathTrie of the edits and their PlanSteps.
+        """
+        trie, subs = step.value
+        for sub in subs:
+            if sub.op.op in ("string_replace", "substitute"):
+                self._step_vr(sub)
+        logger.debug(f"Applying {len(subs)} edits in one walk")
+
+        def visit(element, payloads):
+            for edit, sub in payloads:
+                getattr(self, edit)(element, sub)
+
+        trie.walk(ds, visit)
+
+    def _run_mask(self, ds: Dataset, step: PlanStep):
+        """Delete or empty every element a TagMask matches.
+
+        step.path ends with the mask, and step.source is the rest of it,
+        which leads to the datasets to look in. Unlike their exact forms,
+        masked ops never add anything.
+        """
+        op = step.op
+        mask = step.path[-1]
+        parents = traverse(ds, step.source)
+        logger.debug(f"Applying {op.op} to every tag matching {op.tag}")
+
+        for parent in parents:
+            holder = parent.element
+            if not isinstance(holder, Dataset):
+                continue
+            for tag in mask.select(holder):
+                element = holder[tag]
+                if op.op == "delete_tag":
+                    del holder[tag]
+                else:
+                    element.value = ""
+                if element.VR == "SQ":
+                    sequence_changed(ds, holder, tag)
+                elif tag.is_private_creator:
+                    creators_changed(ds)
+
+    def _compile_step(self, op: Operation) -> PlanStep:
+        if op.tag_mode == "mask":
+            if op.op not in MASK_OPS:
+                raise ValueError(f"{op.op} does not support tag_mode 'mask'")
+            path = parse_mask(op.tag)
+            return PlanStep(op, self._run_mask, path, None, source=Path(path[:-1]))
+        handler = getattr(self, "_op_" + op.op)
+        path = parse(op.tag)
+
+        vr = None
+        if path:
+            if op.op == "string_replace" and path[-1].is_private:
+                # TODO: we likely need to handle this better
+                vr = 'UN'
+            else:
+                try:
+                    vr = lookup_vr(path[-1])
+                except KeyError:
+                    pass
+
+        value = None
+        source = None
+        if op.op == "set_tag" and vr is not None:
+            if vr == 'SQ' and (op.val1 == "" or op.val1 is None):
+                value = EMPTY_SEQUENCE
+            elif path[-1].is_private:
+                value = op.val1
+            else:
+                value = truncate_value(op.val1, vr)
+        elif op.op == "substitute" and vr is not None:
+            value = truncate_value(op.val2, vr)
+        elif op.op == "shift_date":
+            try:
+                value = int(op.val1)
+            except (ValueError, TypeError):
+                pass
+        elif op.op == "copy_from_tag" and op.val1:
+            source_path_str = op.val1
+            if source_path_str.startswith("<") and source_path_str.endswith(">"):
+                source_path_str = source_path_str[1:-1]
+            try:
+                source = parse(f"<{source_path_str}>")
+            except Exception:
+                pass  # reported when the step is applied
+
+        return PlanStep(op, handler, path, vr, value, source)
+
+    # the per-element half of each value edit, used by fused steps
+    _ELEMENT_EDITS = {
+        "string_replace": "_replace_string",
+        "substitute": "_substitute",
+        "shift_date": "_shift_date",
+        "hash_unhashed_uid": "_hash_uid",
+    }
+
+    def _run_fused(self, ds: Dataset, step: PlanStep):
+        """Apply a run of value edits on one path, in order, with a single traversal.
+
+        step.value holds the PlanSteps of the run. Value edits never add or
+        remove elements, so each element can take every edit in turn.
+        """
+        edits = []
+        for sub in step.value:
+            if sub.op.op in ("string_replace", "substitute"):
+                self._step_vr(sub)
+            edits.append((getattr(self, self._ELEMENT_EDITS[sub.op.op]), sub))
+
+        tags = traverse(ds, step.path)
+        logger.debug(f"Applying {len(edits)} fused edits to tag {step.op.tag}")
+
+        for tag in tags:
+            if tag.element is not None:
+                for edit, sub in edits:
+                    edit(tag.element, sub)
+
+    def _step_vr(self, step: PlanStep) -> str:
+        """The step's VR, raising the dictionary's KeyError if it has none."""
+        if step.vr is None:
+            return lookup_vr(step.path[-1])
+        return step.vr
+
+    def _op_delete_tag(self, ds: Dataset, step: PlanStep):
+        op = step.op
+        tags = traverse(ds, step.path)
         logger.debug(f"Deleting tag {op.tag}")
 
         for tag in tags:
             if tag.element is not None:
                 del tag.ds_chain[-1][tag.element.tag]
+                if tag.element.VR == "SQ":
+                    sequence_changed(ds, tag.ds_chain[-1], tag.element.tag)
+                elif tag.element.tag.is_private_creator:
+                    creators_changed(ds)
 
-    def _op_set_tag(self, ds: Dataset, op: Operation):
+    def _op_set_tag(self, ds: Dataset, step: PlanStep):
         # use traverse_path to find the actual tag to edit
         from pydicom.sequence import Sequence as PydicomSequence
         
-        parsed_path = parse(op.tag)
-        tags = traverse(ds, parsed_path)
+        op = step.op
+        tags = traverse(ds, step.path)
         logger.debug(f"Setting tag {op.tag} to {op.val1}")
 
-        last_segment = parsed_path[-1]
+        last_segment = step.path[-1]
+        new_vr = self._step_vr(step)
 
-        if last_segment.is_private:
-            new_vr = datadict.private_dictionary_VR([last_segment.group, last_segment.element], last_segment.owner) # type: ignore
-            # Handle sequence VR specially
-            if new_vr == 'SQ' and (op.val1 == "" or op.val1 is None):
-                new_value = PydicomSequence([])
-            else:
-                new_value = op.val1
+        # Handle sequence VR specially
+        if step.value is EMPTY_SEQUENCE:
+            new_value = PydicomSequence([])
         else:
-            new_vr = datadict.dictionary_VR([last_segment.group, last_segment.element]) # type: ignore
-            # Handle sequence VR specially
-            if new_vr == 'SQ' and (op.val1 == "" or op.val1 is None):
-                new_value = PydicomSequence([])
-            else:
-                new_value = truncate_value(op.val1, new_vr)
+            new_value = step.value
 
         # If tags is empty, the tag doesn't exist and needs to be added
         if not tags:
             # Need to find the parent location(s) where we should add the tag
-            # Make a copy of the path to avoid mutation issues
-            parent_path = parse(op.tag)
-            parent_path.pop()  # Remove the last segment (the tag to add)
+            parent_path = step.path[:-1]
             
             # If parent_path is empty, add to root
             if not parent_path:
-                add_tag(ds, parse(op.tag), new_value, new_vr)
+                add_tag(ds, step.path, new_value, new_vr)
             else:
                 # Traverse to parent location(s)
                 parent_locs = traverse(ds, parent_path)
@@ -163,20 +475,28 @@ class Editor:
                 for parent in parent_locs:
                     if parent.element is not None:
                         parent.element.add_new((last_segment.group, last_segment.element), new_vr, new_value)
+                        if new_vr == "SQ":
+                            sequence_changed(ds, parent.element, Tag(last_segment.group, last_segment.element))
+                        elif Tag(last_segment.group, last_segment.element).is_private_creator:
+                            creators_changed(ds)
                 
                 # If no parents found, try add_tag as a fallback
                 if not parent_locs:
-                    add_tag(ds, parse(op.tag), new_value, new_vr)
+                    add_tag(ds, step.path, new_value, new_vr)
         else:
             for tag in tags:
                 if tag is not None and tag.element is not None:
+                    was_sequence = tag.element.VR == "SQ"
                     tag.element.value = new_value
+                    if was_sequence or new_vr == "SQ":
+                        sequence_changed(ds, tag.ds_chain[-1], tag.element.tag)
+                    elif tag.element.tag.is_private_creator:
+                        creators_changed(ds)
                 else:
                     # the tag was not present in the dataset, so we must add it
-                    # Make a fresh copy of the path to avoid mutation issues
-                    add_tag(ds, parse(op.tag), new_value, new_vr)
+                    add_tag(ds, step.path, new_value, new_vr)
 
-    def _op_string_replace(self, ds: Dataset, op: Operation):
+    def _op_string_replace(self, ds: Dataset, step: PlanStep):
         """Replace substring in tag value(s).
         
         Traverses to the target tag(s) and replaces all occurrences of val1 with val2.
@@ -186,43 +506,43 @@ class Editor:
         
         Args:
             ds: The DICOM dataset to modify
-            op: Operation containing tag path, val1 (search), and val2 (replace)
+            step: PlanStep of an Operation containing tag path, val1 (search), and val2 (replace)
         """
-        parsed_path = parse(op.tag)
-        tags = traverse(ds, parsed_path)
+        op = step.op
+        tags = traverse(ds, step.path)
         logger.debug(f"String Replacing tag {op.tag} from {op.val1} to {op.val2}")
 
-        last_segment = parsed_path[-1]
-
-        if last_segment.is_private:
-            # TODO: we likely need to handle this better
-            current_vr = 'UN'
-        else:
-            current_vr = datadict.dictionary_VR([last_segment.group, last_segment.element]) # type: ignore
+        self._step_vr(step)
         
         for tag in tags:
             if tag.element is not None:
-                current_value = tag.element.value
-                if op.val1 not in str(current_value):
-                    continue  # No occurrence to replace
-                
-                # Handle multi-valued fields (lists/MultiValue)
-                if isinstance(current_value, (list, MultiValue)):
-                    # Perform replacement on each value
-                    new_list = [str(v).replace(op.val1, op.val2) for v in current_value]
-                    # Preserve MultiValue type if original was MultiValue
-                    if isinstance(current_value, MultiValue):
-                        new_value = type(current_value)(str, new_list)
-                    else:
-                        new_value = new_list
-                else:
-                    # Single value - convert to string for replacement
-                    replaced_value = str(current_value).replace(op.val1, op.val2)
-                    new_value = truncate_value(replaced_value, current_vr)
-                
-                tag.element.value = new_value
+                self._replace_string(tag.element, step)
+
+    def _replace_string(self, element, step: PlanStep):
+        """Apply a string_replace step to one element."""
+        op = step.op
+        current_vr = step.vr
+        current_value = element.value
+        if op.val1 not in str(current_value):
+            return  # No occurrence to replace
+        
+        # Handle multi-valued fields (lists/MultiValue)
+        if isinstance(current_value, (list, MultiValue)):
+            # Perform replacement on each value
+            new_list = [str(v).replace(op.val1, op.val2) for v in current_value]
+            # Preserve MultiValue type if original was MultiValue
+            if isinstance(current_value, MultiValue):
+                new_value = type(current_value)(str, new_list)
+            else:
+                new_value = new_list
+        else:
+            # Single value - convert to string for replacement
+            replaced_value = str(current_value).replace(op.val1, op.val2)
+            new_value = truncate_value(replaced_value, current_vr)
+        
+        element.value = new_value
 
-    def _op_empty_tag(self, ds: Dataset, op: Operation):
+    def _op_empty_tag(self, ds: Dataset, step: PlanStep):
         """Set tag value to empty string.
         
         Traverses to the target tag(s) and sets their value to an empty string.
@@ -231,27 +551,26 @@ class Editor:
         
         Args:
             ds: The DICOM dataset to modify
-            op: Operation containing tag path (val1 and val2 are ignored)
+            step: PlanStep of an Operation containing tag path (val1 and val2 are ignored)
         """
-        parsed_path = parse(op.tag)
-        tags = traverse(ds, parsed_path)
+        op = step.op
+        tags = traverse(ds, step.path)
         logger.debug(f"Emptying tag {op.tag}")
 
-        last_segment = parsed_path[-1]
-
-        if last_segment.is_private:
-            new_vr = datadict.private_dictionary_VR([last_segment.group, last_segment.element], last_segment.owner) # type: ignore
-        else:
-            new_vr = datadict.dictionary_VR([last_segment.group, last_segment.element]) # type: ignore
+        new_vr = self._step_vr(step)
 
         for tag in tags:
             if tag.element is not None:
                 tag.element.value = ""
+                if tag.element.VR == "SQ":
+                    sequence_changed(ds, tag.ds_chain[-1], tag.element.tag)
+                elif tag.element.tag.is_private_creator:
+                    creators_changed(ds)
             else:
                 # the tag was not present in the dataset, so we must add it
-                add_tag(ds, parsed_path, "", new_vr)
+                add_tag(ds, step.path, "", new_vr)
 
-    def _op_substitute(self, ds: Dataset, op: Operation):
+    def _op_substitute(self, ds: Dataset, step: PlanStep):
         """Conditionally replace tag value only if it matches val1.
         
         Traverses to the target tag(s) and replaces the value with val2 only if
@@ -262,51 +581,51 @@ class Editor:
         
         Args:
             ds: The DICOM dataset to modify
-            op: Operation containing tag path, val1 (match value), and val2 (replacement)
+            step: PlanStep of an Operation containing tag path, val1 (match value),
+                and val2 (replacement, already truncated for the tag's VR)
         """
-        parsed_path = parse(op.tag)
-        tags = traverse(ds, parsed_path)
+        op = step.op
+        tags = traverse(ds, step.path)
         logger.debug(f"Substituting tag {op.tag}: {op.val1} -> {op.val2}")
 
-        last_segment = parsed_path[-1]
-
-        if last_segment.is_private:
-            new_vr = datadict.private_dictionary_VR([last_segment.group, last_segment.element], last_segment.owner) # type: ignore
-        else:
-            new_vr = datadict.dictionary_VR([last_segment.group, last_segment.element]) # type: ignore
+        self._step_vr(step)
 
         for tag in tags:
             if tag.element is not None:
-                current_value = tag.element.value
-                
-                # Handle multi-valued fields (lists/MultiValue)
-                if isinstance(current_value, (list, MultiValue)):
-                    # Check if any value in the list matches val1
-                    # Replace matching values with val2
-                    new_list = []
-                    modified = False
-                    for v in current_value:
-                        if str(v) == op.val1:
-                            new_list.append(op.val2)
-                            modified = True
-                        else:
-                            new_list.append(v)
-                    
-                    if modified:
-                        # Preserve MultiValue type if original was MultiValue
-                        if isinstance(current_value, MultiValue):
-                            new_value = type(current_value)(str, new_list)
-                        else:
-                            new_value = new_list
-                        tag.element.value = new_value
-                else:
-                    # Single value - check for exact match
-                    if str(current_value) == op.val1:
-                        new_value = truncate_value(op.val2, new_vr)
-                        tag.element.value = new_value
+                self._substitute(tag.element, step)
             # If tag doesn't exist, do nothing (unlike set_tag or empty_tag)
 
-    def _op_shift_date(self, ds: Dataset, op: Operation):
+    def _substitute(self, element, step: PlanStep):
+        """Apply a substitute step to one element."""
+        op = step.op
+        current_value = element.value
+        
+        # Handle multi-valued fields (lists/MultiValue)
+        if isinstance(current_value, (list, MultiValue)):
+            # Check if any value in the list matches val1
+            # Replace matching values with val2
+            new_list = []
+            modified = False
+            for v in current_value:
+                if str(v) == op.val1:
+                    new_list.append(op.val2)
+                    modified = True
+                else:
+                    new_list.append(v)
+            
+            if modified:
+                # Preserve MultiValue type if original was MultiValue
+                if isinstance(current_value, MultiValue):
+                    new_value = type(current_value)(str, new_list)
+                else:
+                    new_value = new_list
+                element.value = new_value
+        else:
+            # Single value - check for exact match
+            if str(current_value) == op.val1:
+                element.value = step.value
+
+    def _op_shift_date(self, ds: Dataset, step: PlanStep):
         """Shift a date value forward or backward by a number of days.
         
         Traverses to the target tag(s) and shifts date values by the number of days
@@ -320,81 +639,85 @@ class Editor:
         
         Args:
             ds: The DICOM dataset to modify
-            op: Operation containing tag path and val1 (number of days to shift, can be negative)
+            step: PlanStep of an Operation containing tag path and val1 (number of
+                days to shift, can be negative), with the days parsed into step.value
         """
-        from datetime import datetime, timedelta
-        
-        parsed_path = parse(op.tag)
-        tags = traverse(ds, parsed_path)
-        
-        try:
-            days_to_shift = int(op.val1)
-        except (ValueError, TypeError):
+        op = step.op
+        days_to_shift = step.value
+        if days_to_shift is None:
             logger.warning(f"Invalid days value for shift_date: {op.val1}")
             return
+
+        tags = traverse(ds, step.path)
         
         logger.debug(f"Shifting date tag {op.tag} by {days_to_shift} days")
 
         for tag in tags:
-            if tag.element is None:
-                continue
-            
-            vr = tag.element.VR
-            
-            # Only process date-related VRs
-            if vr not in ('DA', 'DT'):
-                logger.warning(f"Tag {tag.element.tag} has VR {vr}, not a date type (DA or DT). Skipping.")
-                continue
-            
-            current_value = str(tag.element.value)
-            
-            try:
-                if vr == 'DA':
-                    # DICOM Date format: YYYYMMDD
-                    if len(current_value) < 8:
-                        logger.warning(f"Invalid DA format: {current_value}. Expected YYYYMMDD.")
-                        continue
-                    
-                    # Parse the date (take first 8 characters)
-                    date_str = current_value[:8]
-                    date_obj = datetime.strptime(date_str, '%Y%m%d')
-                    
-                    # Shift the date
-                    new_date = date_obj + timedelta(days=days_to_shift)
-                    
-                    # Format back to DICOM DA format
-                    new_value = new_date.strftime('%Y%m%d')
-                    
-                    # Preserve any additional characters after the date (though unusual for DA)
-                    if len(current_value) > 8:
-                        new_value += current_value[8:]
-                    
-                    tag.element.value = new_value
+            if tag.element is not None:
+                self._shift_date(tag.element, step)
+
+    def _shift_date(self, element, step: PlanStep):
+        """Apply a shift_date step to one element."""
+        from datetime import datetime, timedelta
+
+        days_to_shift = step.value
+        
+        vr = element.VR
+        
+        # Only process date-related VRs
+        if vr not in ('DA', 'DT'):
+            logger.warning(f"Tag {element.tag} has VR {vr}, not a date type (DA or DT). Skipping.")
+            return
+        
+        current_value = str(element.value)
+        
+        try:
+            if vr == 'DA':
+                # DICOM Date format: YYYYMMDD
+                if len(current_value) < 8:
+                    logger.warning(f"Invalid DA format: {current_value}. Expected YYYYMMDD.")
+                    return
                 
-                elif vr == 'DT':
-                    # DICOM DateTime format: YYYYMMDDHHMMSS.FFFFFF&ZZXX
-                    # We only shift the date portion (first 8 characters)
-                    if len(current_value) < 8:
-                        logger.warning(f"Invalid DT format: {current_value}. Expected at least YYYYMMDD.")
-                        continue
-                    
-                    # Parse the date portion (first 8 characters)
-                    date_str = current_value[:8]
-                    date_obj = datetime.strptime(date_str, '%Y%m%d')
-                    
-                    # Shift the date
-                    new_date = date_obj + timedelta(days=days_to_shift)
-                    
-                    # Format back to DICOM format, preserving time and timezone info
-                    new_value = new_date.strftime('%Y%m%d') + current_value[8:]
-                    
-                    tag.element.value = new_value
+                # Parse the date (take first 8 characters)
+                date_str = current_value[:8]
+                date_obj = datetime.strptime(date_str, '%Y%m%d')
+                
+                # Shift the date
+                new_date = date_obj + timedelta(days=days_to_shift)
+                
+                # Format back to DICOM DA format
+                new_value = new_date.strftime('%Y%m%d')
+                
+                # Preserve any additional characters after the date (though unusual for DA)
+                if len(current_value) > 8:
+                    new_value += current_value[8:]
+                
+                element.value = new_value
             
-            except (ValueError, IndexError) as e:
-                logger.warning(f"Failed to parse or shift date value '{current_value}': {e}")
-                continue
+            elif vr == 'DT':
+                # DICOM DateTime format: YYYYMMDDHHMMSS.FFFFFF&ZZXX
+                # We only shift the date portion (first 8 characters)
+                if len(current_value) < 8:
+                    logger.warning(f"Invalid DT format: {current_value}. Expected at least YYYYMMDD.")
+                    return
+                
+                # Parse the date portion (first 8 characters)
+                date_str = current_value[:8]
+                date_obj = datetime.strptime(date_str, '%Y%m%d')
+                
+                # Shift the date
+                new_date = date_obj + timedelta(days=days_to_shift)
+                
+                # Format back to DICOM format, preserving time and timezone info
+                new_value = new_date.strftime('%Y%m%d') + current_value[8:]
+                
+                element.value = new_value
+        
+        except (ValueError, IndexError) as e:
+            logger.warning(f"Failed to parse or shift date value '{current_value}': {e}")
+            return
 
-    def _op_copy_from_tag(self, ds: Dataset, op: Operation):
+    def _op_copy_from_tag(self, ds: Dataset, step: PlanStep):
         """Copy value from source tag to destination tag.
         
         Copies the value from the tag specified in val1 (source) to the tag specified
@@ -408,52 +731,36 @@ class Editor:
         
         Args:
             ds: The DICOM dataset to modify
-            op: Operation containing:
+            step: PlanStep of an Operation containing:
                 - tag: destination path
-                - val1: source tag path (in meta-quoted form like "<(0010,0010)>")
+                - val1: source tag path (in meta-quoted form like "<(0010,0010)>"),
+                  parsed into step.source
                 - val2: unused
         """
-        # Parse and traverse the source path (val1)
+        op = step.op
         source_path_str = op.val1
         if not source_path_str:
             logger.warning(f"copy_from_tag requires val1 to specify source tag path")
             return
         
-        # Strip meta-quotes from source path if present
-        if source_path_str.startswith("<") and source_path_str.endswith(">"):
-            source_path_str = source_path_str[1:-1]
-        
-        try:
-            source_parsed = parse(f"<{source_path_str}>")
-        except Exception as e:
-            logger.warning(f"Failed to parse source path '{source_path_str}': {e}")
+        if step.source is None:
+            logger.warning(f"Failed to parse source path '{source_path_str}'")
             return
         
-        source_tags = traverse(ds, source_parsed)
-        
-        # Check if we found any source tags
-        valid_sources = [t for t in source_tags if t.element is not None]
-        if not valid_sources:
+        # Take the first matching source tag; the traversal stops there
+        source_tag = next((t for t in iter_traverse(ds, step.source) if t.element is not None), None)
+        if source_tag is None:
             logger.warning(f"Source tag {source_path_str} not found, cannot copy")
             return
         
-        # Take the first matching source tag
-        source_tag = valid_sources[0]
         source_value = source_tag.element.value
         source_vr = source_tag.element.VR
         
         logger.debug(f"Copying from {source_path_str} (VR={source_vr}, value={source_value}) to {op.tag}")
         
-        # Parse and traverse the destination path
-        dest_parsed = parse(op.tag)
-        dest_tags = traverse(ds, dest_parsed)
-        
-        # Determine the destination VR
-        dest_segment = dest_parsed[-1]
-        if dest_segment.is_private:
-            dest_vr = datadict.private_dictionary_VR([dest_segment.group, dest_segment.element], dest_segment.owner) # type: ignore
-        else:
-            dest_vr = datadict.dictionary_VR([dest_segment.group, dest_segment.element]) # type: ignore
+        # Traverse the destination path
+        dest_tags = traverse(ds, step.path)
+        dest_vr = self._step_vr(step)
         
         # Convert value to destination VR
         try:
@@ -467,11 +774,15 @@ class Editor:
         for dest_tag in dest_tags:
             if dest_tag.element is not None:
                 dest_tag.element.value = converted_value
+                if dest_tag.element.VR == "SQ":
+                    sequence_changed(ds, dest_tag.ds_chain[-1], dest_tag.element.tag)
+                elif dest_tag.element.tag.is_private_creator:
+                    creators_changed(ds)
             else:
                 # Destination tag doesn't exist, create it
-                add_tag(ds, dest_parsed, converted_value, dest_vr)
+                add_tag(ds, step.path, converted_value, dest_vr)
 
-    def _op_hash_unhashed_uid(self, ds: Dataset, op: Operation):
+    def _op_hash_unhashed_uid(self, ds: Dataset, step: PlanStep):
         """Hash UIDs that don't already start with the specified root.
         
         Traverses to the target tag(s) and checks each UID value:
@@ -486,48 +797,50 @@ class Editor:
         
         Args:
             ds: The DICOM dataset to modify
-            op: Operation containing:
+            step: PlanStep of an Operation containing:
                 - tag: path to UID tag(s)
                 - val1: uid_root to use for hashing (and to check if already hashed)
                 - val2: unused
         """
+        op = step.op
         uid_root = op.val1
         if not uid_root:
             logger.warning(f"hash_unhashed_uid requires val1 to specify uid_root")
             return
         
-        parsed_path = parse(op.tag)
-        tags = traverse(ds, parsed_path)
+        tags = traverse(ds, step.path)
         
         logger.debug(f"Hashing unhashed UIDs in {op.tag} with root {uid_root}")
         
         for tag in tags:
-            if tag.element is None:
-                continue
-            
-            current_value = tag.element.value
-            
-            # Check if value is empty or null
-            if not current_value or current_value == "":
-                logger.debug(f"Skipping empty UID at {tag.element.tag}")
-                continue
-            
-            # Convert to string for comparison
-            value_str = str(current_value)
-            
-            # Check if already hashed (starts with uid_root)
-            if value_str.startswith(uid_root):
-                logger.debug(f"UID {value_str} already starts with root {uid_root}, skipping")
-                continue
-            
-            # Hash the UID
-            try:
-                hashed_value = hash_uid(value_str, uid_root)
-                logger.debug(f"Hashing UID {value_str} -> {hashed_value}")
-                tag.element.value = hashed_value
-            except Exception as e:
-                logger.warning(f"Failed to hash UID '{value_str}': {e}")
-                continue
+            if tag.element is not None:
+                self._hash_uid(tag.element, step)
+
+    def _hash_uid(self, element, step: PlanStep):
+        """Apply a hash_unhashed_uid step to one element."""
+        uid_root = step.op.val1
+        current_value = element.value
+        
+        # Check if value is empty or null
+        if not current_value or current_value == "":
+            logger.debug(f"Skipping empty UID at {element.tag}")
+            return
+        
+        # Convert to string for comparison
+        value_str = str(current_value)
+        
+        # Check if already hashed (starts with uid_root)
+        if value_str.startswith(uid_root):
+            logger.debug(f"UID {value_str} already starts with root {uid_root}, skipping")
+            return
+        
+        # Hash the UID
+        try:
+            hashed_value = hash_uid(value_str, uid_root)
+            logger.debug(f"Hashing UID {value_str} -> {hashed_value}")
+            element.value = hashed_value
+        except Exception as e:
+            logger.warning(f"Failed to hash UID '{value_str}': {e}")
 
     def _convert_value_for_vr(self, value, source_vr: str, dest_vr: str):
         """Convert a value from one VR to another.
@@ -3,54 +3,233 @@ Module to handle reading of Storable data from stdin.
 
 It has to handle situations where it may take a few seconds for data
 to be ready, and most importantly it needs to be able to read bytes
-from stdin without blocking, because the calling script will not close
-stdout when it is finished.
-
-There might be better ways to do this, or other improvements to be had.
+from stdin without waiting for EOF, because the calling script will not
+close stdout when it is finished. The Storable value is decoded straight
+off the file descriptor as it arrives. Input is read in chunks, so bytes
+the sender writes after the value may be consumed too; a process only
+ever reads one request from stdin this way.
 """
 import os
 import sys
 import select
-from storable.core import thaw
+import struct
+from storable.core import thaw, deserialize
 from storable.output import serialize
 
 TIMEOUT = 15  # seconds
 
-def get_input_data() -> None:
-    fd = sys.stdin.fileno()
+# Worker mode frames every request and response with a 4-byte
+# big-endian length, i.e. Perl's pack("N", length($frozen)) . $frozen
+FRAME_HEADER = struct.Struct("!I")
+
+CHUNK_SIZE = 64 * 1024  # bytes asked of the OS per read
+
+class StreamReader:
+    """File-like reader over a raw fd, for storable's deserialize().
+
+    The decoder is handed exactly the bytes it asks for each item, so the
+    whole Storable value is decoded however many writes the sender split
+    it into, and however large it is. The fd is read up to CHUNK_SIZE
+    bytes at a time (more for an item larger than that), so a read may
+    return bytes past the end of the value, and the reader holds the
+    current item plus about one chunk of raw input. Reads only wait for
+    data the decoder still needs, so the sender never has to close its
+    end.
+
+    Only seeking back within the most recent chunk is supported, which
+    is all deserialize() needs to check for the pst0 file magic.
+    """
+
+    def __init__(self, fd: int, timeout: float = TIMEOUT, keep: bool = False):
+        self.fd = fd
+        self.timeout = timeout
+        self._buffer = bytearray()
+        self._offset = 0  # start of the unread part of _buffer
+        self._position = 0  # bytes consumed from the stream so far
+        self._kept = bytearray() if keep else None
+
+    def _fill(self, size: int) -> None:
+        while len(self._buffer) - self._offset < size:
+            ready, _, _ = select.select([self.fd], [], [], self.timeout)
+            if not ready:
+                raise TimeoutError(f"No input received within {self.timeout} seconds.")
+
+            missing = size - (len(self._buffer) - self._offset)
+            chunk = os.read(self.fd, max(CHUNK_SIZE, missing))
+            if not chunk:
+                raise EOFError(f"Input closed {missing} bytes short of a complete Storable value")
+
+            if self._offset:
+                # drop what has been consumed, keeping the last chunk for seek()
+                keep_from = max(0, self._offset - CHUNK_SIZE)
+                del self._buffer[:keep_from]
+                self._offset -= keep_from
+            self._buffer += chunk
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0:
+            raise ValueError("StreamReader can only read a known number of bytes")
+
+        self._fill(size)
+        end = self._offset + size
+        data = bytes(self._buffer[self._offset:end])
+        self._offset = end
+        self._position += size
+        if self._kept is not None:
+            self._kept += data
+
+        return data
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, position: int) -> int:
+        back = self._position - position
+        if not 0 <= back <= self._offset:
+            raise OSError("StreamReader can only seek back within the current chunk")
+
+        self._offset -= back
+        self._position = position
+        if self._kept is not None:
+            del self._kept[len(self._kept) - back:]
+
+        return position
+
+    def kept(self) -> bytes:
+        """Return every byte consumed so far, if created with keep=True."""
+        return bytes(self._kept)
+
+def get_input_bytes() -> bytes:
+    """Read one complete Storable request from stdin, still encoded."""
+    reader = StreamReader(sys.stdin.fileno(), keep=True)
+    deserialize(reader)
+
+    return reader.kept()
+
+def get_input_data() -> dict:
+    """Read and decode one complete Storable request from stdin.
+
+    Waits up to TIMEOUT seconds for the data to start, and for each
+    following piece of it; the sender does not have to close stdin.
+    """
+    # deserialize using storable, which skips the pst0 file magic itself
+    return deserialize(StreamReader(sys.stdin.fileno()))
+
+def _read_exactly(fd: int, size: int) -> bytes:
+    """Read exactly size bytes from fd, returning fewer only at EOF."""
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = os.read(fd, remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+
+    return b"".join(chunks)
+
+def read_frame(fd: int) -> bytes | None:
+    """Read the payload of one length-framed Storable request from fd.
+
+    Returns None when the stream is closed cleanly between frames. The
+    payload is returned undecoded so a bad request can be answered with
+    an error without losing our place in the stream.
+
+    Raises:
+        EOFError: If the stream ends in the middle of a frame
+    """
+    header = _read_exactly(fd, FRAME_HEADER.size)
+    if not header:
+        return None
+    if len(header) < FRAME_HEADER.size:
+        raise EOFError("Input closed inside a frame header")
+
+    (size,) = FRAME_HEADER.unpack(header)
+    payload = _read_exactly(fd, size)
+    if len(payload) < size:
+        raise EOFError(f"Input closed after {len(payload)} of {size} frame bytes")
+
+    return payload
+
+def decode_frame(payload: bytes) -> dict:
+    return thaw(payload)
+
+def write_frame(results: dict, stream=None) -> None:
+    """Write results as one length-framed Storable response."""
+    if stream is None:
+        stream = sys.stdout.buffer
+
+    # no pst0 file magic, so the Perl side can thaw() the payload directly
+    encoded = serialize(results, pst_prefix=False)
+    stream.write(FRAME_HEADER.pack(len(encoded)) + encoded)
+    stream.flush()
+
+def requested_files(data: dict) -> list[tuple[str, str]] | None:
+    """Return the (from_file, to_file) pairs of a multi-file request.
+
+    A multi-file request carries one "edits" list plus a "files" list of
+    [from_file, to_file] pairs, instead of a single from_file/to_file.
+    Returns None for a single-file request.
+    """
+    if "files" not in data:
+        return None
+
+    pairs = []
+    for pair in data["files"]:
+        from_file, to_file = pair
+        pairs.append((from_file, to_file))
+
+    return pairs
+
+def error_results(message: str) -> dict:
+    results = {}
 
-    ready, _, _ = select.select([fd], [], [], TIMEOUT)
+    results['Status'] = 'Error'
+    results['message'] = message
 
-    if not ready:
-        raise TimeoutError(f"No input received within {TIMEOUT} seconds.")
+    return results
 
-    # read binary data from stdin
-    # TODO: might need to use os.read(fd, n) instead, where n is a max size
-    # input_data = sys.stdin.read()
+def ok_results(tdata) -> dict:
+    results = {}
 
-    input_data = os.read(fd, 10**7)  # read up to 10 MB
+    ## an success
+    results['Status'] = 'OK'
+    results['from_file'] = tdata['from_file']
+    results['to_file'] = tdata['to_file']
+
+    return results
 
-    # deserialize using storable
-    data = thaw(input_data[4:])  # skip first 4 bytes (storable header)
+def file_error_results(from_file: str, to_file: str, message: str) -> dict:
+    results = error_results(message)
+    results['from_file'] = from_file
+    results['to_file'] = to_file
 
-    return data
+    return results
 
-def respond_error():
+def batch_results(file_results: list[dict]) -> dict:
+    """Aggregate per-file results into the response to a multi-file request.
+
+    The overall Status is OK only if every file was edited; "files" holds
+    one result per requested file, in request order.
+    """
     results = {}
 
-    results['Status'] = 'Error'
-    results['message'] = 'no data was read'
+    failed = sum(1 for r in file_results if r['Status'] != 'OK')
+    if failed:
+        results['Status'] = 'Error'
+        results['message'] = f"{failed} of {len(file_results)} files failed"
+    else:
+        results['Status'] = 'OK'
+    results['files'] = file_results
 
+    return results
+
+def respond(results: dict):
     encoded = serialize(results)
     sys.stdout.buffer.write(encoded)
 
-def respond_ok(tdata):
-    results = {}
-
-    ## an success
-    results['Status'] = 'OK'
-    results['from_file'] = tdata['from_file']
-    results['to_file'] = tdata['to_file']
+def respond_error(message: str = 'no data was read'):
+    respond(error_results(message))
 
-    encoded = serialize(results)
-    sys.stdout.buffer.write(encoded)
\ No newline at end of file
+def respond_ok(tdata):
+    respond(ok_results(tdata))
\ No newline at end of file
@@ -0,0 +1,88 @@
+"""
+Append-only checkpoint journal for batch runs.
+
+Every finished file is recorded as one tab-separated line:
+
+    status  input_digest  plan_digest  to_file  from_file
+
+A restarted run loads the journal and skips any file whose latest entry
+is OK for the same input, the same plan, and an output that still
+exists, so a killed run picks up where it stopped.
+
+Each entry is written with a single write() to a file opened with
+O_APPEND, so any number of processes can append to one journal without
+interleaving lines, and nothing is ever rewritten. A line cut short by a
+crash is ignored on load.
+"""
+
+import os
+
+from .editor import plan_digest  # re-exported; journal entries record it
+
+STATUS_OK = "OK"
+
+def input_digest(path) -> str:
+    """Fingerprint an input file by its size and modification time.
+
+    Hashing the contents would cost as much as re-editing a multi-GB
+    pathology file, so this relies on the file being replaced, not
+    rewritten in place within the same nanosecond.
+    """
+    st = os.stat(path)
+    return f"{st.st_size:x}-{st.st_mtime_ns:x}"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+def _unescape(value: str) -> str:
+    if "\\" not in value:
+        return value
+    return value.replace("\\n", "\n").replace("\\t", "\t").replace("\\\\", "\\")
+
+class Journal:
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._done: dict[tuple[str, str, str], str] = {}
+
+    def load(self) -> int:
+        """Read the existing entries; returns how many were read."""
+        self._done = {}
+        count = 0
+        with open(self.path, "r", encoding="utf-8", newline="\n") as infile:
+            for line in infile:
+                if not line.endswith("\n"):
+                    break  # torn final write
+                fields = line[:-1].split("\t")
+                if len(fields) != 5:
+                    continue
+
+                status, digest, plan, to_file, from_file = fields
+                key = (_unescape(from_file), digest, plan)
+                if status == STATUS_OK:
+                    self._done[key] = _unescape(to_file)
+                else:
+                    self._done.pop(key, None)
+                count += 1
+
+        return count
+
+    def is_done(self, from_file: str, digest: str, plan: str, to_file: str) -> bool:
+        """Whether this input was already edited with this plan into to_file."""
+        done_to_file = self._done.get((from_file, digest, plan))
+        return done_to_file == to_file and os.path.exists(to_file)
+
+    def record(self, status: str, from_file: str, digest: str, plan: str, to_file: str) -> None:
+        line = "\t".join((status, digest, plan, _escape(to_file), _escape(from_file))) + "\n"
+        os.write(self._fd, line.encode("utf-8"))
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,25 +1,57 @@
 """
 Background Editor using pydicom
+
+Reads one Storable edit request from stdin, applies it and writes a
+Storable response to stdout. A request either names one from_file and
+to_file, or carries a "files" list of [from_file, to_file] pairs that all
+receive the same edits, answered with one aggregated response.
+
+Run with --worker to instead serve a stream of length-framed Storable
+requests from stdin, one framed response per request, until stdin closes.
+Run with --fork-server to serve the same stream, but edit each request in
+a child forked from a preloaded parent.
 """
 
+# Keep module-level imports to what the Storable path needs: with one
+# process per file, startup is paid for every edited file. Anything only
+# the CSV and debugging entry points use is imported where it is used.
+import os
+import gc
 import sys
 import logging
-from collections import defaultdict
-import csv
-from pprint import pprint
-from pathlib import Path
-import argparse
 import pydicom
 
-from .editor import Editor, Operation
-from .input import get_input_data, respond_ok, respond_error
-
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+from .editor import Editor, Operation, Plan, plan_digest
+from .dictionaries import new_dict_items, private_dictionary_VR
+from .input import (
+    get_input_data,
+    requested_files,
+    respond,
+    respond_ok,
+    respond_error,
+    read_frame,
+    decode_frame,
+    write_frame,
+    ok_results,
+    error_results,
+    file_error_results,
+    batch_results,
 )
 
+logger = logging.getLogger(__name__)
+
+LOG_LEVEL_ENV = "PYDICOM_BACKGROUND_EDITOR_LOG_LEVEL"
+
+def configure_logging() -> None:
+    """Set up logging for the entry points, at $PYDICOM_BACKGROUND_EDITOR_LOG_LEVEL (default INFO)."""
+    logging.basicConfig(
+        level=os.environ.get(LOG_LEVEL_ENV, "INFO").upper(),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
 def parse_args():
+    import argparse
+
     parser = argparse.ArgumentParser(prog="pydicom-background-editor", description=__doc__)
     parser.add_argument("input", nargs="?", default="very_simple_real.csv", help="Input CSV file with edits")
     parser.add_argument("activity_id", help="the activity to run against")
@@ -27,12 +59,20 @@ def parse_args():
 
     return args
 
-def main_old() -> None:
-    """CLI entrypoint: read CSV of edits and group them by Series Instance UID.
+def read_edit_csv(input_path) -> dict[str, list[Operation]]:
+    """Read a CSV of edits and group its operations by Series Instance UID.
+
+    Series with identical edit lists share one list object, so that they
+    also share one compiled plan.
+
+    Raises:
+        FileNotFoundError: If the CSV does not exist
+        ValueError: If the CSV is missing one of the required columns
     """
-    args = parse_args()
+    import csv
+    from pathlib import Path
 
-    input_path = Path(args.input)
+    input_path = Path(input_path)
     if not input_path.exists():
         raise FileNotFoundError(f"Input file not found: {input_path}")
 
@@ -54,31 +94,55 @@ def main_old() -> None:
             raise ValueError(f"Input file is missing one of the required fields: {required_fields}")
 
         # group edits into a dict by series_instance_uid
-        edit_groups = defaultdict(list)
-        for series, ops in generate_edit_groups(reader):
+        edit_groups: dict[str, list[Operation]] = {}
+        interned: dict[str, list[Operation]] = {}
+        for series, ops, fingerprint in generate_edit_groups(reader):
+            ops = interned.setdefault(fingerprint, ops)
             for s in series:
-                edit_groups[s].extend(ops)
+                if s in edit_groups:
+                    # a series in more than one group gets all their ops;
+                    # build a new list, the old one may be shared
+                    merged = edit_groups[s] + ops
+                    ops_for_s = interned.setdefault(plan_digest(merged), merged)
+                else:
+                    ops_for_s = ops
+                edit_groups[s] = ops_for_s
 
-        editor = Editor()
+    return edit_groups
 
-        ## TODO: temp list for testing, this is a pathology file
-        files = [
-            "/Users/quasar/Documents/DICOM/pathology/a3e6a5cc1bfbeda4bb229fa728486259",
-        ]
-        ds = pydicom.dcmread(files[0], defer_size=1024)
+def main_old() -> None:
+    """CLI entrypoint: read CSV of edits and group them by Series Instance UID.
+    """
+    configure_logging()
+    args = parse_args()
+
+    edit_groups = read_edit_csv(args.input)
+
+    editor = Editor()
+
+    ## TODO: temp list for testing, this is a pathology file
+    files = [
+        "/Users/quasar/Documents/DICOM/pathology/a3e6a5cc1bfbeda4bb229fa728486259",
+    ]
+    ds = pydicom.dcmread(files[0], defer_size=1024)
 
-        for s, o in edit_groups.items():
-            # print(s)
-            # pprint(o)
+    for s, o in edit_groups.items():
+        # print(s)
+        # pprint(o)
 
-            # first_op = o[0] # just for testing
-            # editor.apply_edits(ds, [first_op])
+        # first_op = o[0] # just for testing
+        # editor.apply_edits(ds, [first_op])
 
-            editor.apply_edits(ds, o)
+        editor.apply_edits(ds, o)
 
-        ds.save_as("files/output.dcm")
+    ds.save_as("files/output.dcm")
 
 def generate_edit_groups(reader):
+    """Yield (series_list, op_list, fingerprint) for each group of CSV rows.
+
+    The fingerprint is plan_digest(op_list): groups with the same op list
+    have the same fingerprint.
+    """
     series_list = []
     op_list = []
     last_type = None
@@ -86,7 +150,7 @@ def generate_edit_groups(reader):
         if row["series_instance_uid"]:
             # if this is the end of a set
             if last_type == "op":
-                yield series_list, op_list
+                yield series_list, op_list, plan_digest(op_list)
                 series_list = []
                 op_list = []
 
@@ -97,9 +161,11 @@ def generate_edit_groups(reader):
             last_type = "op"
 
     if series_list or op_list:
-        yield series_list, op_list
+        yield series_list, op_list, plan_digest(op_list)
 
 def test2():
+    from pprint import pprint
+
     files = [
         "/Users/quasar/Documents/DICOM/pathology/a3e6a5cc1bfbeda4bb229fa728486259",
     ]
@@ -295,6 +361,7 @@ def get_input_data_test():
     return data
     
 def test():
+    configure_logging()
     data = get_input_data()
     
     # from_file = data["from_file"]
@@ -312,7 +379,234 @@ def test():
 
     # print(ds)
 
+def edit_file(editor: Editor, plan: Plan, from_file: str, to_file: str) -> None:
+    """Read from_file, apply a compiled plan to it and save the result to to_file."""
+    ds = pydicom.dcmread(from_file, defer_size=1024)
+    editor.apply_plan(ds, plan)
+    ds.save_as(to_file)
+
+def edit_files(editor: Editor, plan: Plan, files: list[tuple[str, str]]) -> dict:
+    """Apply one compiled plan to every (from_file, to_file) pair.
+
+    A failure on one file is recorded in its result and does not stop the
+    rest. Returns the aggregated response.
+    """
+    file_results = []
+    for from_file, to_file in files:
+        try:
+            edit_file(editor, plan, from_file, to_file)
+            file_results.append(ok_results({"from_file": from_file, "to_file": to_file}))
+        except Exception as e:
+            logger.exception(f"Editing {from_file} failed")
+            file_results.append(file_error_results(from_file, to_file, f"{type(e).__name__}: {e}"))
+
+    return batch_results(file_results)
+
+def compile_edits(editor: Editor, edits: list[dict]) -> Plan:
+    """Validate a request's raw edit list, translate it and compile it into a plan.
+
+    Raises validate.PlanValidationError, before any file is touched, if
+    any edit is bad. With a plan cache configured (see plancache), a plan
+    already compiled for the same edit list by any process is loaded
+    instead.
+    """
+    from .validate import validate_edits
+
+    cache = None
+    # the cache is opt-in, so only a process that uses one imports it
+    # (the variable is plancache.PLAN_CACHE_ENV)
+    if os.environ.get("PYDICOM_BACKGROUND_EDITOR_PLAN_CACHE"):
+        from .plancache import PlanCache, edits_key
+        cache = PlanCache.from_env()
+    if cache is not None:
+        key = edits_key(edits)
+        plan = cache.load(editor, key)
+        if plan is not None:
+            return plan
+
+    validate_edits(edits)
+    plan = editor.compile(Operation.translate_edits(edits))
+    if cache is not None:
+        cache.store(key, plan)
+    return plan
+
+def run_request(editor: Editor, payload: bytes, compile=None) -> dict:
+    """Decode one framed request, apply it and build its response.
+
+    compile turns the request's edit list into a Plan; it defaults to
+    compile_edits. Any failure is turned into an error response rather
+    than raised, so that a single bad request can not stop a long-lived
+    server.
+    """
+    if compile is None:
+        compile = lambda edits: compile_edits(editor, edits)
+
+    try:
+        data = decode_frame(payload)
+        plan = compile(data["edits"])
+    except Exception as e:
+        logger.exception("Edit request failed")
+        return error_results(f"{type(e).__name__}: {e}")
+
+    return apply_request(editor, plan, data)
+
+def apply_request(editor: Editor, plan: Plan, data: dict) -> dict:
+    """Apply plan to the file(s) of a decoded request and build its response.
+
+    As with run_request, a failure is turned into an error response.
+    """
+    try:
+        files = requested_files(data)
+        if files is not None:
+            return edit_files(editor, plan, files)
+
+        edit_file(editor, plan, data["from_file"], data["to_file"])
+        return ok_results(data)
+    except Exception as e:
+        logger.exception("Edit request failed")
+        return error_results(f"{type(e).__name__}: {e}")
+
+def _compile_last_edits(editor: Editor):
+    """Return a compile_edits that reuses its plan for a repeated edit list.
+
+    The edit list and its plan are replaced together, in one assignment,
+    so the returned function may be called from several threads at once
+    without ever handing one edit list another's plan.
+    """
+    last = (None, Plan())
+
+    def compile(edits: list[dict]) -> Plan:
+        nonlocal last
+        last_edits, plan = last
+        if edits != last_edits:
+            plan = compile_edits(editor, edits)
+            last = (edits, plan)
+        return plan
+
+    return compile
+
+def worker(fd: int | None = None, out=None) -> None:
+    """Serve length-framed Storable requests until the input is closed.
+
+    The interpreter, the Editor and the compiled plan are reused across
+    requests; Posda usually sends the same edit list for every file in a
+    series, so it is only compiled again when it changes.
+    A failed request is answered with an error response and the worker
+    moves on to the next one.
+    """
+    if fd is None:
+        fd = sys.stdin.fileno()
+
+    editor = Editor()
+    compile = _compile_last_edits(editor)
+
+    while True:
+        payload = read_frame(fd)
+        if payload is None:
+            break
+
+        write_frame(run_request(editor, payload, compile), out)
+
+def warm_up() -> None:
+    """Load everything an edit needs, so forked children start ready to go."""
+    # pull in the reader/writer machinery that dcmread and save_as import lazily
+    import pydicom.filereader
+    import pydicom.filewriter
+    import pydicom.charset
+
+    from pydicom import datadict
+
+    # exercise the dictionary lookups every plan performs, registering
+    # our private dictionaries up front rather than in every child
+    datadict.dictionary_VR(0x00100010)
+    for tag in new_dict_items:
+        private_dictionary_VR(tag, "CTP")
+
+    # keep the garbage collector from touching (and so copying) the
+    # parent's pages in every child
+    gc.collect()
+    gc.freeze()
+
+def fork_server(fd: int | None = None, out=None) -> None:
+    """Serve length-framed Storable requests, forking one child per request.
+
+    The parent reads and decodes each frame, compiles its edit list (or,
+    as the worker does, reuses the plan of a repeated one) and forks; the
+    child, inheriting the plan, edits the files, sends the response back
+    over a pipe and exits. A request that does not decode or compile is
+    answered by the parent without forking. Only the parent writes
+    to the output, and only whole frames: a child that dies (a crash, or
+    the OOM killer), even halfway through its response, gets an error
+    response written for it instead, and the parent carries on with the
+    next request.
+    """
+    if fd is None:
+        fd = sys.stdin.fileno()
+    if out is None:
+        out = sys.stdout.buffer
+
+    warm_up()
+    editor = Editor()
+    compile = _compile_last_edits(editor)
+
+    while True:
+        payload = read_frame(fd)
+        if payload is None:
+            break
+
+        try:
+            data = decode_frame(payload)
+            plan = compile(data["edits"])
+        except Exception as e:
+            logger.exception("Edit request failed")
+            write_frame(error_results(f"{type(e).__name__}: {e}"), out)
+            continue
+
+        # freeze the plan along with everything else the parent holds, so
+        # the child's collections don't copy its pages either
+        gc.freeze()
+        # don't let the child inherit (and repeat) anything still buffered
+        out.flush()
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                os.close(read_fd)
+                with os.fdopen(write_fd, "wb") as reply:
+                    write_frame(apply_request(editor, plan, data), reply)
+                status = 0
+            finally:
+                os._exit(status)
+
+        os.close(write_fd)
+        # read before waiting, or a response larger than the pipe buffer
+        # would block the child forever
+        with os.fdopen(read_fd, "rb") as reply:
+            response = reply.read()
+        _, status = os.waitpid(pid, 0)
+        exit_code = os.waitstatus_to_exitcode(status)
+        if exit_code == 0:
+            out.write(response)
+            out.flush()
+        else:
+            # a negative exit code is the signal that killed the child
+            message = f"Editor child exited abnormally with code {exit_code}"
+            logger.error(message)
+            write_frame(error_results(message), out)
+
+    gc.unfreeze()
+
 def main() -> None:
+    configure_logging()
+
+    if sys.argv[1:] == ["--worker"]:
+        worker()
+        return
+
+    if sys.argv[1:] == ["--fork-server"]:
+        fork_server()
+        return
 
     if sys.argv[1:]:
         print(__doc__)
@@ -323,19 +617,23 @@ def main() -> None:
     # print("Raw edits:")
     # pprint(edits)
 
-    operations = Operation.translate_edits(edits["edits"])
+    editor = Editor()
+    plan = compile_edits(editor, edits["edits"])
+
+    files = requested_files(edits)
+    if files is not None:
+        print("Editing begins now...")
+        respond(edit_files(editor, plan, files))
+        return
+
     from_file = edits["from_file"]
     to_file = edits["to_file"]
 
-    editor = Editor()
-
     # print("Edits translated to Operations:")
-    # pprint(operations)
+    # pprint(plan)
 
     print("Editing begins now...")
-    ds = pydicom.dcmread(from_file, defer_size=1024)
-    editor.apply_edits(ds, operations)
-    ds.save_as(to_file)
+    edit_file(editor, plan, from_file, to_file)
 
     respond_ok({
         "to_file": to_file,
@@ -0,0 +1,242 @@
+"""
+Edit-list optimizer.
+
+Edit lists are often built by concatenating the op rows of several groups
+for the same series, so the same set_tag or delete_tag can appear more
+than once, and a value edit may be overwritten by a later set_tag. Before
+an edit list is compiled, optimize() drops:
+
+- exact duplicates of an earlier op that has the same effect when run
+  twice, with nothing in between touching its tags;
+- writes that a later set_tag or delete_tag on the same path replaces
+  entirely, with nothing in between reading or writing that path.
+
+Runs of consecutive value edits (string_replace, substitute, shift_date,
+hash_unhashed_uid) on the same path are then found by fusion_runs(), so the
+editor can apply them to each element in one traversal.
+
+Every rule is conservative: when it is not certain that an op has no
+effect on the result, the op is kept. Whether two paths can touch the same
+element is decided by path.paths_may_alias; an op with a tag mask may touch
+anything, so it is only ever dropped as a duplicate of the op right before it.
+"""
+
+import dataclasses
+import logging
+from typing import TYPE_CHECKING
+
+from .path import Path, parse, paths_may_alias
+from .dictionaries import lookup_vr
+
+if TYPE_CHECKING:
+    from .editor import Operation
+
+logger = logging.getLogger(__name__)
+
+# ops that only change the value of elements that already exist
+VALUE_OPS = {"string_replace", "substitute", "shift_date", "hash_unhashed_uid"}
+# ops that create their tag (and any sequences above it) when missing
+CREATING_OPS = {"set_tag", "empty_tag", "copy_from_tag"}
+# ops that leave the dataset as it was when run a second time straight after
+# themselves; string_replace is not one (replacing a UID root with a longer
+# root that starts with it keeps growing), nor is shift_date
+IDEMPOTENT_OPS = {"set_tag", "delete_tag", "empty_tag", "substitute", "hash_unhashed_uid", "copy_from_tag"}
+# ops that look up the VR of their tag, and raise if it is not in the dictionary
+VR_OPS = {"set_tag", "empty_tag", "substitute", "copy_from_tag"}
+# ops that can be given a tag_mode "mask" tag
+MASK_OPS = {"delete_tag", "empty_tag"}
+
+@dataclasses.dataclass
+class OptimizationReport:
+    duplicates: list["Operation"] = dataclasses.field(default_factory=list)
+    # (removed op, the later op that overwrites it)
+    dead_writes: list[tuple["Operation", "Operation"]] = dataclasses.field(default_factory=list)
+    fused: list[tuple["Operation", ...]] = dataclasses.field(default_factory=list)
+
+    @property
+    def removed(self) -> int:
+        return len(self.duplicates) + len(self.dead_writes)
+
+    def lines(self) -> list[str]:
+        lines = [f"duplicate {op.op} {op.tag} {op.val1!r} {op.val2!r}" for op in self.duplicates]
+        lines += [f"dead {op.op} {op.tag}, overwritten by {by.op}" for op, by in self.dead_writes]
+        lines += [f"fused {len(run)} ops on {run[0].tag}: {', '.join(op.op for op in run)}" for run in self.fused]
+        return lines
+
+    def __str__(self) -> str:
+        summary = f"removed {self.removed} ops, fused {sum(len(run) for run in self.fused)} into {len(self.fused)}"
+        return "; ".join([summary] + self.lines())
+
+@dataclasses.dataclass(frozen=True)
+class _Access:
+    """The paths an op reads and writes."""
+    path: Path
+    source: Path | None
+    creates: bool
+    masked: bool = False
+
+    @staticmethod
+    def of(op: "Operation") -> "_Access":
+        source = None
+        if op.op == "copy_from_tag" and op.val1:
+            try:
+                source = parse(f"<{op.val1.strip('<>')}>")
+            except Exception:
+                source = None
+        masked = op.tag_mode == "mask"
+        return _Access(op.parse_tag(), source, op.op in CREATING_OPS and not masked, masked)
+
+def _private_groups(path: Path | None) -> set[int]:
+    if not path:
+        return set()
+    return {s.group for s in path if getattr(s, "is_private", False)}
+
+def _interferes(a: _Access, b: _Access) -> bool:
+    """Whether running a between two copies of b (or b and what overwrites it) could matter."""
+    if a.masked or b.masked:
+        # a mask may match sequences and private creators of any path
+        return True
+    # a private creator block can be found in the root dataset, so creating
+    # one anywhere may change how another path in that group resolves
+    if _private_groups(a.path) & (_private_groups(b.path) | _private_groups(b.source)):
+        return True
+    if _private_groups(b.path) & _private_groups(a.source):
+        return True
+
+    if paths_may_alias(a.path, b.path, any_index=a.creates or b.creates):
+        return True
+    if b.source is not None and paths_may_alias(a.path, b.source, any_index=a.creates):
+        return True
+    if a.source is not None and paths_may_alias(b.path, a.source, any_index=b.creates):
+        return True
+    return False
+
+def _key(op: "Operation") -> tuple:
+    return (op.op, op.tag, op.val1, op.val2, op.tag_mode)
+
+def _idempotent(op: "Operation", access: _Access) -> bool:
+    if op.op not in IDEMPOTENT_OPS:
+        return False
+    if op.op == "hash_unhashed_uid":
+        # a hashed UID only starts with its root if the root fits in 64 chars
+        return len(op.val1) <= 64
+    if op.op == "copy_from_tag":
+        return access.source is not None and not paths_may_alias(access.path, access.source, any_index=True)
+    return True
+
+def _vr_resolves(op: "Operation", access: _Access) -> bool:
+    if not access.path:
+        return False
+    if op.op not in VR_OPS and not (op.op == "string_replace" and not access.path[-1].is_private):
+        return True
+    try:
+        lookup_vr(access.path[-1])
+    except KeyError:
+        return False
+    return True
+
+def _overwrites(later: "Operation", later_access: _Access, op: "Operation", access: _Access) -> bool:
+    """Whether later, run straight after op, leaves no trace of op."""
+    if later.op not in ("set_tag", "delete_tag") or later_access.path != access.path:
+        return False
+    if later_access.masked or access.masked:
+        return False
+    if not _vr_resolves(op, access):
+        return False
+
+    if op.op in VALUE_OPS:
+        # only ever changes values of existing elements, which later replaces or removes
+        return True
+
+    if op.op in ("set_tag", "empty_tag") and not _private_groups(access.path):
+        if later.op == "set_tag":
+            # without wildcards both create exactly the same chain of items
+            return not any(getattr(s, "wildcard", False) for s in access.path)
+        # a delete_tag leaves behind any sequences op created above its tag
+        return len(access.path) == 1
+
+    return False
+
+def _dedupe(operations: list["Operation"], report: OptimizationReport) -> list["Operation"]:
+    kept: list["Operation"] = []
+    accesses: list[_Access] = []
+    for op in operations:
+        access = _Access.of(op)
+        duplicate = False
+        if _idempotent(op, access):
+            for i in range(len(kept) - 1, -1, -1):
+                if _key(kept[i]) == _key(op):
+                    duplicate = True
+                    break
+                if _interferes(accesses[i], access):
+                    break
+
+        if duplicate:
+            report.duplicates.append(op)
+        else:
+            kept.append(op)
+            accesses.append(access)
+
+    return kept
+
+def _drop_dead_writes(operations: list["Operation"], report: OptimizationReport) -> list["Operation"]:
+    accesses = [_Access.of(op) for op in operations]
+    kept = []
+    for i, op in enumerate(operations):
+        overwritten_by = None
+        for j in range(i + 1, len(operations)):
+            if _overwrites(operations[j], accesses[j], op, accesses[i]):
+                overwritten_by = operations[j]
+                break
+            if _interferes(accesses[j], accesses[i]):
+                break
+
+        if overwritten_by is not None:
+            report.dead_writes.append((op, overwritten_by))
+        else:
+            kept.append(op)
+
+    return kept
+
+def fusable(op: "Operation") -> bool:
+    """Whether op can be applied element by element as part of a fused run."""
+    if op.tag_mode != "exact":
+        return False
+    if op.op == "shift_date":
+        try:
+            int(op.val1)
+        except (ValueError, TypeError):
+            return False
+        return True
+    if op.op == "hash_unhashed_uid":
+        return bool(op.val1)
+    return op.op in VALUE_OPS
+
+def fusion_runs(operations: list["Operation"]) -> list[list["Operation"]]:
+    """Split operations into runs that can share one traversal.
+
+    Consecutive fusable ops on the same path form one run; every other op
+    is a run of its own. Value ops never add or remove elements, so every
+    op in a run sees the same elements.
+    """
+    runs: list[list["Operation"]] = []
+    for op in operations:
+        if (
+            runs
+            and fusable(op)
+            and fusable(runs[-1][-1])
+            and parse(runs[-1][-1].tag) == parse(op.tag)
+        ):
+            runs[-1].append(op)
+        else:
+            runs.append([op])
+
+    return runs
+
+def optimize(operations: list["Operation"]) -> tuple[list["Operation"], OptimizationReport]:
+    """Return an equivalent, shorter edit list and a report of what changed."""
+    report = OptimizationReport()
+    optimized = _dedupe(operations, report)
+    optimized = _drop_dead_writes(optimized, report)
+    report.fused = [tuple(run) for run in fusion_runs(optimized) if len(run) > 1]
+    return optimized, report
@@ -1,16 +1,78 @@
 import dataclasses
+import functools
 import re
+import sys
 import pydicom
 from pydicom.dataelem import DataElement
 from pydicom import Dataset, datadict
-from collections import namedtuple
-from typing import NamedTuple
+from pydicom.tag import Tag
+from .dictionaries import private_dictionary_VR, register_private_dictionaries
+from collections import deque, namedtuple
+from typing import Iterator, NamedTuple
+
+class DatasetChain:
+    """The datasets from the root down to a traversal match, as parent-linked nodes.
+
+    A traversal extends a chain by one node per hop instead of copying a
+    list, so every match below one sequence item shares the chain above
+    it. chain[0] (the root) and chain[-1] (the innermost dataset) are
+    looked up directly; any other use materializes the list of datasets.
+    """
+
+    __slots__ = ("dataset", "parent", "root", "depth")
+
+    def __init__(self, dataset, parent: "DatasetChain | None" = None):
+        self.dataset = dataset
+        self.parent = parent
+        self.root = dataset if parent is None else parent.root
+        self.depth = 1 if parent is None else parent.depth + 1
+
+    def push(self, dataset) -> "DatasetChain":
+        """This chain extended by dataset; self is left as it was."""
+        return DatasetChain(dataset, self)
+
+    def to_list(self) -> list:
+        datasets = []
+        node = self
+        while node is not None:
+            datasets.append(node.dataset)
+            node = node.parent
+        datasets.reverse()
+        return datasets
+
+    def __len__(self) -> int:
+        return self.depth
+
+    def __getitem__(self, index):
+        if index == -1 or index == self.depth - 1:
+            return self.dataset
+        if index == 0 or index == -self.depth:
+            return self.root
+        return self.to_list()[index]
+
+    def __iter__(self):
+        return iter(self.to_list())
+
+    def __eq__(self, other):
+        if isinstance(other, (DatasetChain, list)):
+            return self.to_list() == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"DatasetChain({self.to_list()!r})"
 
 class ElementPair(NamedTuple):
     element: Dataset
-    ds_chain: list[Dataset]
+    ds_chain: DatasetChain
+
+# Segments, Sequences and Paths are immutable (and hashable), so that one
+# parsed path can be shared by every caller; the custom __init__s set their
+# fields through object.__setattr__ for that reason. They are slotted, as
+# an edit list with a row per instance holds one per path segment.
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True, slots=True)
 class Segment:
     tag: str
     group: int
@@ -19,37 +81,103 @@ class Segment:
     owner: str | None = None
 
     def __init__(self, tag: str):
-        self.tag = tag
+        object.__setattr__(self, "tag", sys.intern(tag))
 
         if '"' in tag:
-            self.is_private = True
-            group, self.owner, ele = tag.split('"')
+            object.__setattr__(self, "is_private", True)
+            group, owner, ele = tag.split('"')
+            object.__setattr__(self, "owner", sys.intern(owner))
 
             group = group.strip(",")
             ele = ele.strip(",")
         else:
+            object.__setattr__(self, "is_private", False)
+            object.__setattr__(self, "owner", None)
             group, ele = tag.split(",")
 
-        self.group = int(group, 16)
-        self.element = int(ele, 16)
+        object.__setattr__(self, "group", int(group, 16))
+        object.__setattr__(self, "element", int(ele, 16))
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True, slots=True)
 class Sequence:
     value: int
     wildcard: bool
 
     def __init__(self, value: str):
         if value.startswith("<") and value.endswith(">"):
-            self.wildcard = True
-            self.value = int(value.strip("<>"))
+            object.__setattr__(self, "wildcard", True)
+            object.__setattr__(self, "value", int(value.strip("<>")))
         else:
-            self.wildcard = False
-            self.value = int(value)
+            object.__setattr__(self, "wildcard", False)
+            object.__setattr__(self, "value", int(value))
+
+
+# a tag mask's digits; x stands for any hex digit
+_MASK_RE = re.compile(r"([0-9a-fA-FxX]{4}),([0-9a-fA-FxX]{4})")
+
+# a mask that matches at most this many tags is expanded to them
+MASK_MAX_CANDIDATES = 4096
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class TagMask:
+    """A tag with any of its hex digits given as x, such as (60xx,3000), for tag_mode "mask".
 
+    It is compiled to integers once: a tag matches when tag & mask ==
+    value. A mask with few x digits, such as (60xx,3000) with 256 possible
+    tags, is also expanded to those tags, and select() looks each one up
+    in a dataset rather than going over all of its elements, so it costs
+    about as much as a few exact lookups however large the dataset is.
+    """
+    tag: str
+    value: int
+    mask: int
+    # every tag it can match, in order, if there are few
+    candidates: tuple | None = dataclasses.field(repr=False, compare=False)
 
-class Path(list):
-    pass
+    def __init__(self, tag: str):
+        match = _MASK_RE.fullmatch(tag)
+        if match is None:
+            raise ValueError(f"Tag mask ({tag}) is not four hex digits or x, a comma, and four more")
+        digits = match[1] + match[2]
+        value = int("".join("0" if d in "xX" else d for d in digits), 16)
+        mask = int("".join("0" if d in "xX" else "f" for d in digits), 16)
+
+        candidates = None
+        free = [28 - 4 * i for i, d in enumerate(digits) if d in "xX"]
+        if 16 ** len(free) <= MASK_MAX_CANDIDATES:
+            candidates = [value]
+            for shift in free:
+                candidates = [c | (n << shift) for c in candidates for n in range(16)]
+            candidates = tuple(Tag(c) for c in sorted(candidates))
+
+        object.__setattr__(self, "tag", sys.intern(tag))
+        object.__setattr__(self, "value", value)
+        object.__setattr__(self, "mask", mask)
+        object.__setattr__(self, "candidates", candidates)
+
+    def matches(self, tag: int) -> bool:
+        return tag & self.mask == self.value
+
+    def select(self, ds: Dataset) -> list:
+        """The tags of ds that match, in order."""
+        tags = ds.keys()
+        if self.candidates is not None and len(self.candidates) <= len(tags):
+            return [tag for tag in self.candidates if tag in tags]
+        mask, value = self.mask, self.value
+        return sorted(tag for tag in tags if tag & mask == value)
+
+
+class Path(tuple):
+    __slots__ = ()
+
+# Matches either:
+# - A group of digits inside parentheses (e.g. (0008,1110))
+# - A group of digits inside square brackets (e.g. [<0>], or [2])
+PATH_RE = re.compile(r"\(([^)]+)\)|\[(<[^>]+>|[^\]]+)\]")
+
+# An edit list only uses a few dozen distinct paths, repeated for every file
+PARSE_CACHE_SIZE = 4096
 
 
 def add_tag(ds: Dataset, parsed_path: Path, value: str, vr: str | None = None) -> None:
@@ -62,8 +190,8 @@ def add_tag(ds: Dataset, parsed_path: Path, value: str, vr: str | None = None) -
     they will be created automatically.
     """
 
-    
-    element_to_add = parsed_path.pop()
+    element_to_add = parsed_path[-1]
+    parsed_path = Path(parsed_path[:-1])
 
     if vr is None:
         dict_entry = datadict.get_entry([element_to_add.group, element_to_add.element])
@@ -72,15 +200,24 @@ def add_tag(ds: Dataset, parsed_path: Path, value: str, vr: str | None = None) -
 
         vr = dict_entry[0] if dict_entry is not None else None
 
+    tag = (element_to_add.group, element_to_add.element)
     if len(parsed_path) == 0:
         # we are at the root level, no need to parse
-        ds.add_new((element_to_add.group, element_to_add.element), vr, value)
+        ds.add_new(tag, vr, value)
+        if vr == "SQ":
+            sequence_changed(ds, ds, Tag(tag))
+        elif Tag(tag).is_private_creator:
+            creators_changed(ds)
         return
 
     # traverse to the parent of the element to add, creating intermediate structures as needed
     eles = _traverse_or_create(ds, parsed_path)
     for ele in eles:
-        ele.element.add_new((element_to_add.group, element_to_add.element), vr, value)
+        ele.element.add_new(tag, vr, value)
+        if vr == "SQ":
+            sequence_changed(ds, ele.element, Tag(tag))
+    if eles and Tag(tag).is_private_creator:
+        creators_changed(ds)
 
 
 def _traverse_or_create(ds: Dataset, parsed_path: Path) -> list[ElementPair]:
@@ -97,9 +234,12 @@ def _traverse_or_create(ds: Dataset, parsed_path: Path) -> list[ElementPair]:
     from pydicom.sequence import Sequence as PydicomSequence
     
     if len(parsed_path) == 0:
-        return [ElementPair(ds, [ds])]
+        return [ElementPair(ds, DatasetChain(ds))]
     
-    current_datasets = [(ds, [ds])]  # List of (current_ds, ds_chain) tuples
+    current_datasets = [(ds, DatasetChain(ds))]  # List of (current_ds, ds_chain) tuples
+    # (dataset, tag) of every sequence element created or given new items,
+    # outermost first, for the dataset's TagIndex
+    changed = []
     
     for item in parsed_path:
         next_datasets = []
@@ -108,17 +248,20 @@ def _traverse_or_create(ds: Dataset, parsed_path: Path) -> list[ElementPair]:
             # For each current dataset, navigate or create the segment
             for current_ds, ds_chain in current_datasets:
                 if item.is_private:
+                    register_private_dictionaries()
                     try:
-                        private_block = current_ds.private_block(item.group, item.owner or "", create=False)
+                        private_block = private_block_of(ds_chain, item.group, item.owner or "")
                         next_elem = current_ds.get(private_block.get_tag(item.element))
                     except KeyError:
                         # Private block doesn't exist - create it
                         private_block = current_ds.private_block(item.group, item.owner or "", create=True)
+                        creators_changed(ds)
                         # Need to determine VR for private tag
-                        next_vr = datadict.private_dictionary_VR([item.group, item.element], item.owner) # type: ignore
+                        next_vr = private_dictionary_VR([item.group, item.element], item.owner) # type: ignore
                         if next_vr == 'SQ':
                             private_block.add_new(item.element, next_vr, PydicomSequence([]))
                             next_elem = current_ds.get(private_block.get_tag(item.element))
+                            changed.append((current_ds, next_elem.tag))
                         else:
                             # Not a sequence, this shouldn't happen in a path with more items
                             raise ValueError(f"Cannot traverse through non-sequence private tag {item.tag}")
@@ -132,19 +275,20 @@ def _traverse_or_create(ds: Dataset, parsed_path: Path) -> list[ElementPair]:
                         # Create empty sequence
                         current_ds.add_new((item.group, item.element), 'SQ', PydicomSequence([]))
                         next_elem = current_ds.get((item.group, item.element))
+                        changed.append((current_ds, next_elem.tag))
                     else:
                         # Not a sequence, shouldn't happen in middle of path
                         raise ValueError(f"Cannot traverse through non-existent non-sequence tag {item.tag}")
                 
                 # next_elem is a DataElement, we need its value for sequences
                 if hasattr(next_elem, 'value'):
-                    next_datasets.append((next_elem, ds_chain))
+                    next_datasets.append((next_elem, ds_chain, current_ds))
                 else:
-                    next_datasets.append((next_elem, ds_chain))
+                    next_datasets.append((next_elem, ds_chain, current_ds))
         
         elif isinstance(item, Sequence):
             # For each current dataset, navigate or create sequence items
-            for current_elem, ds_chain in current_datasets:
+            for current_elem, ds_chain, holder in current_datasets:
                 # current_elem should be a DataElement with VR=SQ
                 if not hasattr(current_elem, 'value'):
                     raise ValueError(f"Expected DataElement with sequence value")
@@ -158,26 +302,38 @@ def _traverse_or_create(ds: Dataset, parsed_path: Path) -> list[ElementPair]:
                     if len(seq) == 0:
                         # No items exist - create one empty item
                         seq.append(Dataset())
+                        changed.append((holder, current_elem.tag))
                     
                     for seq_item in seq:
-                        next_datasets.append((seq_item, ds_chain + [seq_item]))
+                        next_datasets.append((seq_item, ds_chain.push(seq_item)))
                 else:
                     # Specific index
                     index = int(item.value)
                     
                     # Create empty items up to the requested index if needed
+                    if len(seq) <= index:
+                        changed.append((holder, current_elem.tag))
                     while len(seq) <= index:
                         seq.append(Dataset())
                     
-                    next_datasets.append((seq[index], ds_chain + [seq[index]]))
+                    next_datasets.append((seq[index], ds_chain.push(seq[index])))
         
         current_datasets = next_datasets
+
+    for parent, tag in changed:
+        sequence_changed(ds, parent, tag)
     
     # Convert final (ds, ds_chain) tuples to ElementPairs
-    return [ElementPair(ds, ds_chain) for ds, ds_chain in current_datasets]
+    return [ElementPair(current[0], current[1]) for current in current_datasets]
 
 
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
 def parse(path: str) -> Path:
+    """Parse a path string into a Path of Segments and Sequences.
+
+    Results are cached per path string; a Path is immutable, so the cached
+    one is handed to every caller.
+    """
     ## TODO: disabled for now, looks like we need to handle both cases
     # if not (path.startswith("<") and path.endswith(">")):
     #     raise ValueError("Path is missing Bills; it looks invalid")
@@ -186,12 +342,7 @@ def parse(path: str) -> Path:
 
     # Match the entire path; this should break it into a set of matches
     # for each component in the path
-    # This regex matches either:
-    # - A group of digits inside parentheses (e.g. (0008,1110))
-    # - A group of digits inside square brackets (e.g. [<0>], or [2])
-    regex = r"\(([^)]+)\)|\[(<[^>]+>|[^\]]+)\]"
-
-    matches = re.findall(regex, path)
+    matches = PATH_RE.findall(path)
 
     output = []
     for segment, sequence in matches:
@@ -205,6 +356,54 @@ def parse(path: str) -> Path:
     return Path(output)
 
 
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_mask(path: str) -> Path:
+    """Parse the path of a tag_mode "mask" op, whose last tag is a TagMask.
+
+    Anything before the mask is parsed as by parse(), so
+    <(0008,1115)[<0>](0009,xxxx)> masks the tags of every item of
+    (0008,1115); on its own the mask applies to the root dataset.
+    """
+    path = path.strip("<>")
+    head, paren, last = path.rpartition("(")
+    if not paren or not last.endswith(")"):
+        raise ValueError(f"Path {path!r} does not end with a tag mask")
+
+    prefix = parse(f"<{head}>") if head else Path()
+    return Path(prefix + (TagMask(last[:-1]),))
+
+
+def _segments_may_alias(a: Segment, b: Segment) -> bool:
+    if a.group != b.group:
+        return False
+    if a.is_private and b.is_private:
+        return a.owner == b.owner and a.element == b.element
+    if a.is_private or b.is_private:
+        # a private tag's real element number depends on the dataset's
+        # creator block, so it may be any public tag of its group
+        return True
+    return a.element == b.element
+
+def paths_may_alias(a: Path, b: Path, any_index: bool = False) -> bool:
+    """Whether two paths may reach the same element, or one lies under the other.
+
+    This errs on the side of True: it is False only when the paths are
+    certain to reach different parts of any dataset. With any_index, items
+    with different exact indices are also taken to alias, as for a path
+    whose missing sequence items get created.
+    """
+    for x, y in zip(a, b):
+        if isinstance(x, Segment) and isinstance(y, Segment):
+            if not _segments_may_alias(x, y):
+                return False
+        elif isinstance(x, Sequence) and isinstance(y, Sequence):
+            if not (any_index or x.wildcard or y.wildcard or x.value == y.value):
+                return False
+        else:
+            return True
+
+    return True
+
 def traverse(ds: Dataset, parsed_path: Path) -> list[ElementPair]:
     """
     Traverse a path and return the matching elements
@@ -213,69 +412,391 @@ def traverse(ds: Dataset, parsed_path: Path) -> list[ElementPair]:
     the same way Posda does - I _think_ they can be referenced
     the same way as DICOM Sequences?
     """
-    return _traverse_path(ds, [ds], parsed_path)
-
-# TODO: we need to keep track of the entire chain of datasets, not just the base one, I think
-# in order to be able to check them all for the closest private creator block above
-# the current one
-def _traverse_path(ds: Dataset, ds_chain: list[Dataset], parsed_path: Path) -> list[ElementPair]:
-    # This will be hit when we have reached the end of the path, or
-    # the path was empty to begin with
-    if len(parsed_path) == 0:
-        return [ElementPair(ds, ds_chain)]
-
-    # This will be hit on a path where the node does not exist
-    if ds is None:
-        return []
-
-    item, *remaining_path = parsed_path
-    remaining_path = Path(remaining_path)
-
-    if isinstance(item, Segment):
-        # Traverse the DICOM dataset using the segment
-
-        if item.is_private:
-            try:
-                private_block = ds.private_block(item.group, item.owner or "", create=False)
-            except KeyError:
-                # for some reason, the private creator block can be defined
-                # either in at the base of the dataset, or nested
-                # TODO: we might have to check every ds in the chain
-                private_block = ds_chain[0].private_block(
-                    item.group, item.owner or "", create=False
-                )
-
-            ds = ds.get(private_block.get_tag(item.element)) # type: ignore
-        else:
-            ds = ds.get((item.group, item.element)) # type: ignore
+    return list(iter_traverse(ds, parsed_path))
 
-        if isinstance(ds, DataElement):
-            # if this ds is actually a DataElement, skip
-            # adding it to the ds_chain. This mainaly handles keeping
-            # Sequences out of the chain, ans well as the final element
-            extended_chain = ds_chain
-        else:
-            extended_chain = ds_chain + [ds]
-        return _traverse_path(ds, extended_chain, remaining_path)
-
-    elif isinstance(item, Sequence):
-        # Handle sequences
-        seq = ds.value  # get the actual pydicom Sequence object
-        seq_length = len(seq)
-
-        if not item.wildcard:
-            # Exact index
-            exact_index = int(item.value)
-            if exact_index >= seq_length:
-                return []
-            ds = seq[exact_index]
-            return _traverse_path(ds, ds_chain + [ds], remaining_path)
-        else:
-            # wildcard index, we have to recurse for each entry
-            ret = []
-            for i in range(seq_length):
-                x = _traverse_path(seq[i], ds_chain + [seq[i]], remaining_path)
-                ret.extend(x)
-            return ret
-
-    return [] # this should never be hit, but included for completeness
\ No newline at end of file
+def iter_traverse(ds: Dataset, parsed_path: Path) -> Iterator[ElementPair]:
+    """Yield the matches traverse() returns, in the same order, as they are found.
+
+    Nothing beyond the last match taken is visited, so a caller that only
+    needs the first match, or to know whether there is one, can stop
+    after one item of a wildcard sequence however long it is. The dataset
+    must not be changed while the iterator is in use.
+
+    If ds has a TagIndex attached, wildcard paths of public tags are
+    answered from it instead of by scanning every item on the way.
+    """
+    index = TagIndex.of(ds)
+    if index is not None and index.answers(parsed_path):
+        return index.traverse(parsed_path)
+    return _traverse_path(ds, DatasetChain(ds), parsed_path)
+
+def _branches(entries, ds_chain: DatasetChain, i: int):
+    for entry in entries:
+        yield entry, ds_chain.push(entry), i
+
+def _traverse_path(ds: Dataset, ds_chain: DatasetChain, parsed_path: Path) -> Iterator[ElementPair]:
+    return _traverse_branches(iter([(ds, ds_chain, 0)]), parsed_path)
+
+def _traverse_branches(branches: Iterator, parsed_path: Path) -> Iterator[ElementPair]:
+    """Depth-first, iterative traversal; matches are yielded in path order.
+
+    branches yields (node, its ds_chain, index of the next path item) to
+    start from. pending holds, for each sequence hop being followed, an
+    iterator over the branches still to take, so a deep path costs no
+    recursion and a wildcard item's entries are only visited as they are
+    reached.
+    """
+    end = len(parsed_path)
+    pending = [branches]
+
+    while pending:
+        branch = next(pending[-1], None)
+        if branch is None:
+            pending.pop()
+            continue
+        ds, ds_chain, i = branch
+
+        # consecutive tags need no branching
+        while i < end and ds is not None and isinstance(parsed_path[i], Segment):
+            ds, ds_chain = _follow_segment(ds, ds_chain, parsed_path[i])
+            i += 1
+
+        if i == end:
+            # reached the end of the path, or the path was empty to begin with
+            yield ElementPair(ds, ds_chain)
+        elif ds is not None:
+            # a sequence hop; for a wildcard index, a branch for each entry
+            pending.append(_branches(_sequence_items(ds, parsed_path[i]), ds_chain, i + 1))
+        # else: a node on the path does not exist
+
+def _follow_segment(ds: Dataset, ds_chain: DatasetChain, item: Segment):
+    """Look up a Segment's element in ds; returns it (or None) and its ds_chain."""
+    if item.is_private:
+        register_private_dictionaries()
+        private_block = private_block_of(ds_chain, item.group, item.owner or "")
+        ds = ds.get(private_block.get_tag(item.element)) # type: ignore
+    else:
+        ds = ds.get((item.group, item.element)) # type: ignore
+
+    if isinstance(ds, DataElement):
+        # if this ds is actually a DataElement, skip
+        # adding it to the ds_chain. This mainaly handles keeping
+        # Sequences out of the chain, ans well as the final element
+        return ds, ds_chain
+    return ds, ds_chain.push(ds)
+
+def _sequence_items(ds, item: Sequence):
+    """The items of the sequence element ds that a Sequence hop selects.
+
+    For a wildcard this is the sequence itself, not a copy.
+    """
+    seq = ds.value  # get the actual pydicom Sequence object
+
+    if not item.wildcard:
+        # Exact index
+        exact_index = int(item.value)
+        if exact_index >= len(seq):
+            return []
+        return [seq[exact_index]]
+
+    return seq
+
+
+class CreatorCache:
+    """Which private block each dataset under a root resolves (group, owner) to.
+
+    The private creator of a private tag can be defined in the dataset
+    holding the tag, or in any dataset above it, the nearest one winning.
+    Resolving that means asking each dataset up the chain, which scans its
+    group's creator slots; a path like (0013,"CTP",13) repeats in every
+    item of a sequence, so with a CreatorCache attached to the root each
+    dataset is only asked once, and items share what their parents found.
+
+    Adding, removing or replacing a private creator element under an
+    attached root must be reported through creators_changed(); the editor
+    and _traverse_or_create do. An edit of a creator's value in place
+    goes unnoticed, as it does by pydicom's own cache of blocks.
+    """
+
+    ATTRIBUTE = "_creator_cache"
+
+    def __init__(self, ds: Dataset):
+        self.ds = ds
+        # (id(dataset), group, owner) -> (dataset, its nearest block or
+        # None); the dataset is kept, so its id is not reused
+        self.blocks: dict = {}
+
+    @staticmethod
+    def attach(ds: Dataset) -> "CreatorCache":
+        cache = CreatorCache(ds)
+        ds.__dict__[CreatorCache.ATTRIBUTE] = cache
+        return cache
+
+    @staticmethod
+    def detach(ds: Dataset) -> None:
+        ds.__dict__.pop(CreatorCache.ATTRIBUTE, None)
+
+    @staticmethod
+    def of(ds: Dataset) -> "CreatorCache | None":
+        """The cache attached to ds, if any; a copy of ds has none."""
+        cache = ds.__dict__.get(CreatorCache.ATTRIBUTE)
+        if cache is None or cache.ds is not ds:
+            return None
+        return cache
+
+    def __deepcopy__(self, memo) -> None:
+        # keyed by id(), so a deep copy of ds starts without one
+        return None
+
+def private_block_of(ds_chain: DatasetChain, group: int, owner: str):
+    """The PrivateBlock of (group, owner) nearest to ds_chain[-1], looking up the chain.
+
+    Raises KeyError if no dataset on the chain has that private creator.
+    """
+    cache = CreatorCache.of(ds_chain.root)
+    blocks = cache.blocks if cache is not None else {}
+    asked = []
+    block = None
+    node = ds_chain
+    while node is not None:
+        ds = node.dataset
+        key = (id(ds), group, owner)
+        found = blocks.get(key)
+        if found is not None and found[0] is ds:
+            block = found[1]
+            break
+        asked.append((key, ds))
+        try:
+            block = ds.private_block(group, owner, create=False)
+            break
+        except KeyError:
+            node = node.parent
+
+    # every dataset asked on the way resolves to the same block
+    for key, ds in asked:
+        blocks[key] = (ds, block)
+    if block is None:
+        raise KeyError(f"Private creator '{owner}' not found")
+    return block
+
+def creators_changed(root: Dataset) -> None:
+    """Drop what root's CreatorCache, if it has one, knows after a private creator changed."""
+    cache = CreatorCache.of(root)
+    if cache is not None:
+        cache.blocks.clear()
+
+
+class _SequenceLocation(NamedTuple):
+    element: DataElement
+    ds_chain: DatasetChain  # down to the dataset holding element
+    shape: tuple  # ((sequence tag, item index), ...) from the root down to that dataset
+
+def _is_sequence(ds: Dataset, raw) -> bool:
+    vr = raw.VR
+    if vr is None:
+        # implicit VR; the dictionary says, without reading a deferred value
+        try:
+            vr = datadict.dictionary_VR(raw.tag)
+        except KeyError:
+            vr = ds[raw.tag].VR
+    return vr == "SQ"
+
+class TagIndex:
+    """Where every sequence element of a dataset is, by tag, built in one walk.
+
+    Attached to a dataset with TagIndex.attach, it lets traverse() answer
+    a wildcard path of public tags by picking the sequence elements of the
+    path's last sequence tag whose (tag, item index) steps from the root
+    fit the path, rather than by scanning every item on the way. Only that
+    last hop and the final tag are then followed, so the matches are the
+    same, in the same order, as without the index.
+
+    Anything that adds, removes or replaces a sequence element of an
+    indexed dataset must report it through sequence_changed(); the editor
+    and add_tag do. Other elements are not indexed, so changing them needs
+    nothing.
+    """
+
+    ATTRIBUTE = "_tag_index"
+
+    def __init__(self, ds: Dataset):
+        self.ds = ds
+        self._build()
+
+    @staticmethod
+    def attach(ds: Dataset) -> "TagIndex":
+        """Index ds and attach the index to it."""
+        index = TagIndex(ds)
+        ds.__dict__[TagIndex.ATTRIBUTE] = index
+        return index
+
+    @staticmethod
+    def detach(ds: Dataset) -> None:
+        ds.__dict__.pop(TagIndex.ATTRIBUTE, None)
+
+    @staticmethod
+    def of(ds: Dataset) -> "TagIndex | None":
+        """The index attached to ds, if any; a copy of an indexed dataset has none."""
+        index = ds.__dict__.get(TagIndex.ATTRIBUTE)
+        if index is None or index.ds is not ds:
+            return None
+        return index
+
+    def __deepcopy__(self, memo) -> None:
+        # the index is keyed by id(), so a deep copy of ds starts without one
+        return None
+
+    def _build(self) -> None:
+        self.sequences: dict[int, list[_SequenceLocation]] = {}
+        # id() of every indexed dataset -> its chain and shape; the chain
+        # keeps the dataset alive, so its id is not reused
+        self._datasets: dict[int, tuple[DatasetChain, tuple]] = {}
+        self._unordered: set[int] = set()
+        self._index_below(DatasetChain(self.ds), ())
+
+    def _index_below(self, ds_chain: DatasetChain, shape: tuple) -> None:
+        # breadth first, so that the locations of one tag at one depth are
+        # appended in the order a traversal would reach them
+        pending = deque([(ds_chain, shape)])
+        while pending:
+            ds_chain, shape = pending.popleft()
+            ds = ds_chain[-1]
+            self._datasets[id(ds)] = (ds_chain, shape)
+            for raw in ds.elements():
+                if _is_sequence(ds, raw):
+                    element = ds[raw.tag]
+                    self._add(_SequenceLocation(element, ds_chain, shape))
+                    pending.extend(self._items(element, ds_chain, shape))
+
+    def _items(self, element, ds_chain: DatasetChain, shape: tuple) -> list:
+        tag = int(element.tag)
+        push = ds_chain.push
+        return [(push(item), shape + ((tag, i),)) for i, item in enumerate(element.value or ())]
+
+    def _add(self, location: _SequenceLocation) -> None:
+        self.sequences.setdefault(int(location.element.tag), []).append(location)
+
+    def sequence_changed(self, parent: Dataset, tag) -> None:
+        """Re-index parent's element tag, and all below it, after it was added, removed or replaced."""
+        entry = self._datasets.get(id(parent))
+        if entry is None:
+            # not a dataset this index has seen; start over
+            self._build()
+            return
+
+        ds_chain, shape = entry
+        tag = int(tag)
+        depth = len(shape)
+
+        def below(location_shape: tuple) -> bool:
+            return len(location_shape) > depth and location_shape[depth][0] == tag and location_shape[:depth] == shape
+
+        for key, locations in self.sequences.items():
+            self.sequences[key] = [
+                location
+                for location in locations
+                if not (below(location.shape) or (key == tag and location.shape == shape))
+            ]
+        self._datasets = {key: value for key, value in self._datasets.items() if not below(value[1])}
+
+        before = {key: len(locations) for key, locations in self.sequences.items()}
+        element = parent.get(tag)
+        if element is not None and element.VR == "SQ":
+            self._add(_SequenceLocation(element, ds_chain, shape))
+            for item_chain, item_shape in self._items(element, ds_chain, shape):
+                self._index_below(item_chain, item_shape)
+        # appended out of traversal order; sorted by shape when next used
+        self._unordered.update(key for key, locations in self.sequences.items() if len(locations) != before.get(key, 0))
+
+    @staticmethod
+    def answers(parsed_path: Path) -> bool:
+        """Whether the index can answer parsed_path: public tags and items, with a wildcard."""
+        if len(parsed_path) < 3 or not isinstance(parsed_path[-1], Segment):
+            return False
+        wildcard = False
+        for i, item in enumerate(parsed_path):
+            if i % 2 == 0:
+                if not isinstance(item, Segment) or item.is_private:
+                    return False
+            elif not isinstance(item, Sequence):
+                return False
+            else:
+                wildcard = wildcard or item.wildcard
+        return wildcard
+
+    def locations(self, parsed_path: Path) -> Iterator[_SequenceLocation]:
+        """The elements of the last sequence tag of parsed_path that the path leads to."""
+        last = len(parsed_path) - 3  # the last sequence tag; its item and the final tag follow
+        segment = parsed_path[last]
+        tag = (segment.group << 16) | segment.element
+        hops = [(parsed_path[i], parsed_path[i + 1]) for i in range(0, last, 2)]
+
+        locations = self.sequences.get(tag, [])
+        if tag in self._unordered:
+            locations.sort(key=lambda location: location.shape)
+            self._unordered.discard(tag)
+
+        for location in locations:
+            shape = location.shape
+            if len(shape) != len(hops):
+                continue
+            for (sequence_tag, index), (hop_segment, hop_item) in zip(shape, hops):
+                if sequence_tag != (hop_segment.group << 16) | hop_segment.element:
+                    break
+                if not hop_item.wildcard and index != hop_item.value:
+                    break
+            else:
+                yield location
+
+    def traverse(self, parsed_path: Path) -> Iterator[ElementPair]:
+        """The matches of traverse(self.ds, parsed_path), for a path answers() accepts."""
+        last = len(parsed_path) - 3
+        starts = ((location.element, location.ds_chain, last + 1) for location in self.locations(parsed_path))
+        return _traverse_branches(starts, parsed_path)
+
+def sequence_changed(root: Dataset, parent: Dataset, tag) -> None:
+    """Keep root's TagIndex, if it has one, in step after parent's sequence element tag changed."""
+    index = TagIndex.of(root)
+    if index is not None:
+        index.sequence_changed(parent, tag)
+
+class PathTrie:
+    """Paths merged on their common prefixes, each with payloads for its end.
+
+    walk() follows every path through a dataset at once, so a prefix
+    shared by many paths, such as a per-frame functional group sequence,
+    is traversed once rather than once per path.
+    """
+
+    def __init__(self):
+        self.children: dict = {}
+        self.payloads: list = []
+
+    def add(self, parsed_path: Path, payload) -> None:
+        node = self
+        for item in parsed_path:
+            node = node.children.setdefault(item, PathTrie())
+        node.payloads.append(payload)
+
+    def walk(self, ds: Dataset, visit) -> None:
+        """Call visit(element, payloads) for each element that traverse() finds for a path.
+
+        Like traverse(), the walk is iterative and depth first.
+        """
+        pending = [(self, ds, DatasetChain(ds))]
+        while pending:
+            node, ds, ds_chain = pending.pop()
+            if ds is None:
+                continue
+            if node.payloads:
+                visit(ds, node.payloads)
+
+            branches = []
+            for item, child in node.children.items():
+                if isinstance(item, Segment):
+                    next_ds, next_chain = _follow_segment(ds, ds_chain, item)
+                    branches.append((child, next_ds, next_chain))
+                else:
+                    for entry in _sequence_items(ds, item):
+                        branches.append((child, entry, ds_chain.push(entry)))
+            pending.extend(reversed(branches))
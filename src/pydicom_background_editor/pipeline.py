@@ -0,0 +1,151 @@
+"""
+Pipelined read/edit/write executor.
+
+Reading a file from the NAS, editing it and writing it back are run as
+three overlapping stages connected by bounded queues: reads and writes
+run on a thread pool (file I/O releases the GIL), while edits run on
+datasets that are already loaded, one at a time unless edit_threads is
+raised. Throughput approaches the slower of I/O and CPU instead of their
+sum, and the queue sizes bound how many datasets are held in memory at
+once.
+
+All edit threads share one Editor and one compiled plan per edit list
+(see Editor for the thread-safety contract). Under the GIL more than one
+edit thread only helps while edits wait on deferred reads; on a
+free-threaded build they edit in parallel.
+
+Files are read with deferred large elements, so the bulk of the pixel
+data is only pulled in by the write stage.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import pydicom
+
+from .editor import Editor, Operation, Plan
+from .batch import Job, JobResult, compile_cached
+from .plancache import PlanCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IO_THREADS = 4
+DEFAULT_EDIT_THREADS = 1
+DEFAULT_QUEUE_SIZE = 8
+
+_DONE = object()  # end-of-stream marker passed down the queues
+
+def _read(job: Job):
+    size = os.path.getsize(job.from_file)
+    return pydicom.dcmread(job.from_file, defer_size=1024), size
+
+def _write(job: Job, ds) -> None:
+    os.makedirs(os.path.dirname(job.to_file), exist_ok=True)
+    ds.save_as(job.to_file)
+
+def _error(job: Job, e: Exception, seconds: float) -> JobResult:
+    logger.error(f"Editing {job.from_file} failed: {type(e).__name__}: {e}")
+    return JobResult(job, "Error", f"{type(e).__name__}: {e}", seconds, 0)
+
+async def run_pipeline(
+    jobs: list[Job],
+    edit_groups: dict[str, list[Operation]],
+    io_threads: int = DEFAULT_IO_THREADS,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    on_result: Callable[[JobResult], None] | None = None,
+    edit_threads: int = DEFAULT_EDIT_THREADS,
+) -> list[JobResult]:
+    """Read, edit and write every job's file with the stages overlapped.
+
+    Up to io_threads files are read or written at a time, up to
+    edit_threads are edited at a time, and at most queue_size datasets
+    wait between each pair of stages. A failure in any stage is reported
+    in that job's JobResult. on_result, if given, is called with each
+    result as soon as its job finishes.
+    """
+    loop = asyncio.get_running_loop()
+    editor = Editor()
+    plans: dict[str, Plan] = {}
+    cache = PlanCache.from_env()
+    results: list[JobResult] = []
+
+    loaded: asyncio.Queue = asyncio.Queue(queue_size)
+    edited: asyncio.Queue = asyncio.Queue(queue_size)
+    pending = iter(jobs)
+
+    def finish(result: JobResult) -> None:
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+
+    async def reader(io_pool):
+        for job in pending:
+            start = time.perf_counter()
+            try:
+                ds, size = await loop.run_in_executor(io_pool, _read, job)
+            except Exception as e:
+                finish(_error(job, e, time.perf_counter() - start))
+                continue
+            await loaded.put((job, ds, size, time.perf_counter() - start))
+
+    async def edit_stage(edit_pool):
+        while (item := await loaded.get()) is not _DONE:
+            job, ds, size, seconds = item
+            start = time.perf_counter()
+            try:
+                key = job.plan_fingerprint or job.series_instance_uid
+                if key not in plans:
+                    operations = edit_groups[job.series_instance_uid]
+                    if job.plan_fingerprint:
+                        plans[key] = compile_cached(editor, operations, job.plan_fingerprint, cache)
+                    else:
+                        plans[key] = editor.compile(operations)
+                await loop.run_in_executor(edit_pool, editor.apply_plan, ds, plans[key])
+            except Exception as e:
+                finish(_error(job, e, seconds + time.perf_counter() - start))
+                continue
+            await edited.put((job, ds, size, seconds + time.perf_counter() - start))
+
+    async def writer(io_pool):
+        while (item := await edited.get()) is not _DONE:
+            job, ds, size, seconds = item
+            start = time.perf_counter()
+            try:
+                await loop.run_in_executor(io_pool, _write, job, ds)
+            except Exception as e:
+                finish(_error(job, e, seconds + time.perf_counter() - start))
+                continue
+            finish(JobResult(job, "OK", "", seconds + time.perf_counter() - start, size))
+
+    # edits get their own threads so a long one never holds up the loop,
+    # which keeps handing finished reads and writes to the I/O threads;
+    # plans are compiled on the loop, so each is compiled once
+    with ThreadPoolExecutor(io_threads) as io_pool, ThreadPoolExecutor(edit_threads) as edit_pool:
+        readers = [asyncio.create_task(reader(io_pool)) for _ in range(io_threads)]
+        writers = [asyncio.create_task(writer(io_pool)) for _ in range(io_threads)]
+        editors = [asyncio.create_task(edit_stage(edit_pool)) for _ in range(edit_threads)]
+
+        await asyncio.gather(*readers)
+        for _ in editors:
+            await loaded.put(_DONE)
+        await asyncio.gather(*editors)
+        for _ in writers:
+            await edited.put(_DONE)
+        await asyncio.gather(*writers)
+
+    return results
+
+def edit_pipelined(
+    jobs: list[Job],
+    edit_groups: dict[str, list[Operation]],
+    io_threads: int = DEFAULT_IO_THREADS,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    on_result: Callable[[JobResult], None] | None = None,
+    edit_threads: int = DEFAULT_EDIT_THREADS,
+) -> list[JobResult]:
+    """Synchronous wrapper around run_pipeline."""
+    return asyncio.run(run_pipeline(jobs, edit_groups, io_threads, queue_size, on_result, edit_threads))
@@ -0,0 +1,186 @@
+"""
+On-disk cache of compiled plans.
+
+Validating, optimizing and compiling an edit list costs far more than
+reading a file, and a one-shot process per edited file pays it for every
+file. When $PYDICOM_BACKGROUND_EDITOR_PLAN_CACHE names a directory, a
+compiled plan is stored there under a digest of the edit list it came
+from, and any later process with the same edit list loads it with a
+single read instead. Keys also fold in the versions of this
+package and of pydicom, so an upgrade never loads a plan an older
+release compiled.
+
+A plan is only stored after its edit list has passed validation, so a
+cached plan is also a validated one. Entries are marshalled tuples of
+strings and ints: step handlers are stored by name, and paths as their
+segments, so loading one parses no path. Each entry is written to a
+temporary file and renamed into place, so readers never see a partial
+entry and concurrent writers of the same entry are harmless. Anything
+that can not be read back is treated as a miss.
+"""
+
+import os
+import hashlib
+import functools
+import logging
+import marshal
+import tempfile
+from importlib import metadata
+
+import pydicom
+
+from .editor import Editor, Operation, Plan, PlanStep, EMPTY_SEQUENCE
+from .path import Path, Segment, Sequence, TagMask
+
+logger = logging.getLogger(__name__)
+
+PLAN_CACHE_ENV = "PYDICOM_BACKGROUND_EDITOR_PLAN_CACHE"
+
+# bump whenever the entry layout changes; a new release of this package
+# or of pydicom, which may compile edits differently, gets new keys anyway
+CACHE_FORMAT = 3
+MAGIC = b"PBEPLAN\n"
+
+@functools.cache
+def _versions() -> str:
+    """The versions every key folds in: the entry layout, this package and pydicom."""
+    try:
+        version = metadata.version("pydicom-background-editor")
+    except metadata.PackageNotFoundError:
+        version = "unknown"
+    return f"{CACHE_FORMAT}\x1f{version}\x1f{pydicom.__version__}"
+
+def edits_key(raw_edits: list[dict]) -> str:
+    """Cache key for the raw edit list of a Storable request."""
+    h = hashlib.sha256(f"edits\x1f{_versions()}\x1e".encode())
+    for edit in raw_edits:
+        for field in ("op", "tag", "tag_mode", "arg1", "arg2"):
+            # repr, so that a thawed 5 and "5" do not share an entry
+            h.update(repr(edit.get(field)).encode())
+            h.update(b"\x1f")
+        h.update(b"\x1e")
+
+    return h.hexdigest()
+
+def operations_key(fingerprint: str) -> str:
+    """Cache key for an edit list read from a CSV, given its plan_digest."""
+    return hashlib.sha256(f"ops\x1f{_versions()}\x1f{fingerprint}".encode()).hexdigest()
+
+def _dump_item(item) -> str | tuple:
+    if isinstance(item, Segment):
+        return item.tag
+    if isinstance(item, TagMask):
+        return (item.tag,)
+    return (item.value, item.wildcard)
+
+def _load_item(item: str | tuple):
+    if type(item) is str:
+        return Segment(item)
+    if len(item) == 1:
+        return TagMask(item[0])
+    return Sequence(f"<{item[0]}>" if item[1] else str(item[0]))
+
+def _dump_path(path: Path) -> tuple:
+    return tuple(_dump_item(item) for item in path)
+
+def _load_path(items: tuple) -> Path:
+    return Path(_load_item(item) for item in items)
+
+def _dump_step(step: PlanStep) -> tuple:
+    if step.value is EMPTY_SEQUENCE:
+        value = ("empty",)
+    elif step.handler.__name__ == "_run_fused":
+        value = ("steps", tuple(_dump_step(sub) for sub in step.value))
+    elif step.handler.__name__ == "_run_walk":
+        value = ("steps", tuple(_dump_step(sub) for sub in step.value[1]))
+    else:
+        value = ("value", step.value)
+
+    op = step.op
+    source = None if step.source is None else _dump_path(step.source)
+    return (step.handler.__name__, (op.op, op.tag, op.val1, op.val2, op.tag_mode), _dump_path(step.path), step.vr, value, source)
+
+def _load_step(editor: Editor, entry: tuple) -> PlanStep:
+    handler_name, op_fields, path, vr, (kind, *value), source = entry
+    op = Operation(*op_fields)
+
+    if kind == "empty":
+        value = EMPTY_SEQUENCE
+    elif kind == "steps":
+        subs = tuple(_load_step(editor, sub) for sub in value[0])
+        if handler_name == "_run_walk":
+            return editor._walk_step(op, subs)
+        value = subs
+    else:
+        value = value[0]
+
+    return PlanStep(
+        op,
+        getattr(editor, handler_name),
+        _load_path(path),
+        vr,
+        value,
+        None if source is None else _load_path(source),
+    )
+
+class PlanCache:
+    def __init__(self, directory):
+        self.directory = os.fspath(directory)
+
+    @staticmethod
+    def from_env() -> "PlanCache | None":
+        """The cache named by $PYDICOM_BACKGROUND_EDITOR_PLAN_CACHE, if it is set."""
+        directory = os.environ.get(PLAN_CACHE_ENV)
+        return PlanCache(directory) if directory else None
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".plan")
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def load(self, editor: Editor, key: str) -> Plan | None:
+        """The plan stored under key, bound to editor, or None on a miss."""
+        try:
+            with open(self.path(key), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        try:
+            if not data.startswith(MAGIC):
+                raise ValueError("not a plan cache entry")
+            entries = marshal.loads(data[len(MAGIC):])
+            plan = Plan(_load_step(editor, entry) for entry in entries)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable plan cache entry {self.path(key)}: {e}")
+            return None
+
+        logger.debug(f"Loaded plan {key} from the plan cache")
+        return plan
+
+    def store(self, key: str, plan: Plan) -> bool:
+        """Write plan under key; returns False if it could not be stored."""
+        try:
+            data = MAGIC + marshal.dumps(tuple(_dump_step(step) for step in plan))
+        except ValueError as e:
+            # a value marshal can not hold, such as an object thawed from a request
+            logger.debug(f"Not caching plan {key}: {e}")
+            return False
+
+        path = self.path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except OSError as e:
+            logger.warning(f"Could not write plan cache entry {path}: {e}")
+            return False
+
+        return True
@@ -0,0 +1,132 @@
+"""
+Size- and memory-aware scheduling of batch jobs.
+
+Series range from single-file CT to 901-file whole-slide pathology with
+multi-GB instances. Jobs are started largest first, which keeps the
+makespan short (a giant file started last would run alone at the end),
+and each is admitted only while the estimated memory of everything in
+flight stays under a budget, so a few giant files never run side by side.
+Whenever the next large job does not fit, the largest smaller job that
+does is started instead, so small files keep the remaining workers busy.
+"""
+
+import os
+import bisect
+import logging
+from concurrent.futures import Executor, Future, FIRST_COMPLETED, wait
+from typing import Callable, Iterator
+
+import pydicom
+
+logger = logging.getLogger(__name__)
+
+# Peak memory of reading, editing and writing a file, relative to its size
+MEMORY_OVERHEAD = 2.0
+# Extra bookkeeping per frame of a multi-frame file (fragment lists, offsets)
+FRAME_OVERHEAD = 512
+# Files smaller than this are estimated from their size alone, without
+# reading their header to count frames
+HEADER_THRESHOLD = 16 * 1024 * 1024
+
+def estimate_memory(path) -> int:
+    """Estimate the peak memory, in bytes, of editing the file at path."""
+    size = os.path.getsize(path)
+    estimate = int(size * MEMORY_OVERHEAD)
+
+    if size >= HEADER_THRESHOLD:
+        try:
+            ds = pydicom.dcmread(path, stop_before_pixels=True, specific_tags=["NumberOfFrames"])
+            frames = int(ds.get("NumberOfFrames") or 1)
+        except Exception:
+            frames = 1
+        estimate += frames * FRAME_OVERHEAD
+
+    return estimate
+
+def default_memory_budget() -> int:
+    """Three quarters of physical memory."""
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") * 3 // 4
+    except (ValueError, OSError):
+        return 8 * 1024**3
+
+def parse_size(value: str) -> int:
+    """Parse a size like 512M or 16G (or a plain number of bytes)."""
+    units = {"K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+    value = value.strip().upper().removesuffix("B")
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+class MemoryScheduler:
+    """Run jobs on an executor, largest first, within a memory budget.
+
+    Args:
+        budget: Bytes the estimates of all running jobs may add up to. A job
+            larger than the whole budget still runs, but only on its own.
+        slots: Most jobs to have running at once; normally the worker count.
+        estimate: Returns a job's estimated peak memory in bytes.
+        group: Optional key; jobs with equal estimates are started group by
+            group, e.g. to keep files that share a compiled plan together.
+    """
+
+    def __init__(
+        self,
+        budget: int,
+        slots: int,
+        estimate: Callable[[object], int],
+        group: Callable[[object], str] | None = None,
+    ):
+        self.budget = budget
+        self.slots = slots
+        self.estimate = estimate
+        self.group = group
+
+    def run(self, executor: Executor, fn: Callable, jobs: list) -> Iterator:
+        """Submit fn(job) for every job; yield the results as they finish."""
+        # one bucket per distinct estimate, ascending, so the largest job
+        # that fits is a bisect away; within a bucket, jobs keep their
+        # group, then submission order, from the end
+        group = self.group or (lambda job: "")
+        buckets: dict[int, list] = {}
+        for i, job in sorted(enumerate(jobs), key=lambda q: (group(q[1]), -q[0])):
+            buckets.setdefault(self.estimate(job), []).append(job)
+        sizes = sorted(buckets)
+        queue = [buckets[size] for size in sizes]
+        # emptied buckets are skipped by following below[i] down to the
+        # next candidate, halving the path on the way so that lookups stay
+        # cheap however many buckets have emptied
+        below = list(range(-1, len(queue) - 1))
+
+        def nonempty(i: int) -> int:
+            while i >= 0 and not queue[i]:
+                j = below[i]
+                if j >= 0 and not queue[j]:
+                    below[i] = below[j]
+                i = below[i]
+            return i
+
+        remaining = len(jobs)
+        in_flight: dict[Future, int] = {}
+        used = 0
+
+        while remaining or in_flight:
+            while remaining and len(in_flight) < self.slots:
+                if in_flight:
+                    fit = nonempty(bisect.bisect_right(sizes, self.budget - used) - 1)
+                    if fit < 0:
+                        break
+                else:
+                    # nothing running, so even an over-budget job may start
+                    fit = nonempty(len(queue) - 1)
+
+                job = queue[fit].pop()
+                remaining -= 1
+                estimate = sizes[fit]
+                in_flight[executor.submit(fn, job)] = estimate
+                used += estimate
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                used -= in_flight.pop(future)
+                yield future.result()
@@ -0,0 +1,145 @@
+"""
+Local edit service.
+
+Listens on a Unix domain socket for length-framed Storable requests, the
+same {edits, from_file, to_file} payloads and framing that --worker mode
+reads from stdin, and runs each one on a fixed-size pool of worker
+processes. Every Posda activity on a host can share the one bounded pool
+instead of each spawning its own editors.
+
+A connection may send any number of requests; each gets one framed
+response, in order.
+"""
+
+import os
+import sys
+import logging
+import argparse
+import threading
+import multiprocessing
+import socketserver
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .input import read_frame, write_frame, error_results
+from .client import DEFAULT_SOCKET, SOCKET_ENV
+
+logger = logging.getLogger(__name__)
+
+# per-process state of the pool workers, set up by _init_pool_worker
+_editor = None
+_compile = None
+
+def _init_pool_worker() -> None:
+    global _editor, _compile
+    from .main import warm_up, _compile_last_edits
+    from .editor import Editor
+
+    warm_up()
+    _editor = Editor()
+    _compile = _compile_last_edits(_editor)
+
+def _pool_edit(payload: bytes) -> dict:
+    from .main import run_request
+
+    return run_request(_editor, payload, _compile)
+
+class EditPool:
+    """A fixed number of editor processes shared by every connection.
+
+    The workers are forked from a forkserver that has already imported
+    the editor, so starting (or replacing) one is cheap. If a worker dies
+    mid-request the pool is rebuilt and the request is answered with an
+    error.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._context = multiprocessing.get_context("forkserver")
+        self._context.set_forkserver_preload(["pydicom_background_editor.main"])
+        self._executor = self._new_executor()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=self._context,
+            initializer=_init_pool_worker,
+        )
+
+    def run(self, payload: bytes) -> dict:
+        executor = self._executor
+        try:
+            return executor.submit(_pool_edit, payload).result()
+        except BrokenProcessPool as e:
+            logger.error("Edit worker died, restarting the pool")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = self._new_executor()
+            return error_results(f"{type(e).__name__}: {e}")
+
+    def shutdown(self) -> None:
+        self._executor.shutdown()
+
+class _EditRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        fd = self.connection.fileno()
+        while True:
+            try:
+                payload = read_frame(fd)
+            except EOFError:
+                logger.warning("Client disconnected in the middle of a request")
+                return
+            if payload is None:
+                return
+
+            write_frame(self.server.pool.run(payload), self.wfile)
+
+class EditServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, pool: EditPool):
+        self.pool = pool
+        super().__init__(socket_path, _EditRequestHandler)
+
+def serve(socket_path: str, workers: int) -> None:
+    """Serve edit requests on socket_path until interrupted."""
+    if os.path.exists(socket_path):
+        # left behind by a previous run; bind() would fail on it
+        os.unlink(socket_path)
+
+    pool = EditPool(workers)
+    try:
+        with EditServer(socket_path, pool) as server:
+            logger.info(f"Serving edits on {socket_path} with {workers} workers")
+            server.serve_forever()
+    finally:
+        pool.shutdown()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="pydicom-background-editor-service", description=__doc__)
+    parser.add_argument(
+        "--socket",
+        default=os.environ.get(SOCKET_ENV, DEFAULT_SOCKET),
+        help=f"Unix socket to listen on (default ${SOCKET_ENV} or {DEFAULT_SOCKET})",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of editor processes (default: one per CPU)",
+    )
+    return parser.parse_args(argv)
+
+def main() -> None:
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    args = parse_args()
+    try:
+        serve(args.socket, args.workers)
+    except KeyboardInterrupt:
+        sys.exit(0)
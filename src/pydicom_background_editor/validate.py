@@ -0,0 +1,197 @@
+"""
+Up-front validation of edit lists.
+
+Most mistakes in an edit list (a misspelled op, a private tag whose owner
+is not in the dictionary, a copy_from_tag source that does not parse)
+would otherwise only show up while the files are being edited, possibly
+after several GB of output have been written. validate_operations (and
+validate_edits, for the raw edits of a Storable request) check every op
+once and raise a PlanValidationError listing everything that is wrong,
+so the caller can reject the whole edit list before any file is read.
+"""
+
+import re
+from typing import TYPE_CHECKING
+
+from .path import Path, Segment, Sequence, TagMask, parse, parse_mask
+from .dictionaries import lookup_vr
+from .optimize import VR_OPS, MASK_OPS
+
+if TYPE_CHECKING:
+    from .editor import Operation
+
+SUPPORTED_TAG_MODES = {"exact", "mask"}
+
+_INT_VRS = {"IS", "SS", "US", "SL", "UL", "SV", "UV"}
+_FLOAT_VRS = {"DS", "FL", "FD"}
+_UID_RE = re.compile(r"[0-9]+(\.[0-9]+)*")
+_DATE_RE = re.compile(r"[0-9]{8}")
+
+class PlanValidationError(ValueError):
+    """An edit list failed validation; issues lists every problem found."""
+
+    def __init__(self, issues: list[str]):
+        self.issues = issues
+        super().__init__(f"{len(issues)} problem(s) in edit list: " + "; ".join(issues))
+
+def known_ops() -> set[str]:
+    """The op names the Editor has a handler for."""
+    from .editor import Editor
+
+    return {name[len("_op_"):] for name in vars(Editor) if name.startswith("_op_")}
+
+def _check_path(path: Path, what: str) -> list[str]:
+    issues = []
+    if not path:
+        return [f"{what} has no tags"]
+    if not isinstance(path[-1], (Segment, TagMask)):
+        issues.append(f"{what} must end with a tag, not a sequence item")
+
+    for i, item in enumerate(path):
+        expected = (Segment, TagMask) if i % 2 == 0 else Sequence
+        if not isinstance(item, expected):
+            issues.append(f"{what} must alternate tags and sequence items")
+            break
+
+    for i, item in enumerate(path):
+        if not isinstance(item, Segment):
+            continue
+        if item.is_private:
+            if not item.owner:
+                issues.append(f"{what}: private tag ({item.tag}) has no owner")
+            if item.group % 2 == 0:
+                issues.append(f"{what}: private tag ({item.tag}) is in an even group")
+            if item.element > 0xFF:
+                issues.append(f"{what}: private tag ({item.tag}) element is not a block offset (00-ff)")
+        elif i + 1 < len(path):
+            # a tag followed by an item index must be a sequence
+            try:
+                vr = lookup_vr(item)
+            except KeyError:
+                continue
+            if vr != "SQ":
+                issues.append(f"{what}: ({item.tag}) is not a sequence (VR {vr})")
+
+    return issues
+
+def _check_value(value, vr: str, what: str) -> list[str]:
+    if value is None or value == "":
+        return []
+    value = str(value)
+
+    for v in value.split("\\"):
+        v = v.strip()
+        if vr in _INT_VRS:
+            try:
+                int(v)
+            except ValueError:
+                return [f"{what}: {value!r} is not an integer, as VR {vr} requires"]
+        elif vr in _FLOAT_VRS:
+            try:
+                float(v)
+            except ValueError:
+                return [f"{what}: {value!r} is not a number, as VR {vr} requires"]
+        elif vr == "UI" and not _UID_RE.fullmatch(v):
+            return [f"{what}: {value!r} is not a UID"]
+        elif vr == "DA" and not _DATE_RE.fullmatch(v):
+            return [f"{what}: {value!r} is not a date (YYYYMMDD)"]
+
+    return []
+
+def _check_mask_operation(op: "Operation") -> list[str]:
+    if op.op not in MASK_OPS:
+        return [f"{op.op} does not support tag_mode 'mask'"]
+    try:
+        path = parse_mask(op.tag)
+    except (ValueError, TypeError) as e:
+        return [f"tag {op.tag!r} does not parse: {e}"]
+    return _check_path(path, f"tag {op.tag}")
+
+def _check_operation(op: "Operation", ops: set[str]) -> list[str]:
+    if op.op not in ops:
+        return [f"unknown op {op.op!r}"]
+    if op.tag_mode == "mask":
+        return _check_mask_operation(op)
+
+    try:
+        path = parse(op.tag)
+    except (ValueError, TypeError) as e:
+        return [f"tag {op.tag!r} does not parse: {e}"]
+
+    issues = _check_path(path, f"tag {op.tag}")
+    if issues:
+        return issues
+
+    vr = None
+    if op.op in VR_OPS or (op.op == "string_replace" and not path[-1].is_private):
+        try:
+            vr = lookup_vr(path[-1])
+        except KeyError:
+            return [f"tag {op.tag} is not in the dictionary, so its VR is unknown"]
+
+    if op.op == "set_tag" and vr == "SQ":
+        if op.val1:
+            issues.append("a sequence can only be set to empty")
+    elif op.op == "set_tag":
+        issues += _check_value(op.val1, vr, f"value for {op.tag}")
+    elif op.op == "substitute":
+        issues += _check_value(op.val2, vr, f"replacement for {op.tag}")
+    elif op.op == "shift_date":
+        try:
+            int(op.val1)
+        except (ValueError, TypeError):
+            issues.append(f"days to shift {op.val1!r} is not an integer")
+    elif op.op == "hash_unhashed_uid":
+        if not op.val1:
+            issues.append("no UID root given")
+        elif not _UID_RE.fullmatch(str(op.val1)):
+            issues.append(f"UID root {op.val1!r} is not a UID")
+    elif op.op == "copy_from_tag":
+        if not op.val1:
+            issues.append("no source tag given")
+        else:
+            try:
+                source = parse(f"<{str(op.val1).strip('<>')}>")
+            except (ValueError, TypeError) as e:
+                issues.append(f"source tag {op.val1!r} does not parse: {e}")
+            else:
+                issues += _check_path(source, f"source tag {op.val1}")
+
+    return issues
+
+def validate_operations(operations: list["Operation"]) -> None:
+    """Check every op of an edit list; raise PlanValidationError if any is bad."""
+    ops = known_ops()
+    issues = []
+    for i, op in enumerate(operations, 1):
+        for issue in _check_operation(op, ops):
+            issues.append(f"op {i} ({op.op} {op.tag}): {issue}")
+
+    if issues:
+        raise PlanValidationError(issues)
+
+def validate_edits(raw_edits: list[dict]) -> None:
+    """Check the raw edits of a request, including their tag modes.
+
+    Raises PlanValidationError listing every problem found.
+    """
+    from .editor import Operation
+
+    ops = known_ops()
+    issues = []
+    for i, edit in enumerate(raw_edits, 1):
+        missing = [key for key in ("op", "tag", "tag_mode", "arg1", "arg2") if key not in edit]
+        if missing:
+            issues.append(f"op {i}: missing {', '.join(missing)}")
+            continue
+
+        if edit["tag_mode"] not in SUPPORTED_TAG_MODES:
+            issues.append(f"op {i} ({edit['op']} {edit['tag']}): unsupported tag_mode {edit['tag_mode']!r}")
+            continue
+
+        op = Operation(op=edit["op"], tag=edit["tag"], val1=edit["arg1"], val2=edit["arg2"], tag_mode=edit["tag_mode"])
+        for issue in _check_operation(op, ops):
+            issues.append(f"op {i} ({op.op} {op.tag}): {issue}")
+
+    if issues:
+        raise PlanValidationError(issues)
@@ -0,0 +1,56 @@
+"""Helpers for building DICOM files and framed Storable requests in tests."""
+
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, generate_uid
+from storable.core import thaw
+from storable.output import serialize
+
+from pydicom_background_editor.input import FRAME_HEADER
+
+
+def write_dicom(path, **attributes):
+    ds = Dataset()
+    ds.PatientName = "Test^Patient"
+    ds.SOPClassUID = "1.2.840.10008.5.1.4.1.1.7"
+    ds.SOPInstanceUID = generate_uid()
+    for keyword, value in attributes.items():
+        setattr(ds, keyword, value)
+
+    ds.file_meta = FileMetaDataset()
+    ds.file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
+    ds.file_meta.MediaStorageSOPClassUID = ds.SOPClassUID
+    ds.file_meta.MediaStorageSOPInstanceUID = ds.SOPInstanceUID
+
+    ds.save_as(path, enforce_file_format=True)
+
+
+def frame(data):
+    encoded = serialize(data, pst_prefix=False)
+    return FRAME_HEADER.pack(len(encoded)) + encoded
+
+
+def read_responses(raw):
+    responses = []
+    offset = 0
+    while offset < len(raw):
+        (size,) = FRAME_HEADER.unpack_from(raw, offset)
+        offset += FRAME_HEADER.size
+        responses.append(thaw(raw[offset:offset + size]))
+        offset += size
+    return responses
+
+
+def make_request(from_file, to_file, name):
+    return {
+        "edits": [
+            {
+                "arg1": name,
+                "arg2": "unused",
+                "op": "set_tag",
+                "tag": "(0010,0010)",
+                "tag_mode": "exact",
+            },
+        ],
+        "from_file": str(from_file),
+        "to_file": str(to_file),
+    }
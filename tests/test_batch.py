@@ -0,0 +1,246 @@
+import io
+
+import pydicom
+import pytest
+
+from pydicom_background_editor.batch import (
+    build_jobs,
+    main,
+    print_report,
+    resolve_from_directory,
+    resolve_from_manifest,
+    run_batch,
+    summarize,
+)
+from pydicom_background_editor.main import read_edit_csv
+
+from framing import write_dicom
+
+SERIES_A = "1.2.3.4.1"
+SERIES_B = "1.2.3.4.2"
+
+EDIT_CSV = f"""series_instance_uid,num_files,op,tag,val1,val2
+{SERIES_A},2,,,,
+,,set_tag,"<(0010,0010)>",<Edited^A>,<>
+,,set_tag,"<(0018,0015)>",<HEAD>,<>
+{SERIES_B},1,,,,
+,,set_tag,"<(0010,0010)>",<Edited^B>,<>
+"""
+
+
+def make_series(tmp_path):
+    source = tmp_path / "source"
+    (source / "a").mkdir(parents=True)
+    (source / "b").mkdir()
+    write_dicom(source / "a" / "1.dcm", SeriesInstanceUID=SERIES_A)
+    write_dicom(source / "a" / "2.dcm", SeriesInstanceUID=SERIES_A)
+    write_dicom(source / "b" / "1.dcm", SeriesInstanceUID=SERIES_B)
+    (source / "notes.txt").write_text("not a DICOM file")
+
+    edits = tmp_path / "edits.csv"
+    edits.write_text(EDIT_CSV)
+    return source, edits
+
+
+def test_resolve_from_directory(tmp_path):
+    source, _ = make_series(tmp_path)
+
+    files = resolve_from_directory(source)
+
+    assert sorted(files) == [SERIES_A, SERIES_B]
+    assert len(files[SERIES_A]) == 2
+    assert files[SERIES_B] == [str(source / "b" / "1.dcm")]
+
+
+def test_resolve_from_manifest(tmp_path):
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text(f"series_instance_uid,file\n{SERIES_A},/x/1.dcm\n{SERIES_A},/x/2.dcm\n")
+
+    assert resolve_from_manifest(manifest) == {SERIES_A: ["/x/1.dcm", "/x/2.dcm"]}
+
+
+def test_run_batch_edits_every_series(tmp_path):
+    source, edits = make_series(tmp_path)
+    output = tmp_path / "output"
+
+    edit_groups = read_edit_csv(edits)
+    jobs = build_jobs(edit_groups, resolve_from_directory(source), output)
+    results = run_batch(jobs, edit_groups, workers=2)
+
+    assert len(results) == 3
+    assert all(r.status == "OK" for r in results)
+
+    edited = pydicom.dcmread(output / SERIES_A / "1.dcm")
+    assert edited.PatientName == "Edited^A"
+    assert edited.BodyPartExamined == "HEAD"
+    assert pydicom.dcmread(output / SERIES_B / "1.dcm").PatientName == "Edited^B"
+
+    reports = {r.series_instance_uid: r for r in summarize(results)}
+    assert reports[SERIES_A].files == 2
+    assert reports[SERIES_B].failed == 0
+
+    out = io.StringIO()
+    print_report(list(reports.values()), 1.0, out)
+    assert "3 files (0 failed)" in out.getvalue()
+
+
+def test_run_batch_reports_failures(tmp_path):
+    source, edits = make_series(tmp_path)
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text(
+        "series_instance_uid,file\n"
+        f"{SERIES_B},{source / 'b' / '1.dcm'}\n"
+        f"{SERIES_B},{source / 'b' / 'missing.dcm'}\n"
+    )
+
+    edit_groups = read_edit_csv(edits)
+    jobs = build_jobs(edit_groups, resolve_from_manifest(manifest), tmp_path / "output")
+    results = run_batch(jobs, edit_groups, workers=1)
+
+    statuses = sorted(r.status for r in results)
+    assert statuses == ["Error", "OK"]
+    (report,) = summarize(results)
+    assert report.failed == 1
+
+
+def test_main(tmp_path, capsys):
+    source, edits = make_series(tmp_path)
+    output = tmp_path / "output"
+
+    main([str(edits), str(output), "--source-dir", str(source), "--workers", "2"])
+
+    assert "3 files (0 failed)" in capsys.readouterr().out
+    assert (output / SERIES_A / "2.dcm").exists()
+
+
+def test_files_of_one_series_with_the_same_name_are_refused(tmp_path):
+    source, edits = make_series(tmp_path)
+    write_dicom(source / "b" / "2.dcm", SeriesInstanceUID=SERIES_A)
+    output = tmp_path / "output"
+
+    with pytest.raises(ValueError, match="2.dcm"):
+        build_jobs(read_edit_csv(edits), resolve_from_directory(source), output)
+
+    with pytest.raises(SystemExit, match="no files were edited"):
+        main([str(edits), str(output), "--source-dir", str(source)])
+    assert not output.exists()
+
+
+SERIES_C = "1.2.3.4.3"
+SERIES_D = "1.2.3.4.4"
+
+SHARED_CSV = f"""series_instance_uid,num_files,op,tag,val1,val2
+{SERIES_A},1,,,,
+{SERIES_B},1,,,,
+,,set_tag,"<(0010,0010)>",<Shared>,<>
+{SERIES_C},1,,,,
+,,set_tag,"<(0018,0015)>",<HEAD>,<>
+{SERIES_D},1,,,,
+,,set_tag,"<(0010,0010)>",<Shared>,<>
+{SERIES_B},1,,,,
+,,set_tag,"<(0018,0015)>",<HEAD>,<>
+"""
+
+
+def test_identical_edit_lists_share_a_plan(tmp_path, monkeypatch):
+    from pydicom_background_editor import batch
+    from pydicom_background_editor.editor import Editor
+
+    edits = tmp_path / "edits.csv"
+    edits.write_text(SHARED_CSV)
+    edit_groups = read_edit_csv(edits)
+
+    # A and D have the same ops (from two groups); B is in two groups, and
+    # its merged list must not leak into A's
+    assert edit_groups[SERIES_A] is edit_groups[SERIES_D]
+    assert len(edit_groups[SERIES_A]) == 1
+    assert len(edit_groups[SERIES_B]) == 2
+
+    files = {uid: [str(tmp_path / uid / "1.dcm")] for uid in edit_groups}
+    for uid, (path,) in files.items():
+        (tmp_path / uid).mkdir()
+        write_dicom(path, SeriesInstanceUID=uid)
+
+    jobs = build_jobs(edit_groups, files, tmp_path / "output")
+    # jobs sharing a plan are kept together
+    assert [job.series_instance_uid for job in jobs] == [SERIES_A, SERIES_D, SERIES_B, SERIES_C]
+    assert jobs[0].plan_fingerprint == jobs[1].plan_fingerprint
+    assert len({job.plan_fingerprint for job in jobs}) == 3
+
+    compiled = []
+    real_compile = Editor.compile
+
+    def compile(self, operations, *args, **kwargs):
+        compiled.append(operations)
+        return real_compile(self, operations, *args, **kwargs)
+
+    monkeypatch.setattr(Editor, "compile", compile)
+    batch._init_worker({job.plan_fingerprint: edit_groups[job.series_instance_uid] for job in jobs})
+    results = [batch._run_job(job) for job in jobs]
+
+    assert all(r.status == "OK" for r in results)
+    assert len(compiled) == 3
+    assert pydicom.dcmread(tmp_path / "output" / SERIES_D / "1.dcm").PatientName == "Shared"
+
+
+def test_main_optimizes_each_shared_edit_list_once(tmp_path, monkeypatch, caplog):
+    from pydicom_background_editor import batch
+
+    source = tmp_path / "source"
+    for uid in (SERIES_A, SERIES_B, SERIES_C):
+        (source / uid).mkdir(parents=True)
+        write_dicom(source / uid / "1.dcm", SeriesInstanceUID=uid)
+    edits = tmp_path / "edits.csv"
+    edits.write_text(f"""series_instance_uid,num_files,op,tag,val1,val2
+{SERIES_A},1,,,,
+{SERIES_B},1,,,,
+{SERIES_C},1,,,,
+,,set_tag,"<(0010,0010)>",<Shared>,<>
+,,set_tag,"<(0010,0010)>",<Shared>,<>
+""")
+
+    optimized = []
+    real_optimize = batch.optimize
+
+    def optimize(operations):
+        optimized.append(operations)
+        return real_optimize(operations)
+
+    monkeypatch.setattr(batch, "optimize", optimize)
+    with caplog.at_level("INFO", logger="pydicom_background_editor.batch"):
+        main([str(edits), str(tmp_path / "output"), "--source-dir", str(source), "--io-threads", "1"])
+
+    assert len(optimized) == 1
+    reports = [r.message for r in caplog.records if "duplicate" in r.message]
+    assert len(reports) == 1 and "for 3 series" in reports[0]
+
+
+def test_main_validates_each_edit_list_once(tmp_path, monkeypatch):
+    from pydicom_background_editor import batch
+
+    source, edits = make_series(tmp_path)
+    validated = []
+    real_validate = batch.validate_operations
+
+    def validate_operations(operations):
+        validated.append(operations)
+        real_validate(operations)
+
+    monkeypatch.setattr(batch, "validate_operations", validate_operations)
+    main([str(edits), str(tmp_path / "output"), "--source-dir", str(source), "--io-threads", "1"])
+
+    assert len(validated) == 2
+
+
+def test_main_rejects_bad_edits_before_editing(tmp_path):
+    import pytest
+
+    source, edits = make_series(tmp_path)
+    edits.write_text(EDIT_CSV + ',,shift_date,"<(0008,0020)>",<soon>,<>\n')
+    output = tmp_path / "output"
+
+    with pytest.raises(SystemExit) as excinfo:
+        main([str(edits), str(output), "--source-dir", str(source)])
+
+    assert "1 problem(s)" in str(excinfo.value.code)
+    assert not output.exists()
@@ -0,0 +1,98 @@
+from pathlib import Path
+
+import pytest
+from pydicom.dataset import Dataset
+
+from pydicom_background_editor.codegen import compile_function, generate_source
+from pydicom_background_editor.editor import Editor, Operation
+from pydicom_background_editor.main import read_edit_csv
+
+from dataset import make_test_dataset
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PLANS = {
+    "set and delete": [
+        Operation("set_tag", "<(0010,0010)>", "Anon^Patient", ""),
+        Operation("set_tag", "<(0008,1030)>", "x" * 100, ""),
+        Operation("delete_tag", "<(0008,0020)>", "", ""),
+        Operation("delete_tag", "<(0010,4000)>", "", ""),
+        Operation("empty_tag", "<(0010,0020)>", "", ""),
+    ],
+    "nested paths": [
+        Operation("set_tag", "<(0040,0275)[0](0040,0007)>", "Created", ""),
+        Operation("set_tag", "<(0040,0275)[0](0040,0009)>", "Added", ""),
+        Operation("set_tag", "<(0012,0064)[1](0008,0100)>", "113100", ""),
+        Operation("empty_tag", "<(0040,a730)[3](0040,a160)>", "", ""),
+        Operation("set_tag", "<(0012,0064)>", "", ""),
+        Operation("delete_tag", "<(0008,1115)[0](0008,114a)[0](0008,1150)>", "", ""),
+    ],
+    "value edits": [
+        Operation("string_replace", "<(0020,000d)>", "12345", "54321"),
+        Operation("shift_date", "<(0020,000d)>", "3", ""),
+        Operation("shift_date", "<(0008,0020)>", "-30", ""),
+        Operation("shift_date", "<(0008,002a)>", "10", ""),
+        Operation("substitute", "<(0008,0021)>", "20241025", "20240101"),
+        Operation("hash_unhashed_uid", "<(0008,1115)[0](0008,114a)[0](0008,1150)>", "1.2.3", ""),
+        Operation("hash_unhashed_uid", "<(0008,1115)[<0>](0008,114a)[<0>](0008,1155)>", "1.2.3", ""),
+        Operation("string_replace", "<(0008,0008)>", "PRIMARY", "SECONDARY"),
+    ],
+    "handler fallbacks": [
+        Operation("set_tag", '<(0013,"CTP",10)>', "Project", ""),
+        Operation("delete_tag", '<(0013,"CTP",11)>', "", ""),
+        Operation("copy_from_tag", "<(0008,1030)>", "<(0010,0010)>", ""),
+        Operation("shift_date", "<(0008,0020)>", "soon", ""),
+        Operation("set_tag", "<(0008,1115)[<0>](0008,114a)[<0>](0008,1150)>", "1.2.3.4", ""),
+    ],
+}
+
+
+def assert_same_edits(operations, make=make_test_dataset):
+    editor = Editor()
+    for optimized in (True, False):
+        plan = editor.compile(operations, optimized=optimized)
+        function = compile_function(editor, plan)
+
+        expected, actual = make(), make()
+        try:
+            editor.apply_plan(expected, plan)
+        except Exception as e:
+            # whatever the interpreter did before failing, the function does too
+            with pytest.raises(type(e)):
+                function(actual)
+        else:
+            function(actual)
+
+        assert actual == expected
+
+
+@pytest.mark.parametrize("name", PLANS)
+def test_generated_function_edits_like_the_interpreter(name):
+    assert_same_edits(PLANS[name])
+
+
+@pytest.mark.parametrize("name", PLANS)
+def test_generated_function_edits_an_empty_dataset_like_the_interpreter(name):
+    assert_same_edits(PLANS[name], Dataset)
+
+
+def test_example_csv_edits(tmp_path):
+    for operations in read_edit_csv(ROOT / "background_editor_example_input.csv").values():
+        assert_same_edits(operations)
+
+
+def test_public_fixed_paths_are_inlined():
+    editor = Editor()
+    source, _ = generate_source(editor, editor.compile(PLANS["set and delete"] + PLANS["nested paths"]))
+
+    assert "by its handler" not in source
+    assert "traverse" not in source
+
+
+def test_tags_can_not_inject_code():
+    editor = Editor()
+    plan = editor.compile([Operation("delete_tag", "<(0010,0010)>\nraise SystemExit", "", "")])
+    source, _ = generate_source(editor, plan)
+
+    assert "\nraise SystemExit" not in source
+    compile_function(editor, plan)(make_test_dataset())
@@ -180,5 +180,18 @@ def test_translate_edits():
     operations = Operation.translate_edits(data["edits"])
     print(operations)
 
+def test_operations_are_slotted_and_share_strings():
+    rows = [
+        {"op": "".join(["subst", "itute"]), "tag": "".join(["<(0008,", "0018)>"]), "val1": "<1.2.3>", "val2": "<1.2.4>"},
+        {"op": "".join(["subst", "itute"]), "tag": "".join(["<(0008,", "0018)>"]), "val1": "<1.2.3>", "val2": "<1.2.5>"},
+    ]
+    first, second = (Operation.from_csv_row(row) for row in rows)
+
+    assert not hasattr(first, "__dict__")
+    assert first.op is second.op
+    assert first.tag is second.tag
+    assert first.val1 is second.val1
+    assert first.val2 == "1.2.4" and second.val2 == "1.2.5"
+
 if __name__ == "__main__":
-    test_translate_edits()
\ No newline at end of file
+    test_translate_edits()
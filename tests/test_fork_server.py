@@ -0,0 +1,121 @@
+import os
+import signal
+
+import pydicom
+
+from pydicom_background_editor import main as main_module
+from pydicom_background_editor.input import FRAME_HEADER
+from pydicom_background_editor.main import fork_server
+
+from framing import write_dicom, frame, read_responses, make_request
+
+
+def run_fork_server(frames, tmp_path):
+    read_fd, write_fd = os.pipe()
+    os.write(write_fd, b"".join(frames))
+    os.close(write_fd)
+
+    # the server forks, so write to a real file rather than a Python buffer
+    out_path = tmp_path / "responses.bin"
+    try:
+        with open(out_path, "wb") as out:
+            fork_server(read_fd, out)
+    finally:
+        os.close(read_fd)
+
+    return read_responses(out_path.read_bytes())
+
+
+def test_fork_server_handles_multiple_requests(tmp_path):
+    source = tmp_path / "in.dcm"
+    write_dicom(source)
+
+    responses = run_fork_server([
+        frame(make_request(source, tmp_path / "out1.dcm", "First^Edit")),
+        frame(make_request(source, tmp_path / "out2.dcm", "Second^Edit")),
+    ], tmp_path)
+
+    assert [r["Status"] for r in responses] == ["OK", "OK"]
+    assert pydicom.dcmread(tmp_path / "out1.dcm").PatientName == "First^Edit"
+    assert pydicom.dcmread(tmp_path / "out2.dcm").PatientName == "Second^Edit"
+
+
+def test_fork_server_survives_crashing_child(tmp_path, monkeypatch):
+    source = tmp_path / "in.dcm"
+    write_dicom(source)
+    crash_file = tmp_path / "crash.dcm"
+
+    real_edit_file = main_module.edit_file
+
+    def edit_file(editor, operations, from_file, to_file):
+        if to_file == str(crash_file):
+            os.kill(os.getpid(), signal.SIGKILL)
+        real_edit_file(editor, operations, from_file, to_file)
+
+    monkeypatch.setattr(main_module, "edit_file", edit_file)
+
+    responses = run_fork_server([
+        frame(make_request(source, crash_file, "First^Edit")),
+        frame(make_request(source, tmp_path / "out2.dcm", "Second^Edit")),
+    ], tmp_path)
+
+    assert responses[0]["Status"] == "Error"
+    assert str(-signal.SIGKILL) in responses[0]["message"]
+    assert responses[1]["Status"] == "OK"
+    assert pydicom.dcmread(tmp_path / "out2.dcm").PatientName == "Second^Edit"
+
+
+def test_child_dying_halfway_through_its_response_does_not_desync(tmp_path, monkeypatch):
+    source = tmp_path / "in.dcm"
+    write_dicom(source)
+    crash_once = tmp_path / "crash-once"
+    crash_once.touch()
+
+    server = os.getpid()
+    real_write_frame = main_module.write_frame
+
+    def write_frame(results, stream):
+        if os.getpid() != server and crash_once.exists():
+            crash_once.unlink()
+            encoded = frame(results)
+            stream.write(encoded[:len(encoded) // 2])
+            stream.flush()
+            os.kill(os.getpid(), signal.SIGKILL)
+        real_write_frame(results, stream)
+
+    monkeypatch.setattr(main_module, "write_frame", write_frame)
+
+    responses = run_fork_server([
+        frame(make_request(source, tmp_path / "out1.dcm", "First^Edit")),
+        frame(make_request(source, tmp_path / "out2.dcm", "Second^Edit")),
+    ], tmp_path)
+
+    assert [r["Status"] for r in responses] == ["Error", "OK"]
+    assert str(-signal.SIGKILL) in responses[0]["message"]
+
+
+def test_fork_server_compiles_in_the_parent_once_per_edit_list(tmp_path, monkeypatch):
+    source = tmp_path / "in.dcm"
+    write_dicom(source)
+
+    compiled = []
+    real_compile_edits = main_module.compile_edits
+
+    def compile_edits(editor, edits):
+        # children can not append to the parent's list, so this only
+        # counts compiles done before forking
+        compiled.append(edits)
+        return real_compile_edits(editor, edits)
+
+    monkeypatch.setattr(main_module, "compile_edits", compile_edits)
+
+    responses = run_fork_server([
+        frame(make_request(source, tmp_path / "out1.dcm", "Same^Edit")),
+        frame(make_request(source, tmp_path / "out2.dcm", "Same^Edit")),
+        frame(make_request(source, tmp_path / "out3.dcm", "Other^Edit")),
+        FRAME_HEADER.pack(3) + b"bad",
+    ], tmp_path)
+
+    assert [r["Status"] for r in responses] == ["OK", "OK", "OK", "Error"]
+    assert len(compiled) == 2
+    assert pydicom.dcmread(tmp_path / "out2.dcm").PatientName == "Same^Edit"
@@ -0,0 +1,107 @@
+import os
+import threading
+import time
+
+import pytest
+from storable.core import deserialize
+from storable.output import serialize
+
+from pydicom_background_editor.input import StreamReader, CHUNK_SIZE
+
+
+def make_edits(count):
+    return {
+        "edits": [
+            {
+                "arg1": f"value {i}",
+                "arg2": "unused",
+                "op": "set_tag",
+                "tag": f"(0010,{i % 0xffff:04x})",
+                "tag_mode": "exact",
+            }
+            for i in range(count)
+        ],
+        "from_file": "/tmp/in.dcm",
+        "to_file": "/tmp/out.dcm",
+    }
+
+
+def feed(pieces, delay=0.0):
+    """Return a read fd that receives pieces from a background writer."""
+    read_fd, write_fd = os.pipe()
+
+    def writer():
+        for piece in pieces:
+            os.write(write_fd, piece)
+            time.sleep(delay)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    return read_fd, write_fd, thread
+
+
+def test_reads_value_split_across_writes():
+    data = make_edits(3)
+    encoded = serialize(data)
+    pieces = [encoded[i:i + 7] for i in range(0, len(encoded), 7)]
+
+    read_fd, write_fd, thread = feed(pieces, delay=0.001)
+    try:
+        # the writer never closes its end, like the Posda caller
+        assert deserialize(StreamReader(read_fd, timeout=5)) == data
+    finally:
+        thread.join()
+        os.close(write_fd)
+        os.close(read_fd)
+
+
+def test_reads_value_larger_than_one_chunk():
+    data = make_edits(5000)
+    encoded = serialize(data)
+    assert len(encoded) > 4 * CHUNK_SIZE
+
+    read_fd, write_fd, thread = feed([encoded])
+    try:
+        reader = StreamReader(read_fd, timeout=5, keep=True)
+        assert deserialize(reader) == data
+        assert reader.kept() == encoded
+    finally:
+        thread.join()
+        os.close(write_fd)
+        os.close(read_fd)
+
+
+def test_reads_value_without_file_magic():
+    data = make_edits(2)
+    encoded = serialize(data, pst_prefix=False)
+
+    read_fd, write_fd, thread = feed([encoded])
+    try:
+        assert deserialize(StreamReader(read_fd, timeout=5)) == data
+    finally:
+        thread.join()
+        os.close(write_fd)
+        os.close(read_fd)
+
+
+def test_truncated_value_raises():
+    encoded = serialize(make_edits(2))
+
+    read_fd, write_fd = os.pipe()
+    os.write(write_fd, encoded[:-10])
+    os.close(write_fd)
+    try:
+        with pytest.raises(EOFError):
+            deserialize(StreamReader(read_fd, timeout=5))
+    finally:
+        os.close(read_fd)
+
+
+def test_no_input_times_out():
+    read_fd, write_fd = os.pipe()
+    try:
+        with pytest.raises(TimeoutError):
+            deserialize(StreamReader(read_fd, timeout=0.05))
+    finally:
+        os.close(write_fd)
+        os.close(read_fd)
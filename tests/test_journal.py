@@ -0,0 +1,89 @@
+from pydicom_background_editor.batch import build_jobs, resolve_from_directory, run_batch
+from pydicom_background_editor.editor import Operation
+from pydicom_background_editor.journal import Journal, input_digest, plan_digest
+from pydicom_background_editor.main import read_edit_csv
+
+from test_batch import SERIES_A, make_series
+
+
+def test_journal_round_trip(tmp_path):
+    path = tmp_path / "journal.tsv"
+    (tmp_path / "out.dcm").write_bytes(b"")
+    to_file = str(tmp_path / "out.dcm")
+
+    with Journal(path) as journal:
+        journal.record("OK", "/in/a\tb.dcm", "d1", "p1", to_file)
+        journal.record("Error", "/in/c.dcm", "d2", "p1", to_file)
+
+    with Journal(path) as journal:
+        assert journal.load() == 2
+        assert journal.is_done("/in/a\tb.dcm", "d1", "p1", to_file)
+        assert not journal.is_done("/in/a\tb.dcm", "d1", "p2", to_file)  # other plan
+        assert not journal.is_done("/in/a\tb.dcm", "d9", "p1", to_file)  # input changed
+        assert not journal.is_done("/in/c.dcm", "d2", "p1", to_file)  # failed
+
+
+def test_journal_later_failure_overrides_success(tmp_path):
+    path = tmp_path / "journal.tsv"
+    to_file = str(tmp_path / "out.dcm")
+    (tmp_path / "out.dcm").write_bytes(b"")
+
+    with Journal(path) as journal:
+        journal.record("OK", "/in/a.dcm", "d1", "p1", to_file)
+        journal.record("Error", "/in/a.dcm", "d1", "p1", to_file)
+        journal.load()
+        assert not journal.is_done("/in/a.dcm", "d1", "p1", to_file)
+
+
+def test_journal_ignores_torn_last_line(tmp_path):
+    path = tmp_path / "journal.tsv"
+    to_file = str(tmp_path / "out.dcm")
+    (tmp_path / "out.dcm").write_bytes(b"")
+
+    with Journal(path) as journal:
+        journal.record("OK", "/in/a.dcm", "d1", "p1", to_file)
+    with open(path, "a") as f:
+        f.write("OK\td2\tp1\t" + to_file)
+
+    with Journal(path) as journal:
+        assert journal.load() == 1
+
+
+def test_plan_digest_changes_with_operations():
+    ops = [Operation("set_tag", "<(0010,0010)>", "A", "")]
+
+    assert plan_digest(ops) == plan_digest([Operation("set_tag", "<(0010,0010)>", "A", "")])
+    assert plan_digest(ops) != plan_digest([Operation("set_tag", "<(0010,0010)>", "B", "")])
+
+
+def test_input_digest_changes_with_file(tmp_path):
+    path = tmp_path / "file"
+    path.write_bytes(b"one")
+    first = input_digest(path)
+    path.write_bytes(b"three")
+
+    assert input_digest(path) != first
+
+
+def test_batch_resumes_from_journal(tmp_path):
+    source, edits = make_series(tmp_path)
+    output = tmp_path / "output"
+    edit_groups = read_edit_csv(edits)
+    files = resolve_from_directory(source)
+
+    with Journal(tmp_path / "journal.tsv") as journal:
+        results = run_batch(build_jobs(edit_groups, files, output), edit_groups, 2, journal)
+        assert len(results) == 3
+
+        # everything is done, so a rerun edits nothing
+        assert run_batch(build_jobs(edit_groups, files, output), edit_groups, 2, journal) == []
+
+        # a missing output is redone
+        (output / SERIES_A / "1.dcm").unlink()
+        results = run_batch(build_jobs(edit_groups, files, output), edit_groups, 2, journal)
+        assert [r.job.to_file for r in results] == [str(output / SERIES_A / "1.dcm")]
+
+        # a changed plan redoes the whole series
+        edit_groups[SERIES_A] = edit_groups[SERIES_A][:1]
+        results = run_batch(build_jobs(edit_groups, files, output), edit_groups, 2, journal)
+        assert sorted(r.job.series_instance_uid for r in results) == [SERIES_A, SERIES_A]
@@ -0,0 +1,200 @@
+from pydicom_background_editor.editor import Editor, Operation
+from pydicom_background_editor.optimize import optimize, fusion_runs
+from pydicom_background_editor.path import parse, paths_may_alias
+
+from dataset import make_test_dataset
+
+UID_ROOT = "1.2.840.12345"
+NEW_ROOT = "1.2.840.12345.99"
+
+
+def assert_same_result(operations):
+    """The optimized plan must edit a dataset exactly like the plain one."""
+    editor = Editor()
+    plain = make_test_dataset()
+    editor.apply_plan(plain, editor.compile(operations, optimized=False))
+    optimized = make_test_dataset()
+    editor.apply_plan(optimized, editor.compile(operations))
+
+    assert optimized == plain
+
+
+def test_drops_duplicates_of_idempotent_ops():
+    set_ctp = Operation("set_tag", '<(0013,"CTP",13)>', "21113544", "")
+    operations = [
+        set_ctp,
+        Operation("delete_tag", "<(0008,3010)>", "", ""),
+        Operation("set_tag", "<(0018,0015)>", "CHEST", ""),
+        Operation("set_tag", '<(0013,"CTP",13)>', "21113544", ""),
+        Operation("delete_tag", "<(0008,3010)>", "", ""),
+    ]
+
+    optimized, report = optimize(operations)
+
+    assert optimized == operations[:3]
+    assert report.duplicates == operations[3:]
+    assert report.removed == 2
+    assert_same_result(operations)
+
+
+def test_keeps_duplicates_that_are_not_idempotent():
+    # the new root starts with the old one, so each replace adds to the UID
+    replace = Operation("string_replace", "<(0020,000d)>", UID_ROOT, NEW_ROOT)
+    shift = Operation("shift_date", "<(0008,0020)>", "10", "")
+    operations = [replace, shift, replace, shift]
+
+    optimized, report = optimize(operations)
+
+    assert optimized == operations
+    assert report.removed == 0
+    assert_same_result(operations)
+
+
+def test_keeps_duplicates_separated_by_a_conflicting_op():
+    operations = [
+        Operation("set_tag", "<(0008,1030)>", "First", ""),
+        Operation("string_replace", "<(0008,1030)>", "First", "Second"),
+        Operation("set_tag", "<(0008,1030)>", "First", ""),
+    ]
+
+    optimized, report = optimize(operations)
+
+    assert report.duplicates == []
+    assert_same_result(operations)
+
+
+def test_drops_writes_overwritten_by_a_later_set_or_delete():
+    operations = [
+        Operation("string_replace", "<(0020,000d)>", UID_ROOT, NEW_ROOT),
+        Operation("substitute", "<(0010,0010)>", "Test^Patient", "Other^Patient"),
+        Operation("set_tag", "<(0008,1030)>", "Old", ""),
+        Operation("set_tag", "<(0020,000d)>", "1.2.3", ""),
+        Operation("delete_tag", "<(0010,0010)>", "", ""),
+        Operation("set_tag", "<(0008,1030)>", "New", ""),
+    ]
+
+    optimized, report = optimize(operations)
+
+    assert optimized == operations[3:]
+    assert [(op, by) for op, by in report.dead_writes] == [
+        (operations[0], operations[3]),
+        (operations[1], operations[4]),
+        (operations[2], operations[5]),
+    ]
+    assert_same_result(operations)
+
+
+def test_keeps_writes_whose_side_effects_survive():
+    operations = [
+        # creates the sequence and an item, which the delete leaves behind
+        Operation("set_tag", "<(0008,1140)[0](0008,1150)>", "1.2.3", ""),
+        Operation("delete_tag", "<(0008,1140)[0](0008,1150)>", "", ""),
+        # a wildcard set may create different items than the later one
+        Operation("set_tag", "<(0008,1115)[<0>](0008,1030)>", "x", ""),
+        Operation("set_tag", "<(0008,1115)[<0>](0008,1030)>", "y", ""),
+        # the delete comes first, so the set recreates the tag
+        Operation("delete_tag", "<(0008,1030)>", "", ""),
+        Operation("set_tag", "<(0008,1030)>", "z", ""),
+        # the copy reads the value the first set writes
+        Operation("set_tag", "<(0010,0020)>", "ID", ""),
+        Operation("copy_from_tag", "<(0010,1000)>", "<(0010,0020)>", ""),
+        Operation("set_tag", "<(0010,0020)>", "Other", ""),
+    ]
+
+    optimized, report = optimize(operations)
+
+    assert optimized == operations
+    assert report.removed == 0
+    assert_same_result(operations)
+
+
+def test_fuses_value_edits_on_one_path():
+    operations = [
+        Operation("string_replace", "<(0008,1115)[<0>](0008,114a)[<0>](0008,1150)>", "1.2.840", "1.3.6"),
+        Operation("string_replace", "<(0008,1115)[<0>](0008,114a)[<0>](0008,1150)>", "10008", "20008"),
+        Operation("hash_unhashed_uid", "<(0008,1115)[<0>](0008,114a)[<0>](0008,1150)>", "2.25", ""),
+        Operation("shift_date", "<(0008,0020)>", "-3", ""),
+        Operation("substitute", "<(0008,0020)>", "20241027", "20240101"),
+    ]
+
+    runs = fusion_runs(operations)
+    assert [len(run) for run in runs] == [3, 2]
+
+    plan = Editor().compile(operations[:3])
+    assert len(plan) == 1
+    assert [sub.op for sub in plan[0].value] == operations[:3]
+
+    _, report = optimize(operations)
+    assert [len(run) for run in report.fused] == [3, 2]
+    assert_same_result(operations)
+
+
+def test_paths_may_alias():
+    def alias(a, b, **kwargs):
+        return paths_may_alias(parse(a), parse(b), **kwargs)
+
+    assert alias("<(0008,1030)>", "<(0008,1030)>")
+    assert not alias("<(0008,1030)>", "<(0008,103e)>")
+    # one path under the other
+    assert alias("<(0008,1115)>", "<(0008,1115)[0](0008,1150)>")
+    assert alias("<(0008,1115)[<0>](0008,1150)>", "<(0008,1115)[1](0008,1150)>")
+    assert not alias("<(0008,1115)[0](0008,1150)>", "<(0008,1115)[1](0008,1150)>")
+    assert alias("<(0008,1115)[0](0008,1150)>", "<(0008,1115)[1](0008,1150)>", any_index=True)
+    # private tags may land on any element of their group
+    assert alias('<(0013,"CTP",13)>', "<(0013,1013)>")
+    assert not alias('<(0013,"CTP",13)>', '<(0013,"OTHER",13)>')
+    assert not alias('<(0013,"CTP",13)>', "<(0015,1013)>")
+
+
+PER_FRAME = "<(5200,9230)[<0>](0008,9124)[<0>](0008,2112)[<0>](0040,a170)[<0>]"
+
+
+def test_merges_value_edits_into_one_walk(monkeypatch):
+    from pydicom_background_editor import path as path_module
+
+    operations = [
+        Operation("string_replace", PER_FRAME + "(0008,0100)>", "121", "999"),
+        Operation("string_replace", PER_FRAME + "(0008,0102)>", "DCM", "X"),
+        Operation("substitute", PER_FRAME + "(0008,0104)>", "a", "b"),
+        Operation("string_replace", "<(0020,000d)>", UID_ROOT, NEW_ROOT),
+        # same path as the first edit, so it must still run after it
+        Operation("string_replace", PER_FRAME + "(0008,0100)>", "999", "777"),
+    ]
+
+    plan = Editor().compile(operations)
+    assert len(plan) == 1
+
+    walked = []
+    real_sequence_items = path_module._sequence_items
+
+    def sequence_items(ds, item):
+        walked.append(item)
+        return real_sequence_items(ds, item)
+
+    monkeypatch.setattr(path_module, "_sequence_items", sequence_items)
+    ds = make_test_dataset()
+    Editor().apply_plan(ds, plan)
+
+    # one call per sequence element on the way down (1 + 1 + 1 + 5), where
+    # separate traversals would make 8 for each of the four per-frame edits
+    assert len(walked) == 8
+    assert ds[0x5200, 0x9230][0][0x0008, 0x9124][0][0x0008, 0x2112][0][0x0040, 0xA170][0][0x0008, 0x0100].value == "777322"
+    monkeypatch.undo()
+    assert_same_result(operations)
+
+
+def test_cuts_walks_where_paths_may_alias():
+    operations = [
+        Operation("string_replace", "<(0008,1115)[<0>](0008,114a)[<0>](0008,1150)>", "1.2", "1.3"),
+        Operation("string_replace", "<(0010,0010)>", "Test", "Other"),
+        # may reach the same elements as the first edit through a different path
+        Operation("string_replace", "<(0008,1115)[0](0008,114a)[<0>](0008,1150)>", "1.3", "1.4"),
+        Operation("string_replace", "<(0020,000d)>", UID_ROOT, NEW_ROOT),
+    ]
+
+    plan = Editor().compile(operations)
+
+    assert len(plan) == 2
+    assert [sub.op for sub in plan[0].value[1]] == operations[:2]
+    assert [sub.op for sub in plan[1].value[1]] == operations[2:]
+    assert_same_result(operations)
@@ -121,3 +121,23 @@ def test_parse_path_complex_mixed():
     assert nine.owner == "QUASAR"
     assert nine.element == 0x13
     assert nine.is_private == True
+
+
+def test_parse_is_cached_and_immutable():
+    """Parsed paths are shared between callers, so they must not change."""
+    import dataclasses
+    import pytest
+
+    path = "<(0008,1110)[<0>](0008,1155)>"
+    parsed = parse(path)
+
+    assert parse(path) is parsed
+    assert hash(parsed) == hash(parse.__wrapped__(path))
+    assert parsed == parse.__wrapped__(path)
+
+    with pytest.raises(AttributeError):
+        parsed.pop()
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        parsed[0].group = 0x0010
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        parsed[1].wildcard = False
@@ -177,4 +177,195 @@ def test_parse_path_new():
     # assert isinstance(seg, Segment)
     # assert seg.tag == "0008,1110"
     # assert seg.group == 0x0008
-    # assert seg.element == 0x1110
\ No newline at end of file
+    # assert seg.element == 0x1110
+def test_add_tag_leaves_path_intact():
+    ds = make_test_dataset()
+
+    parsed_path = parse("<(5200,9230)[0](0008,1030)>")
+    add_tag(ds, parsed_path, "NEW VALUE", 'CS')
+
+    assert len(parsed_path) == 3
+    assert traverse(ds, parsed_path)[0].element.value == "NEW VALUE"
+
+def test_path_trie_walk_matches_traverse():
+    from pydicom_background_editor.path import PathTrie
+
+    ds = make_test_dataset()
+    paths = [
+        "<(0010,0010)>",
+        "<(0008,1115)[<0>](0008,114a)[<0>](0008,1150)>",
+        "<(5200,9230)[<0>](0008,9124)[0](0008,2112)[<0>](0040,a170)[<0>](0008,0100)>",
+        "<(5200,9230)[0](0008,9124)[<0>](0008,2112)[4](0040,a170)[199](0008,0100)>",
+        '<(0029,"INTELERAD MEDICAL SYSTEMS",20)>',
+        "<(0008,1115)[3](0008,114a)[<0>](0008,1150)>",
+        "<(0008,9999)>",
+    ]
+
+    trie = PathTrie()
+    for path in paths:
+        trie.add(parse(path), path)
+
+    found = {path: [] for path in paths}
+
+    def visit(element, payloads):
+        for path in payloads:
+            found[path].append(element)
+
+    trie.walk(ds, visit)
+
+    for path in paths:
+        expected = [pair.element for pair in traverse(ds, parse(path)) if pair.element is not None]
+        assert [id(e) for e in found[path]] == [id(e) for e in expected], path
+
+
+def test_traverse_chains_share_their_ancestors():
+    ds = make_test_dataset()
+    res = traverse(ds, parse("<(0008,1115)[<0>](0008,114a)[<0>](0008,1150)>"))
+
+    first, second = res[0].ds_chain, res[1].ds_chain
+    assert len(first) == 3
+    assert first[0] is ds
+    assert first[-1] is ds[0x0008, 0x1115].value[0][0x0008, 0x114a].value[0]
+    assert first == [ds, ds[0x0008, 0x1115].value[0], first[-1]]
+    # matches under one sequence item share the chain above it
+    assert first.parent is second.parent
+
+
+def test_traverse_deeper_than_the_recursion_limit():
+    import sys
+    from pydicom.sequence import Sequence as PydicomSequence
+
+    depth = sys.getrecursionlimit() + 100
+    ds = inner = Dataset()
+    for _ in range(depth):
+        item = Dataset()
+        inner.add_new((0x0040, 0xA730), "SQ", PydicomSequence([item]))
+        inner = item
+    inner.add_new((0x0008, 0x0100), "SH", "leaf")
+
+    res = traverse(ds, parse("<" + "(0040,a730)[<0>]" * depth + "(0008,0100)>"))
+
+    assert len(res) == 1
+    assert res[0].element.value == "leaf"
+    assert len(res[0].ds_chain) == depth + 1
+
+
+class _Unvisited(Dataset):
+    """A sequence item that fails the test if a traversal looks into it."""
+
+    def get(self, *args, **kwargs):
+        raise AssertionError("traversal went past the first match")
+
+
+def _long_sequence(count):
+    from pydicom.sequence import Sequence as PydicomSequence
+
+    first = Dataset()
+    first.add_new((0x0008, 0x1155), "UI", "1.2.3.4")
+    ds = Dataset()
+    ds.add_new((0x0008, 0x1115), "SQ", PydicomSequence([first] + [_Unvisited() for _ in range(count - 1)]))
+    return ds
+
+
+def test_iter_traverse_stops_at_the_first_match():
+    from pydicom_background_editor.path import iter_traverse
+
+    ds = _long_sequence(10_000)
+    matches = iter_traverse(ds, parse("<(0008,1115)[<0>](0008,1155)>"))
+
+    assert next(matches).element.value == "1.2.3.4"
+
+
+def test_iter_traverse_matches_traverse():
+    from pydicom_background_editor.path import iter_traverse
+
+    ds = make_test_dataset()
+    parsed = parse("<(5200,9230)[<0>](0008,9124)[<1>](0008,2112)[<2>](0040,a170)[<3>](0008,0100)>")
+
+    assert [(m.element, m.ds_chain.to_list()) for m in iter_traverse(ds, parsed)] == [
+        (m.element, m.ds_chain.to_list()) for m in traverse(ds, parsed)
+    ]
+
+
+def test_copy_from_wildcard_source_visits_one_item():
+    from pydicom_background_editor.editor import Editor, Operation
+
+    ds = _long_sequence(10_000)
+    Editor().apply_edits(ds, [Operation("copy_from_tag", "<(0008,0018)>", "<(0008,1115)[<0>](0008,1155)>", "")])
+
+    assert ds.SOPInstanceUID == "1.2.3.4"
+
+
+def _nested_private(items: int) -> Dataset:
+    """A sequence of items holding (0013,"CTP",13), with CTP's creator in the item above them."""
+    ds = Dataset()
+    ds.add_new((0x0013, 0x0010), "LO", "OTHER")
+    middle = Dataset()
+    middle.add_new((0x0013, 0x0010), "LO", "CTP")
+    for i in range(items):
+        item = Dataset()
+        item.add_new((0x0013, 0x1013), "LO", f"value {i}")
+        middle.setdefault("ReferencedSeriesSequence", []).value.append(item)
+    ds.add_new((0x0008, 0x1115), "SQ", [middle])
+    return ds
+
+
+def test_traverse_private_creator_of_an_intermediate_item():
+    ds = _nested_private(3)
+
+    res = traverse(ds, parse('<(0008,1115)[0](0008,1115)[<0>](0013,"CTP",13)>'))
+
+    assert [m.element.value for m in res] == ["value 0", "value 1", "value 2"]
+
+
+def test_traverse_private_nearest_creator_wins():
+    ds = _nested_private(1)
+    ds.add_new((0x0013, 0x0011), "LO", "CTP")
+    ds.add_new((0x0013, 0x1113), "LO", "root value")
+    item = ds[0x00081115].value[0][0x00081115].value[0]
+
+    assert traverse(ds, parse('<(0013,"CTP",13)>'))[0].element.value == "root value"
+    assert traverse(ds, parse('<(0008,1115)[0](0008,1115)[0](0013,"CTP",13)>'))[0].element.value == "value 0"
+
+    item.add_new((0x0013, 0x0012), "LO", "CTP")
+    item.add_new((0x0013, 0x1213), "LO", "nearest value")
+    assert traverse(ds, parse('<(0008,1115)[0](0008,1115)[0](0013,"CTP",13)>'))[0].element.value == "nearest value"
+
+
+def test_creator_cache_asks_each_dataset_once(monkeypatch):
+    from pydicom_background_editor.path import CreatorCache
+
+    ds = _nested_private(100)
+    asked = []
+    private_block = Dataset.private_block
+
+    def counted(self, *args, **kwargs):
+        asked.append(id(self))
+        return private_block(self, *args, **kwargs)
+
+    monkeypatch.setattr(Dataset, "private_block", counted)
+    parsed = parse('<(0008,1115)[<0>](0008,1115)[<0>](0013,"CTP",13)>')
+    expected = traverse(ds, parsed)
+    assert len(asked) == 200
+
+    asked.clear()
+    CreatorCache.attach(ds)
+    assert traverse(ds, parsed) == expected
+    assert traverse(ds, parsed) == expected
+    assert len(asked) == 101
+    assert len(set(asked)) == 101
+
+
+def test_creator_cache_sees_added_creators():
+    from pydicom_background_editor.path import CreatorCache
+
+    ds = _nested_private(1)
+    CreatorCache.attach(ds)
+    with pytest.raises(KeyError):
+        traverse(ds, parse('<(0013,"LATE",20)>'))
+
+    add_tag(ds, parse("<(0013,0011)>"), "LATE", "LO")
+    add_tag(ds, parse("<(0013,1120)>"), "late value", "LO")
+
+    assert traverse(ds, parse('<(0013,"LATE",20)>'))[0].element.value == "late value"
+    assert traverse(ds, parse('<(0008,1115)[0](0008,1115)[0](0013,"LATE",20)>'))[0].element is None
@@ -0,0 +1,70 @@
+import pydicom
+
+from pydicom_background_editor.batch import Job, build_jobs, resolve_from_directory, run_batch
+from pydicom_background_editor.journal import Journal
+from pydicom_background_editor.main import read_edit_csv
+from pydicom_background_editor.pipeline import edit_pipelined
+
+from framing import write_dicom
+from test_batch import SERIES_A, SERIES_B, make_series
+
+
+def test_pipeline_edits_every_file(tmp_path):
+    source, edits = make_series(tmp_path)
+    output = tmp_path / "output"
+    edit_groups = read_edit_csv(edits)
+    jobs = build_jobs(edit_groups, resolve_from_directory(source), output)
+
+    seen = []
+    results = edit_pipelined(jobs, edit_groups, io_threads=2, queue_size=1, on_result=seen.append)
+
+    assert len(results) == 3
+    assert seen == results
+    assert all(r.status == "OK" for r in results)
+    assert pydicom.dcmread(output / SERIES_A / "2.dcm").PatientName == "Edited^A"
+    assert pydicom.dcmread(output / SERIES_B / "1.dcm").PatientName == "Edited^B"
+
+
+def test_pipeline_reports_failures_and_continues(tmp_path):
+    source, edits = make_series(tmp_path)
+    output = tmp_path / "output"
+    edit_groups = read_edit_csv(edits)
+
+    jobs = [
+        Job(SERIES_B, str(source / "b" / "missing.dcm"), str(output / "missing.dcm")),
+        Job(SERIES_B, str(source / "b" / "1.dcm"), str(output / "1.dcm")),
+    ]
+    results = {r.job.to_file: r for r in edit_pipelined(jobs, edit_groups, io_threads=1)}
+
+    assert results[str(output / "missing.dcm")].status == "Error"
+    assert "FileNotFoundError" in results[str(output / "missing.dcm")].message
+    assert results[str(output / "1.dcm")].status == "OK"
+
+
+def test_pipeline_handles_more_files_than_queue_slots(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    for i in range(20):
+        write_dicom(source / f"{i}.dcm", SeriesInstanceUID=SERIES_A)
+    (tmp_path / "edits.csv").write_text(
+        f"series_instance_uid,op,tag,val1,val2\n{SERIES_A},,,,\n,set_tag,\"<(0010,0010)>\",<Many>,<>\n"
+    )
+    edit_groups = read_edit_csv(tmp_path / "edits.csv")
+    jobs = build_jobs(edit_groups, resolve_from_directory(source), tmp_path / "output")
+
+    results = edit_pipelined(jobs, edit_groups, io_threads=3, queue_size=2)
+
+    assert len(results) == 20
+    assert all(r.status == "OK" for r in results)
+
+
+def test_run_batch_uses_pipeline_with_journal(tmp_path):
+    source, edits = make_series(tmp_path)
+    output = tmp_path / "output"
+    edit_groups = read_edit_csv(edits)
+    files = resolve_from_directory(source)
+
+    with Journal(tmp_path / "journal.tsv") as journal:
+        results = run_batch(build_jobs(edit_groups, files, output), edit_groups, journal=journal, io_threads=2)
+        assert len(results) == 3
+        assert run_batch(build_jobs(edit_groups, files, output), edit_groups, journal=journal, io_threads=2) == []
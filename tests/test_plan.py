@@ -0,0 +1,85 @@
+import dataclasses
+
+import pytest
+from pydicom.dataset import Dataset
+from pydicom.sequence import Sequence as PydicomSequence
+
+from pydicom_background_editor import editor as editor_module
+from pydicom_background_editor.editor import Editor, Operation, Plan, EMPTY_SEQUENCE
+
+from dataset import make_test_dataset
+
+
+def test_compile_resolves_path_vr_and_value():
+    editor = Editor()
+    # unoptimized, so that each operation gets a step of its own
+    plan = editor.compile([
+        Operation("set_tag", "<(0008,1030)>", "x" * 100, ""),
+        Operation("substitute", "<(0008,0020)>", "20241030", "20241231"),
+        Operation("shift_date", "<(0008,0021)>", "-5", ""),
+        Operation("copy_from_tag", "<(0008,0050)>", "<(0010,0020)>", ""),
+    ], optimized=False)
+
+    assert isinstance(plan, Plan)
+    set_step, substitute_step, shift_step, copy_step = plan
+
+    assert set_step.handler == editor._op_set_tag
+    assert [(s.group, s.element) for s in set_step.path] == [(0x0008, 0x1030)]
+    assert set_step.vr == "LO"
+    assert set_step.value == "x" * 64  # pre-truncated
+    assert substitute_step.value == "20241231"
+    assert shift_step.value == -5
+    assert [(s.group, s.element) for s in copy_step.source] == [(0x0010, 0x0020)]
+
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        set_step.value = "other"
+
+
+def test_plan_is_applied_without_reparsing(monkeypatch):
+    editor = Editor()
+    plan = editor.compile([
+        Operation("set_tag", "<(0010,0010)>", "Anon^Patient", ""),
+        Operation("empty_tag", "<(0008,1030)>", "", ""),
+        Operation("string_replace", "<(0020,000d)>", "12345", "54321"),
+    ])
+
+    def fail(*args):
+        raise AssertionError("path parsed while applying a compiled plan")
+
+    monkeypatch.setattr(editor_module, "parse", fail)
+
+    for _ in range(3):
+        ds = make_test_dataset()
+        editor.apply_plan(ds, plan)
+
+        assert ds.PatientName == "Anon^Patient"
+        assert ds.StudyDescription == ""
+        assert ds.StudyInstanceUID == "1.2.840.54321.1"
+
+
+def test_empty_sequence_is_fresh_for_each_dataset():
+    editor = Editor()
+    plan = editor.compile([Operation("set_tag", "<(0008,1140)>", "", "")])
+    assert plan[0].value is EMPTY_SEQUENCE
+
+    first, second = Dataset(), Dataset()
+    editor.apply_plan(first, plan)
+    editor.apply_plan(second, plan)
+    first.ReferencedImageSequence.append(Dataset())
+
+    assert isinstance(second.ReferencedImageSequence, PydicomSequence)
+    assert len(second.ReferencedImageSequence) == 0
+
+
+def test_unknown_vr_raises_when_applied():
+    editor = Editor()
+    plan = editor.compile([Operation("set_tag", "<(0011,0010)>", "value", "")])
+    assert plan[0].vr is None
+
+    with pytest.raises(KeyError):
+        editor.apply_plan(Dataset(), plan)
+
+
+def test_unknown_op_fails_to_compile():
+    with pytest.raises(AttributeError):
+        Editor().compile([Operation("no_such_op", "<(0010,0010)>", "", "")])
@@ -0,0 +1,122 @@
+from pathlib import Path
+
+from pydicom_background_editor import main as main_module
+from pydicom_background_editor import editor as editor_module
+from pydicom_background_editor import validate as validate_module
+from pydicom_background_editor import plancache as plancache_module
+from pydicom_background_editor.editor import Editor, Operation, plan_digest
+from pydicom_background_editor.main import compile_edits, read_edit_csv
+from pydicom_background_editor.plancache import PLAN_CACHE_ENV, PlanCache, edits_key, operations_key
+
+from dataset import make_test_dataset
+
+ROOT = Path(__file__).resolve().parent.parent
+
+OPERATIONS = [
+    Operation("set_tag", "<(0010,0010)>", "Anon^Patient", ""),
+    Operation("set_tag", "<(0040,0275)[0](0040,0007)>", "", ""),
+    Operation("set_tag", "<(0012,0064)>", "", ""),
+    Operation("string_replace", "<(0020,000d)>", "12345", "54321"),
+    Operation("shift_date", "<(0020,000d)>", "3", ""),
+    Operation("hash_unhashed_uid", "<(0008,1115)[<0>](0008,114a)[<0>](0008,1150)>", "1.3.6.1.4.1.14519.5.2.1", ""),
+    Operation("substitute", "<(0008,0020)>", "20241030", "20241231"),
+    Operation("copy_from_tag", "<(0008,0050)>", "<(0010,0020)>", ""),
+    Operation("delete_tag", '<(0013,"CTP",11)>', "", ""),
+]
+
+
+def test_stored_plan_edits_like_the_compiled_one(tmp_path):
+    editor = Editor()
+    cache = PlanCache(tmp_path)
+    plan = editor.compile(OPERATIONS)
+    key = operations_key(plan_digest(OPERATIONS))
+
+    assert key not in cache
+    assert cache.store(key, plan)
+    assert key in cache
+
+    loaded = cache.load(editor, key)
+    assert [step.handler for step in loaded] == [step.handler for step in plan]
+    assert [step.path for step in loaded] == [step.path for step in plan]
+
+    expected, actual = make_test_dataset(), make_test_dataset()
+    editor.apply_plan(expected, plan)
+    editor.apply_plan(actual, loaded)
+    assert actual == expected
+
+
+def test_example_csv_plans_round_trip(tmp_path):
+    editor = Editor()
+    cache = PlanCache(tmp_path)
+    for operations in read_edit_csv(ROOT / "background_editor_example_input.csv").values():
+        key = operations_key(plan_digest(operations))
+        plan = editor.compile(operations)
+        cache.store(key, plan)
+
+        loaded = cache.load(editor, key)
+        assert [(s.op, s.path, s.vr, s.source) for s in loaded] == [(s.op, s.path, s.vr, s.source) for s in plan]
+
+
+def test_compile_edits_loads_a_cached_plan_without_parsing(tmp_path, monkeypatch):
+    monkeypatch.setenv(PLAN_CACHE_ENV, str(tmp_path))
+    edits = [
+        {"op": "set_tag", "tag": "(0010,0010)", "tag_mode": "exact", "arg1": "Anon^Patient", "arg2": "unused"},
+        {"op": "shift_date", "tag": "(0008,0020)", "tag_mode": "exact", "arg1": "-5", "arg2": "unused"},
+    ]
+    editor = Editor()
+    compile_edits(editor, edits)
+    assert edits_key(edits) in PlanCache(tmp_path)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("edit list validated or parsed again")
+
+    monkeypatch.setattr(validate_module, "validate_edits", fail)
+    monkeypatch.setattr(editor_module, "parse", fail)
+    monkeypatch.setattr(main_module.Editor, "compile", fail)
+    plan = compile_edits(editor, edits)
+
+    ds = make_test_dataset()
+    editor.apply_plan(ds, plan)
+    assert ds.PatientName == "Anon^Patient"
+    assert ds.StudyDate == "20241025"
+
+
+def test_unreadable_entry_is_a_miss(tmp_path):
+    cache = PlanCache(tmp_path)
+    key = operations_key("0" * 32)
+    entry = Path(cache.path(key))
+    entry.parent.mkdir(parents=True)
+    entry.write_bytes(b"not a plan")
+
+    assert cache.load(Editor(), key) is None
+
+
+def test_a_new_release_gets_new_keys(monkeypatch):
+    raw_edits = [{"op": "set_tag", "tag": "<(0010,0010)>", "arg1": "Anon", "arg2": ""}]
+    keys = edits_key(raw_edits), operations_key("0" * 32)
+
+    plancache_module._versions.cache_clear()
+    monkeypatch.setattr(plancache_module.metadata, "version", lambda name: "99.0")
+    try:
+        assert edits_key(raw_edits) != keys[0]
+        assert operations_key("0" * 32) != keys[1]
+    finally:
+        plancache_module._versions.cache_clear()
+
+
+def test_compile_cached_stores_only_validated_plans(tmp_path):
+    import pytest
+
+    from pydicom_background_editor.batch import compile_cached
+    from pydicom_background_editor.validate import PlanValidationError
+
+    cache = PlanCache(tmp_path)
+    operations = [Operation("shift_date", "<(0008,0020)>", "soon", "")]
+    key = operations_key(plan_digest(operations))
+
+    with pytest.raises(PlanValidationError):
+        compile_cached(Editor(), operations, plan_digest(operations), cache)
+    assert key not in cache
+
+    compile_cached(Editor(), OPERATIONS, plan_digest(OPERATIONS), cache)
+    assert operations_key(plan_digest(OPERATIONS)) in cache
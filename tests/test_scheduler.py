@@ -0,0 +1,120 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from pydicom_background_editor.scheduler import MemoryScheduler, estimate_memory, parse_size, MEMORY_OVERHEAD
+
+from framing import write_dicom
+
+
+class Tracker:
+    """Fake job runner that records start order and memory in flight."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = []
+        self.in_flight = 0
+        self.peak = 0
+        self.peak_jobs = 0
+        self.running = 0
+
+    def __call__(self, job):
+        name, size = job
+        with self.lock:
+            self.started.append(name)
+            self.in_flight += size
+            self.running += 1
+            self.peak = max(self.peak, self.in_flight)
+            self.peak_jobs = max(self.peak_jobs, self.running)
+        time.sleep(0.01)
+        with self.lock:
+            self.in_flight -= size
+            self.running -= 1
+        return name
+
+
+def run(jobs, budget, slots):
+    tracker = Tracker()
+    scheduler = MemoryScheduler(budget, slots, estimate=lambda job: job[1])
+    with ThreadPoolExecutor(slots) as executor:
+        results = list(scheduler.run(executor, tracker, jobs))
+    return tracker, results
+
+
+def test_starts_largest_first():
+    jobs = [("small", 1), ("huge", 100), ("medium", 10), ("medium2", 10)]
+
+    tracker, results = run(jobs, budget=1000, slots=1)
+
+    assert tracker.started == ["huge", "medium", "medium2", "small"]
+    assert sorted(results) == sorted(name for name, _ in jobs)
+
+
+def test_memory_budget_is_respected():
+    jobs = [(f"wsi{i}", 60) for i in range(3)] + [(f"ct{i}", 1) for i in range(20)]
+
+    tracker, results = run(jobs, budget=100, slots=4)
+
+    assert len(results) == 23
+    assert tracker.peak <= 100
+    # small files run next to a giant one, filling the other slots
+    assert tracker.peak_jobs == 4
+
+
+def test_over_budget_job_runs_alone():
+    jobs = [("giant", 500), ("a", 1), ("b", 1)]
+
+    tracker, results = run(jobs, budget=100, slots=3)
+
+    assert tracker.started[0] == "giant"
+    assert sorted(results) == ["a", "b", "giant"]
+    assert tracker.peak == 500
+
+
+def test_estimate_memory_scales_with_file_size(tmp_path):
+    path = tmp_path / "in.dcm"
+    write_dicom(path)
+
+    assert estimate_memory(path) == int(path.stat().st_size * MEMORY_OVERHEAD)
+
+
+def test_parse_size():
+    assert parse_size("1024") == 1024
+    assert parse_size("512M") == 512 * 1024**2
+    assert parse_size("1.5g") == int(1.5 * 1024**3)
+    assert parse_size("16GB") == 16 * 1024**3
+
+
+def test_equal_jobs_are_grouped():
+    jobs = [("a1", 5, "a"), ("b1", 5, "b"), ("a2", 5, "a"), ("b2", 5, "b")]
+    started = []
+
+    def fn(job):
+        started.append(job[0])
+        return job[0]
+
+    scheduler = MemoryScheduler(100, 1, estimate=lambda job: job[1], group=lambda job: job[2])
+    with ThreadPoolExecutor(1) as executor:
+        list(scheduler.run(executor, fn, jobs))
+
+    assert [name[0] for name in started] in (list("aabb"), list("bbaa"))
+
+
+class ImmediateExecutor:
+    """Runs each job as it is submitted, so start order is deterministic."""
+
+    def submit(self, fn, job):
+        future = Future()
+        future.set_result(fn(job))
+        return future
+
+
+def test_emptied_sizes_are_skipped():
+    jobs = [("a", 9), ("b", 9), ("c", 5), ("d", 5), ("e", 4), ("f", 1)]
+    started = []
+
+    scheduler = MemoryScheduler(10, 2, estimate=lambda job: job[1])
+    list(scheduler.run(ImmediateExecutor(), lambda job: started.append(job[0]), jobs))
+
+    # once "f" has run nothing else fits next to "b", which runs alone
+    assert started == ["a", "f", "b", "c", "d", "e"]
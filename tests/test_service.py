@@ -0,0 +1,56 @@
+import os
+import tempfile
+import threading
+
+import pydicom
+import pytest
+from storable.core import thaw
+from storable.output import serialize
+
+from pydicom_background_editor.client import request
+from pydicom_background_editor.service import EditPool, EditServer
+
+from framing import write_dicom, make_request
+
+
+@pytest.fixture
+def socket_path():
+    # Unix socket paths are limited to ~100 bytes, so don't use tmp_path
+    with tempfile.TemporaryDirectory(dir="/tmp") as directory:
+        yield os.path.join(directory, "editor.sock")
+
+
+@pytest.fixture
+def server(socket_path):
+    pool = EditPool(workers=2)
+    server = EditServer(socket_path, pool)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+        pool.shutdown()
+
+
+def test_service_edits_files(tmp_path, socket_path, server):
+    source = tmp_path / "in.dcm"
+    write_dicom(source)
+
+    for name in ("First^Edit", "Second^Edit"):
+        to_file = tmp_path / f"{name}.dcm"
+        response = thaw(request(serialize(make_request(source, to_file, name)), socket_path))
+
+        assert response["Status"] == "OK"
+        assert response["to_file"] == str(to_file)
+        assert pydicom.dcmread(to_file).PatientName == name
+
+
+def test_service_reports_errors(tmp_path, socket_path, server):
+    payload = serialize(make_request(tmp_path / "missing.dcm", tmp_path / "out.dcm", "Name"))
+    response = thaw(request(payload, socket_path))
+
+    assert response["Status"] == "Error"
+    assert "FileNotFoundError" in response["message"]
@@ -0,0 +1,62 @@
+"""Import hygiene of the per-file entry point.
+
+Posda runs one editor process per file, so interpreter startup plus our
+imports is a fixed cost paid for every edited file. These tests guard
+against the imports that used to creep into module load; the time itself
+is measured by benchmarks/bench_startup.py, as it depends on the machine.
+"""
+
+import json
+import subprocess
+import sys
+
+
+def run_python(code):
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+
+def test_entry_point_skips_cli_only_imports():
+    result = run_python(
+        "import sys, json\n"
+        "import pydicom_background_editor.main\n"
+        "from pydicom import datadict\n"
+        "print(json.dumps({\n"
+        "    'modules': [m for m in ('argparse', 'pprint', 'pydicom_background_editor.plancache') if m in sys.modules],\n"
+        "    'ctp': 'CTP' in datadict.private_dictionaries,\n"
+        "    'handlers': len(__import__('logging').getLogger().handlers),\n"
+        "}))"
+    )
+    loaded = json.loads(result.stdout)
+
+    assert loaded["modules"] == []
+    assert loaded["ctp"] is False  # registered on first private lookup
+    assert loaded["handlers"] == 0  # logging is configured by the entry points
+
+
+def test_client_does_not_import_pydicom():
+    result = run_python(
+        "import sys\n"
+        "import pydicom_background_editor.client\n"
+        "print('pydicom' in sys.modules)"
+    )
+    assert result.stdout.strip() == "False"
+
+
+def test_private_dictionary_registered_on_first_private_lookup():
+    result = run_python(
+        "from pydicom import datadict\n"
+        "from pydicom_background_editor.editor import Editor, Operation\n"
+        "from pydicom.dataset import Dataset\n"
+        "ds = Dataset()\n"
+        "ds.private_block(0x0013, 'CTP', create=True)\n"
+        "Editor().apply_edits(ds, [Operation('set_tag', '<(0010,0010)>', 'Name', '')])\n"
+        "print('CTP' in datadict.private_dictionaries)\n"
+        "Editor().apply_edits(ds, [Operation('set_tag', '<(0013,\"CTP\",10)>', 'Project', '')])\n"
+        "print('CTP' in datadict.private_dictionaries)"
+    )
+    assert result.stdout.split() == ["False", "True"]
@@ -0,0 +1,104 @@
+import copy
+
+import pytest
+
+from pydicom_background_editor import editor as editor_module
+from pydicom_background_editor.editor import Editor, Operation
+from pydicom_background_editor.path import TagIndex, parse, traverse
+
+from dataset import make_test_dataset
+
+PATHS = [
+    "<(0008,1115)[<0>](0008,114a)[<0>](0008,1150)>",
+    "<(0008,1115)[<0>](0008,114a)[<0>](0008,1155)>",
+    "<(0008,1115)[2](0008,114a)[<0>](0008,1150)>",
+    "<(0008,1115)[<0>](0008,114a)[3](0008,1150)>",
+    "<(5200,9230)[<0>](0008,9124)[<1>](0008,2112)[<2>](0040,a170)[<3>](0008,0100)>",
+    "<(5200,9230)[<0>](0008,9124)[0](0008,2112)[<0>](0040,a170)[1](0008,0100)>",
+    "<(0040,0275)[<0>](0040,0007)>",
+    "<(1234,5678)[<0>](0008,0100)>",
+]
+
+
+def matches(ds, path):
+    return [(m.element, m.ds_chain.to_list()) for m in traverse(ds, parse(path))]
+
+
+def indexed_matches(ds, path):
+    index = TagIndex.of(ds)
+    return [(m.element, m.ds_chain.to_list()) for m in index.traverse(parse(path))]
+
+
+def assert_index_agrees(ds):
+    for path in PATHS:
+        assert TagIndex.answers(parse(path))
+        TagIndex.detach(ds)
+        expected = matches(ds, path)
+        index = TagIndex.attach(ds)
+        assert indexed_matches(ds, path) == expected, path
+
+    # the same locations a fresh index finds, in the same order
+    fresh = TagIndex(ds)
+    for tag, locations in fresh.sequences.items():
+        kept = index.sequences.get(tag, [])
+        kept.sort(key=lambda location: location.shape)
+        assert [(id(l.element), l.shape) for l in kept] == [(id(l.element), l.shape) for l in locations]
+
+
+def test_index_answers_like_a_scan():
+    ds = make_test_dataset()
+    TagIndex.attach(ds)
+    assert_index_agrees(ds)
+
+
+def test_index_only_answers_public_wildcard_paths():
+    assert not TagIndex.answers(parse("<(0008,1115)[0](0008,114a)[0](0008,1150)>"))
+    assert not TagIndex.answers(parse('<(0013,"CTP",10)[<0>](0008,0100)>'))
+    assert not TagIndex.answers(parse("<(0010,0010)>"))
+
+
+def test_index_follows_the_editor():
+    ds = make_test_dataset()
+    index = TagIndex.attach(ds)
+    Editor().apply_plan(ds, Editor().compile([
+        Operation("delete_tag", "<(0008,1115)[1](0008,114a)>", "", ""),
+        Operation("set_tag", "<(0008,1115)[<0>](0008,114a)[<0>](0008,1155)>", "1.2.3", ""),
+        Operation("set_tag", "<(0008,1115)[12](0008,114a)[1](0008,1150)>", "1.2.4", ""),
+        Operation("set_tag", "<(0040,0275)[0](0040,0007)>", "Created", ""),
+        Operation("set_tag", "<(5200,9230)[1](0008,9124)>", "", ""),
+        Operation("empty_tag", "<(5200,9230)[<0>](0008,9124)[<0>](0008,2112)>", "", ""),
+    ], optimized=False))
+
+    assert TagIndex.of(ds) is index
+    assert_index_agrees(ds)
+
+
+def test_copy_of_an_indexed_dataset_has_no_index():
+    ds = make_test_dataset()
+    TagIndex.attach(ds)
+
+    assert TagIndex.of(copy.deepcopy(ds)) is None
+
+
+@pytest.mark.parametrize("threshold", [1, 1000])
+def test_apply_plan_edits_the_same_with_or_without_an_index(monkeypatch, threshold):
+    operations = [
+        Operation("hash_unhashed_uid", "<(0008,1115)[<0>](0008,114a)[<0>](0008,1150)>", "1.2.3", ""),
+        Operation("delete_tag", "<(0008,1115)[<0>](0008,114a)[<0>](0008,1155)>", "", ""),
+        Operation("set_tag", "<(0040,0275)[<0>](0040,0007)>", "Created", ""),
+        Operation("empty_tag", "<(5200,9230)[<0>](0008,9124)[<1>](0008,2112)[<2>](0040,a170)[<3>](0008,0100)>", "", ""),
+        Operation("copy_from_tag", "<(0008,1030)>", "<(5200,9230)[<0>](0008,9124)[<0>](0008,2112)[<0>](0040,a170)[<0>](0008,0100)>", ""),
+    ]
+    editor = Editor()
+    plan = editor.compile(operations)
+
+    expected = make_test_dataset()
+    monkeypatch.setattr(editor_module, "INDEX_MIN_WILDCARD_STEPS", 10**6)
+    editor.apply_plan(expected, plan)
+
+    actual = make_test_dataset()
+    monkeypatch.setattr(editor_module, "INDEX_MIN_WILDCARD_STEPS", threshold)
+    editor.apply_plan(actual, plan)
+
+    assert actual == expected
+    assert TagIndex.of(actual) is None
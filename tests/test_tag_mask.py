@@ -0,0 +1,168 @@
+import pytest
+from pydicom.dataset import Dataset
+from pydicom.sequence import Sequence
+
+from pydicom_background_editor.codegen import compile_function
+from pydicom_background_editor.editor import Editor, Operation, plan_digest
+from pydicom_background_editor.path import Path, TagMask, parse, parse_mask
+from pydicom_background_editor.plancache import PlanCache, operations_key
+from pydicom_background_editor.validate import PlanValidationError, validate_edits, validate_operations
+
+from dataset import make_test_dataset
+
+
+def make_overlay_dataset() -> Dataset:
+    ds = Dataset()
+    ds.PatientName = "Test^Patient"
+    for group in (0x6000, 0x6002, 0x601E):
+        ds.add_new((group, 0x0010), "US", 512)
+        ds.add_new((group, 0x3000), "OW", b"\x00\x01" * 8)
+    ds.add_new((0x6100, 0x3000), "OW", b"\x00\x01")
+    ds.add_new((0x0009, 0x0010), "LO", "VENDOR")
+    ds.add_new((0x0009, 0x1001), "LO", "vendor value")
+    item = Dataset()
+    item.add_new((0x0009, 0x0010), "LO", "VENDOR")
+    item.add_new((0x0009, 0x1001), "LO", "item value")
+    item.CodeValue = "121322"
+    ds.ReferencedSeriesSequence = Sequence([item, Dataset()])
+    return ds
+
+
+def mask_op(op, tag, val1="", val2=""):
+    return Operation(op, tag, val1, val2, tag_mode="mask")
+
+
+def test_tag_mask_is_compiled_to_integers():
+    mask = TagMask("60xx,3000")
+
+    assert (mask.value, mask.mask) == (0x60003000, 0xFF00FFFF)
+    assert len(mask.candidates) == 256
+    assert (mask.candidates[0], mask.candidates[-1]) == (0x60003000, 0x60FF3000)
+    assert TagMask("0009,xxxx").candidates is None
+    assert mask.matches(0x601E3000)
+    assert not mask.matches(0x60003001)
+    assert not mask.matches(0x61003000)
+    assert TagMask("0009,XXXX").matches(0x00091001)
+
+    with pytest.raises(ValueError):
+        TagMask("60yy,3000")
+
+
+def test_parse_mask_keeps_the_path_above_the_mask():
+    path = parse_mask("<(0008,1115)[<0>](0009,xxxx)>")
+
+    assert path[:-1] == parse("<(0008,1115)[<0>]>")
+    assert path[-1] == TagMask("0009,xxxx")
+
+
+def test_mask_steps_keep_the_path_above_the_mask():
+    step, = Editor().compile([mask_op("delete_tag", "<(0008,1115)[<0>](0009,xxxx)>")])
+
+    assert step.source == parse("<(0008,1115)[<0>]>")
+    assert type(step.source) is Path
+
+
+def test_select_finds_the_matching_tags_in_order():
+    ds = make_overlay_dataset()
+
+    assert TagMask("60xx,3000").select(ds) == [0x60003000, 0x60023000, 0x601E3000]
+    # more possible tags than elements, so the elements are scanned instead
+    assert TagMask("60x0,x000").select(ds) == [0x60003000]
+    assert TagMask("0009,xxxx").select(ds) == [0x00090010, 0x00091001]
+    assert TagMask("7fe0,0010").select(ds) == []
+
+
+def test_translate_edits_keeps_the_tag_mode():
+    operations = Operation.translate_edits([
+        {"op": "delete_tag", "tag": "(60xx,3000)", "tag_mode": "mask", "arg1": "", "arg2": ""},
+        {"op": "delete_tag", "tag": "(0010,0010)", "tag_mode": "exact", "arg1": "", "arg2": ""},
+    ])
+
+    assert [op.tag_mode for op in operations] == ["mask", "exact"]
+    assert plan_digest(operations[:1]) != plan_digest([Operation("delete_tag", "(60xx,3000)", "", "")])
+
+    with pytest.raises(NotImplementedError):
+        Operation.translate_edits([{"op": "delete_tag", "tag": "(0010,0010)", "tag_mode": "regex", "arg1": "", "arg2": ""}])
+
+
+def test_delete_tag_mask():
+    ds = make_overlay_dataset()
+    Editor().apply_edits(ds, [mask_op("delete_tag", "<(60xx,3000)>"), mask_op("delete_tag", "<(0009,xxxx)>")])
+
+    assert [tag for tag in ds.keys() if tag.group >= 0x6000] == [0x60000010, 0x60020010, 0x601E0010, 0x61003000]
+    assert 0x00090010 not in ds and 0x00091001 not in ds
+    assert ds.ReferencedSeriesSequence[0][0x00091001].value == "item value"
+
+
+def test_masks_below_a_sequence():
+    ds = make_overlay_dataset()
+    Editor().apply_edits(ds, [
+        mask_op("empty_tag", "<(0008,1115)[<0>](0009,10xx)>"),
+        mask_op("delete_tag", "<(0008,1115)[0](0008,01xx)>"),
+    ])
+
+    item = ds.ReferencedSeriesSequence[0]
+    assert item[0x00091001].value == ""
+    assert item[0x00090010].value == "VENDOR"
+    assert "CodeValue" not in item
+    assert ds[0x00091001].value == "vendor value"
+
+
+def test_mask_ops_run_the_same_optimized_generated_and_cached(tmp_path):
+    operations = [
+        Operation("set_tag", "<(0010,0010)>", "Anon", ""),
+        mask_op("delete_tag", "<(0010,xxxx)>"),
+        Operation("set_tag", "<(0010,0010)>", "Anon^Again", ""),
+        mask_op("delete_tag", "<(0029,xxxx)>"),
+        mask_op("delete_tag", "<(0029,xxxx)>"),
+        Operation("set_tag", '<(0013,"CTP",10)>', "Project", ""),
+        mask_op("empty_tag", "<(6000,0010)[<0>](0029,1xxx)>"),
+    ]
+    editor = Editor()
+    expected = make_test_dataset()
+    editor.apply_plan(expected, editor.compile(operations, optimized=False))
+
+    plan = editor.compile(operations)
+    optimized = make_test_dataset()
+    editor.apply_plan(optimized, plan)
+    generated = make_test_dataset()
+    compile_function(editor, plan)(generated)
+
+    cache = PlanCache(tmp_path)
+    key = operations_key(plan_digest(operations))
+    cache.store(key, plan)
+    loaded = cache.load(editor, key)
+    assert [(step.path, step.source) for step in loaded] == [(step.path, step.source) for step in plan]
+    cached = make_test_dataset()
+    editor.apply_plan(cached, loaded)
+
+    assert expected.PatientName == "Anon^Again"
+    assert 0x00100020 not in expected
+    assert optimized == expected
+    assert generated == expected
+    assert cached == expected
+
+
+def test_only_delete_and_empty_take_a_mask():
+    with pytest.raises(ValueError):
+        Editor().compile([mask_op("set_tag", "<(60xx,3000)>", "x")])
+    with pytest.raises(ValueError):
+        Editor().compile([mask_op("no_such_op", "<(60xx,3000)>")])
+
+    with pytest.raises(PlanValidationError) as excinfo:
+        validate_operations([
+            mask_op("delete_tag", "<(60xx,3000)>"),
+            mask_op("set_tag", "<(60xx,3000)>", "x"),
+            mask_op("delete_tag", "<(60xx,30)>"),
+            mask_op("delete_tag", "<(0008,1115)(0009,xxxx)>"),
+        ])
+
+    issues = excinfo.value.issues
+    assert len(issues) == 3
+    assert "does not support tag_mode 'mask'" in issues[0]
+    assert "does not parse" in issues[1]
+    assert "alternate" in issues[2]
+
+
+def test_validate_edits_accepts_masks():
+    validate_edits([{"op": "delete_tag", "tag": "(0009,xxxx)", "tag_mode": "mask", "arg1": "", "arg2": ""}])
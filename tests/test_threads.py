@@ -0,0 +1,85 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pydicom
+
+from pydicom_background_editor.batch import build_jobs, resolve_from_directory
+from pydicom_background_editor.editor import Editor, Operation
+from pydicom_background_editor.main import _compile_last_edits, read_edit_csv
+from pydicom_background_editor.pipeline import edit_pipelined
+
+from dataset import make_test_dataset
+from framing import write_dicom
+from test_batch import SERIES_A
+
+OPERATIONS = [
+    Operation("set_tag", "<(0010,0010)>", "Anon^Patient", ""),
+    Operation("set_tag", "<(0040,0275)[0](0040,0007)>", "", ""),
+    Operation("set_tag", "<(0012,0064)>", "", ""),
+    Operation("string_replace", "<(0020,000d)>", "12345", "54321"),
+    Operation("shift_date", "<(0008,0020)>", "3", ""),
+    Operation("hash_unhashed_uid", "<(0008,1115)[<0>](0008,114a)[<0>](0008,1150)>", "1.3.6.1.4.1.14519.5.2.1", ""),
+    Operation("copy_from_tag", "<(0008,1030)>", "<(0010,0010)>", ""),
+    Operation("delete_tag", '<(0013,"CTP",11)>', "", ""),
+]
+
+
+def test_one_plan_shared_by_a_thread_pool():
+    editor = Editor()
+    plan = editor.compile(OPERATIONS)
+
+    expected = make_test_dataset()
+    editor.apply_plan(expected, plan)
+
+    def edit(_):
+        ds = make_test_dataset()
+        editor.apply_plan(ds, plan)
+        return ds
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(edit, range(32)))
+
+    assert all(ds == expected for ds in results)
+    # each dataset got its own empty sequence
+    assert len({id(ds[0x0012, 0x0064].value) for ds in results}) == len(results)
+
+
+def test_compile_last_edits_never_mixes_up_plans():
+    editor = Editor()
+    compile = _compile_last_edits(editor)
+    edit_lists = [
+        [{"op": "set_tag", "tag": "(0010,0010)", "tag_mode": "exact", "arg1": f"Patient^{i}", "arg2": "unused"}]
+        for i in range(4)
+    ]
+    barrier = threading.Barrier(8)
+
+    def run(n):
+        barrier.wait()
+        for i in range(50):
+            edits = edit_lists[(n + i) % len(edit_lists)]
+            plan = compile(edits)
+            assert plan[0].value == edits[0]["arg1"]
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(run, range(8)))
+
+
+def test_pipeline_with_several_edit_threads(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    for i in range(12):
+        write_dicom(source / f"{i}.dcm", SeriesInstanceUID=SERIES_A)
+    edits = tmp_path / "edits.csv"
+    edits.write_text(
+        f"series_instance_uid,op,tag,val1,val2\n{SERIES_A},,,,\n,set_tag,\"<(0010,0010)>\",<Threaded>,<>\n"
+    )
+    output = tmp_path / "output"
+    edit_groups = read_edit_csv(edits)
+    jobs = build_jobs(edit_groups, resolve_from_directory(source), output)
+
+    results = edit_pipelined(jobs, edit_groups, io_threads=2, queue_size=2, edit_threads=4)
+
+    assert len(results) == 12
+    assert all(r.status == "OK" for r in results)
+    for i in range(12):
+        assert pydicom.dcmread(output / SERIES_A / f"{i}.dcm").PatientName == "Threaded"
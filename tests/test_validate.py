@@ -0,0 +1,66 @@
+from pathlib import Path
+
+import pytest
+
+from pydicom_background_editor.editor import Operation
+from pydicom_background_editor.main import read_edit_csv
+from pydicom_background_editor.validate import PlanValidationError, validate_edits, validate_operations
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def issues_for(operations):
+    with pytest.raises(PlanValidationError) as excinfo:
+        validate_operations(operations)
+    return excinfo.value.issues
+
+
+@pytest.mark.parametrize("csv", sorted(ROOT.glob("*.csv")), ids=lambda p: p.name)
+def test_example_csvs_are_valid(csv):
+    for operations in read_edit_csv(csv).values():
+        validate_operations(operations)
+
+
+def test_reports_every_problem_at_once():
+    issues = issues_for([
+        Operation("set_tag", "<(0010,0010)>", "Fine", ""),
+        Operation("set_tagg", "<(0010,0010)>", "Typo", ""),
+        Operation("set_tag", '<(0013,"NOBODY",13)>', "x", ""),
+        Operation("copy_from_tag", "<(0010,1000)>", "<0010,0020>", ""),
+        Operation("shift_date", "<(0008,0020)>", "ten", ""),
+        Operation("set_tag", "<(0028,0010)>", "many", ""),
+        Operation("set_tag", "<(0010,0010)[0](0010,0020)>", "x", ""),
+        Operation("hash_unhashed_uid", "<(0008,0018)>", "", ""),
+    ])
+
+    assert len(issues) == 7
+    assert issues[0].startswith("op 2 (set_tagg")
+    assert "unknown op" in issues[0]
+    assert "not in the dictionary" in issues[1]
+    assert "source tag" in issues[2]
+    assert "days to shift" in issues[3]
+    assert "not an integer" in issues[4]
+    assert "not a sequence" in issues[5]
+    assert "no UID root" in issues[6]
+
+
+def test_private_tags_are_checked():
+    validate_operations([Operation("set_tag", '<(0013,"CTP",13)>', "21113544", "")])
+
+    issues = issues_for([Operation("set_tag", '<(0012,"CTP",13)>', "x", "")])
+    assert "even group" in issues[0]
+
+
+def test_validate_edits_checks_tag_modes():
+    edits = [
+        {"op": "set_tag", "tag": "(0010,0010)", "tag_mode": "exact", "arg1": "A", "arg2": ""},
+        {"op": "set_tag", "tag": "(0010,0010)", "tag_mode": "regex", "arg1": "A", "arg2": ""},
+        {"op": "delete_tag", "tag": "(0010,0010)", "tag_mode": "exact"},
+    ]
+
+    with pytest.raises(PlanValidationError) as excinfo:
+        validate_edits(edits)
+
+    assert len(excinfo.value.issues) == 2
+    assert "tag_mode 'regex'" in excinfo.value.issues[0]
+    assert "missing arg1, arg2" in excinfo.value.issues[1]
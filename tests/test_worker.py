@@ -0,0 +1,96 @@
+import io
+import os
+
+import pydicom
+
+from pydicom_background_editor.main import worker
+
+from framing import write_dicom, frame, read_responses, make_request
+
+
+def run_worker(frames):
+    read_fd, write_fd = os.pipe()
+    os.write(write_fd, b"".join(frames))
+    os.close(write_fd)
+
+    out = io.BytesIO()
+    try:
+        worker(read_fd, out)
+    finally:
+        os.close(read_fd)
+
+    return read_responses(out.getvalue())
+
+
+def test_worker_handles_multiple_requests(tmp_path):
+    source = tmp_path / "in.dcm"
+    write_dicom(source)
+
+    responses = run_worker([
+        frame(make_request(source, tmp_path / "out1.dcm", "First^Edit")),
+        frame(make_request(source, tmp_path / "out2.dcm", "Second^Edit")),
+    ])
+
+    assert [r["Status"] for r in responses] == ["OK", "OK"]
+    assert responses[1]["to_file"] == str(tmp_path / "out2.dcm")
+    assert pydicom.dcmread(tmp_path / "out1.dcm").PatientName == "First^Edit"
+    assert pydicom.dcmread(tmp_path / "out2.dcm").PatientName == "Second^Edit"
+
+
+def test_worker_reports_errors_and_continues(tmp_path):
+    source = tmp_path / "in.dcm"
+    write_dicom(source)
+
+    responses = run_worker([
+        frame(make_request(tmp_path / "missing.dcm", tmp_path / "out1.dcm", "First^Edit")),
+        frame(make_request(source, tmp_path / "out2.dcm", "Second^Edit")),
+    ])
+
+    assert responses[0]["Status"] == "Error"
+    assert "FileNotFoundError" in responses[0]["message"]
+    assert responses[1]["Status"] == "OK"
+    assert not (tmp_path / "out1.dcm").exists()
+    assert pydicom.dcmread(tmp_path / "out2.dcm").PatientName == "Second^Edit"
+
+
+def test_worker_exits_on_empty_input():
+    assert run_worker([]) == []
+
+
+def test_worker_handles_multi_file_request(tmp_path):
+    source = tmp_path / "in.dcm"
+    write_dicom(source)
+
+    request = make_request(source, tmp_path / "unused.dcm", "Batch^Edit")
+    del request["from_file"], request["to_file"]
+    request["files"] = [
+        [str(source), str(tmp_path / "out1.dcm")],
+        [str(tmp_path / "missing.dcm"), str(tmp_path / "out2.dcm")],
+        [str(source), str(tmp_path / "out3.dcm")],
+    ]
+
+    (response,) = run_worker([frame(request)])
+
+    assert response["Status"] == "Error"
+    assert response["message"] == "1 of 3 files failed"
+    assert [r["Status"] for r in response["files"]] == ["OK", "Error", "OK"]
+    assert response["files"][1]["from_file"] == str(tmp_path / "missing.dcm")
+    assert pydicom.dcmread(tmp_path / "out1.dcm").PatientName == "Batch^Edit"
+    assert pydicom.dcmread(tmp_path / "out3.dcm").PatientName == "Batch^Edit"
+
+
+def test_worker_rejects_bad_edits_before_editing(tmp_path):
+    source = tmp_path / "in.dcm"
+    write_dicom(source)
+
+    request = make_request(source, tmp_path / "unused.dcm", "Batch^Edit")
+    del request["from_file"], request["to_file"]
+    request["files"] = [[str(source), str(tmp_path / "out1.dcm")]]
+    request["edits"].append(dict(request["edits"][0], op="set_tagg"))
+
+    (response,) = run_worker([frame(request)])
+
+    assert response["Status"] == "Error"
+    assert "PlanValidationError" in response["message"]
+    assert "unknown op 'set_tagg'" in response["message"]
+    assert not (tmp_path / "out1.dcm").exists()